@@ -0,0 +1,70 @@
+"""
+Measure the CPU cost of running the LED heartbeat:
+
+- How the daemon used to do it: a thread that waits on a queue 100 times per half period
+  and changes the duty cycle after each wait.
+- The pattern engine in `leddaemon.py`, which sleeps until each precomputed step is due.
+
+Both drive a fake PWM output, so this measures the Python side only (the old daemon also
+kept RPi.GPIO's software PWM thread busy, which the hardware PWM backend does away with).
+Run it from this folder:
+
+    python benchmarks/pattern_cpu.py --seconds 10
+"""
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import leddaemon
+
+class _FakePWM:
+    def __init__(self):
+        self.nwrites = 0
+
+    def set_duty(self, percent: float):
+        self.nwrites += 1
+
+    ChangeDutyCycle = set_duty
+
+def _old_heartbeat(pwm, period_seconds, q: queue.Queue):
+    nsteps = 100
+    timeout = (0.5 * period_seconds) / nsteps
+    while True:
+        for duty_cycle in range(0, nsteps):
+            try:
+                q.get(block=True, timeout=timeout)
+                return
+            except queue.Empty:
+                pwm.ChangeDutyCycle(duty_cycle)
+        for duty_cycle in reversed([i for i in range(0, nsteps)]):
+            try:
+                q.get(block=True, timeout=timeout)
+                return
+            except queue.Empty:
+                pwm.ChangeDutyCycle(duty_cycle)
+
+def _measure(name: str, start, stop, pwm: _FakePWM, seconds: float):
+    cpu_start_s = time.process_time()
+    start()
+    time.sleep(seconds)
+    stop()
+    cpu_s = time.process_time() - cpu_start_s
+    print(f"{name:>16}: {1e3 * cpu_s / seconds:6.2f} ms CPU per second | {pwm.nwrites / seconds:6.1f} duty cycle changes per second")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10.0, help="How long to run each heartbeat.")
+    args = parser.parse_args()
+
+    pwm = _FakePWM()
+    q = queue.Queue()
+    t = threading.Thread(target=_old_heartbeat, args=(pwm, 2.0, q), daemon=True)
+    _measure("old heartbeat", t.start, lambda: (q.put("END"), t.join()), pwm, args.seconds)
+
+    pwm = _FakePWM()
+    led = leddaemon.Led(state="off", output=pwm)
+    _measure("pattern engine", led.heartbeat, led.off, pwm, args.seconds)
@@ -1,114 +1,275 @@
 #! /usr/bin/python3
 """
 A simple user-space driver for the on-board LED.
-Communicates over dbus.
+Communicates over a Unix socket: any number of clients can connect at once and stay connected,
+sending one command per line (a pattern name, or 'get') and getting back one line per command
+('ok <current pattern>' or 'error <reason>').
+
+The LED is driven by a pattern engine: every pattern (heartbeat, blink codes, fades)
+is precomputed as a list of (duty cycle, hold time) steps, and a single thread
+sleeps until the next step is due. The brightness itself comes from hardware PWM
+if the PWM overlay is enabled (GPIO 18 is PWM0), and from RPi.GPIO's software PWM if not.
 """
 from artie_util import boardconfig_controller as board
+from typing import NamedTuple, Tuple
 import argparse
+import asyncio
+import functools
 import logging
 import os
-import queue
-import socket
-import RPi.GPIO as GPIO
 import threading
+try:
+    import RPi.GPIO as GPIO
+except ModuleNotFoundError:
+    GPIO = None
 
-class Led:
-    def __init__(self, state='heartbeat'):
-        self._led_pin = board.LED_PIN
-        self._active_mode = GPIO.HIGH
-        self._inactive_mode = GPIO.LOW
-        self._pwm_pattern_thread = None
-        self._pwm_pattern_queue = queue.Queue()
+# Hardware PWM through sysfs (needs 'dtoverlay=pwm' so that GPIO 18 is routed to PWM0)
+PWM_SYSFS_DPATH = "/sys/class/pwm/pwmchip0"
+PWM_CHANNEL = 0
+PWM_FREQUENCY_HZ = 1000
+
+# Software PWM frequency, if we have to fall back to it
+SOFTWARE_PWM_FREQUENCY_HZ = 100
+
+# Brightness steps per fade. The steps are gamma corrected, so that they look evenly spaced.
+FADE_NSTEPS = 16
+GAMMA = 2.2
+
+# Longest blink code we accept ('blink 1' through 'blink 9')
+MAX_BLINK_CODE = 9
+
+class Pattern(NamedTuple):
+    """A precomputed LED pattern."""
+    steps: Tuple[Tuple[float, float], ...]
+    """(duty cycle in percent, seconds to hold it) pairs. A hold time of 0 means forever."""
+    loop: bool
+    """Whether to start over after the last step."""
+
+def _ramp(start: float, end: float, duration_s: float, nsteps: int = FADE_NSTEPS) -> Tuple[Tuple[float, float], ...]:
+    """
+    Steps that fade from `start` to `end` (perceived brightness, 0 to 1) over `duration_s`.
+    """
+    hold_s = duration_s / nsteps
+    levels = [start + (end - start) * (i + 1) / nsteps for i in range(nsteps)]
+    return tuple((round(100.0 * (level ** GAMMA), 1), hold_s) for level in levels)
+
+def heartbeat_pattern(period_s: float = 2.0) -> Pattern:
+    """Fade up and back down, over and over."""
+    return Pattern(_ramp(0.0, 1.0, period_s / 2) + _ramp(1.0, 0.0, period_s / 2), loop=True)
+
+def fade_pattern(on: bool, duration_s: float = 1.0) -> Pattern:
+    """Fade on (or off) once, then stay there."""
+    steps = _ramp(0.0, 1.0, duration_s) if on else _ramp(1.0, 0.0, duration_s)
+    return Pattern(steps[:-1] + ((steps[-1][0], 0),), loop=False)
+
+def blink_code_pattern(n: int, on_s: float = 0.2, off_s: float = 0.3, pause_s: float = 1.5) -> Pattern:
+    """Blink `n` times, pause, and repeat. Used to show error codes."""
+    steps = ((100.0, on_s), (0.0, off_s)) * (n - 1) + ((100.0, on_s), (0.0, pause_s))
+    return Pattern(steps, loop=True)
+
+PATTERNS = {
+    "on": Pattern(((100.0, 0),), loop=False),
+    "off": Pattern(((0.0, 0),), loop=False),
+    "heartbeat": heartbeat_pattern(),
+    "fade-on": fade_pattern(on=True),
+    "fade-off": fade_pattern(on=False),
+}
+
+@functools.lru_cache(maxsize=None)
+def get_pattern(name: str) -> Pattern:
+    """
+    Return the pattern with the given name (one of PATTERNS, or 'blink N').
+    Raise a ValueError if there is no such pattern.
+    """
+    if name in PATTERNS:
+        return PATTERNS[name]
+
+    match name.split():
+        case ["blink", n] if n.isdigit() and 1 <= int(n) <= MAX_BLINK_CODE:
+            return blink_code_pattern(int(n))
+        case _:
+            raise ValueError(f"No such LED pattern: {name}")
+
+class SysfsPWM:
+    """
+    Hardware PWM through the kernel's sysfs interface. Changing the duty cycle is one small write.
+    """
+    def __init__(self, chip_dpath=PWM_SYSFS_DPATH, channel=PWM_CHANNEL, frequency_hz=PWM_FREQUENCY_HZ):
+        self._dpath = os.path.join(chip_dpath, f"pwm{channel}")
+        if not os.path.isdir(self._dpath):
+            with open(os.path.join(chip_dpath, "export"), 'w') as f:
+                f.write(str(channel))
+        self._period_ns = int(1e9 / frequency_hz)
+        with open(os.path.join(self._dpath, "period"), 'w') as f:
+            f.write(str(self._period_ns))
+        self._duty_fd = os.open(os.path.join(self._dpath, "duty_cycle"), os.O_WRONLY)
+        self.set_duty(0)
+        with open(os.path.join(self._dpath, "enable"), 'w') as f:
+            f.write("1")
+
+    @staticmethod
+    def available(chip_dpath=PWM_SYSFS_DPATH) -> bool:
+        return os.path.isdir(chip_dpath)
+
+    def set_duty(self, percent: float):
+        os.lseek(self._duty_fd, 0, os.SEEK_SET)
+        os.write(self._duty_fd, str(int(self._period_ns * percent / 100.0)).encode())
+
+class GPIOPWM:
+    """
+    RPi.GPIO's software PWM. Fully on and fully off are plain GPIO writes, so that the
+    software PWM thread only runs while the LED is partly on.
+    """
+    def __init__(self, pin: int):
+        if GPIO is None:
+            raise RuntimeError(f"No PWM backend for the LED: there is no hardware PWM at {PWM_SYSFS_DPATH} (is 'dtoverlay=pwm' set?), and RPi.GPIO is not installed.")
+        self._pin = pin
         GPIO.setmode(GPIO.BCM)
-        GPIO.setup(self._led_pin, GPIO.OUT)
-        GPIO.output(self._led_pin, self._inactive_mode)
-        match state:
-            case 'on':
-                self.on()
-            case 'off':
-                self.off()
-            case 'heartbeat':
-                self.heartbeat()
-            case _:
-                raise ValueError(f"Invalid state for Led requested: {state}")
+        GPIO.setup(self._pin, GPIO.OUT)
+        GPIO.output(self._pin, GPIO.LOW)
+        self._pwm = GPIO.PWM(self._pin, SOFTWARE_PWM_FREQUENCY_HZ)
+        self._pwm_running = False
+
+    def set_duty(self, percent: float):
+        if percent <= 0.0 or percent >= 100.0:
+            if self._pwm_running:
+                self._pwm.stop()
+                self._pwm_running = False
+            GPIO.output(self._pin, GPIO.HIGH if percent >= 100.0 else GPIO.LOW)
+        elif self._pwm_running:
+            self._pwm.ChangeDutyCycle(percent)
+        else:
+            self._pwm.start(percent)
+            self._pwm_running = True
+
+class PatternEngine:
+    """
+    Plays patterns on an output (anything with a `set_duty(percent)` method) from one thread,
+    which only wakes up when a step is due or the pattern changes.
+    """
+    def __init__(self, output):
+        self._output = output
+        self._cv = threading.Condition()
+        self._pattern = None
+        self._generation = 0
+        self._duty = None
+        threading.Thread(target=self._run, name="led-pattern-engine", daemon=True).start()
+
+    def play(self, pattern: Pattern):
+        """
+        Replace whatever is playing with `pattern`.
+        """
+        with self._cv:
+            self._pattern = pattern
+            self._generation += 1
+            self._cv.notify()
+
+    def _set_duty(self, percent: float):
+        if percent != self._duty:
+            self._output.set_duty(percent)
+            self._duty = percent
+
+    def _run(self):
+        while True:
+            with self._cv:
+                self._cv.wait_for(lambda: self._pattern is not None)
+                pattern, generation = self._pattern, self._generation
+
+            changed = lambda: self._generation != generation
+            while not changed():
+                for duty, hold_s in pattern.steps:
+                    self._set_duty(duty)
+                    with self._cv:
+                        if self._cv.wait_for(changed, timeout=hold_s if hold_s > 0 else None):
+                            break
+                else:
+                    if not pattern.loop:
+                        with self._cv:
+                            self._cv.wait_for(changed)
+                    continue
+                break
+
+class Led:
+    def __init__(self, state='heartbeat', output=None):
+        if output is None:
+            output = SysfsPWM() if SysfsPWM.available() else GPIOPWM(board.LED_PIN)
+        self._engine = PatternEngine(output)
+        self.state = None
+        self.play(state)
+
+    def play(self, name: str):
+        """
+        Play the pattern with the given name (see `get_pattern`). Raise a ValueError if there is no such pattern.
+        """
+        pattern = get_pattern(name)
+        logging.info(f"Setting LED to {name.upper()}")
+        self._engine.play(pattern)
+        self.state = name
 
     def on(self):
         """
         Turn the LED on.
         """
-        logging.info("Setting LED to ON")
-        self._clean_up_pwm_pattern_thread()
-        GPIO.output(self._led_pin, self._active_mode)
+        self.play("on")
 
     def off(self):
         """
         Turn the LED off.
         """
-        logging.info("Setting LED to OFF")
-        self._clean_up_pwm_pattern_thread()
-        GPIO.output(self._led_pin, self._inactive_mode)
+        self.play("off")
 
     def heartbeat(self):
         """
         Set the LED to heartbeat mode.
         """
-        logging.info("Setting LED to HEARTBEAT")
-        if self._pwm_pattern_thread is None:
-            self._spawn_pwm_pattern_thread()
-
-    def _spawn_pwm_pattern_thread(self):
-        def heartbeat(led_pin, period_seconds, q: queue.Queue):
-            hz = 100
-            pwm = GPIO.PWM(led_pin, hz)
-            pwm.start(0)
-            nsteps = 100
-            timeout = (0.5 * period_seconds) / nsteps
-            while True:
-                for duty_cycle in range(0, nsteps):
-                    try:
-                        q.get(block=True, timeout=timeout)
-                        return
-                    except queue.Empty:
-                        pwm.ChangeDutyCycle(duty_cycle)
-                for duty_cycle in reversed([i for i in range(0, nsteps)]):
-                    try:
-                        q.get(block=True, timeout=timeout)
-                        return
-                    except queue.Empty:
-                        pwm.ChangeDutyCycle(duty_cycle)
-
-        period_seconds = 2.0
-        self._pwm_pattern_thread = threading.Thread(target=heartbeat, args=(self._led_pin, period_seconds, self._pwm_pattern_queue), daemon=True)
-        self._pwm_pattern_thread.start()
-
-    def _clean_up_pwm_pattern_thread(self):
-        if self._pwm_pattern_thread is not None:
-            self._pwm_pattern_queue.put("END")
-            self._pwm_pattern_thread.join()
-            self._pwm_pattern_thread = None
-
-def _serve(address, led):
-    s = socket.socket(family=socket.AF_UNIX)
-    s.bind(address)
-    s.listen()
-
-    while True:
-        c, addr = s.accept()
-        logging.info("Connected to a client.")
-        match val := c.recv(1024).decode().lower():
-            case "on":
-                led.on()
-            case "off":
-                led.off()
-            case "heartbeat":
-                led.heartbeat()
-            case _:
-                logging.error(f"Ignoring an unexpected value from client connection: {val}")
+        self.play("heartbeat")
+
+def _handle_command(command: str, led: Led) -> str:
+    """
+    Run one command and return the reply line: 'ok <state>' or 'error <reason>'.
+    """
+    if command == "get":
+        return f"ok {led.state}"
+
+    try:
+        led.play(command)
+    except ValueError as e:
+        logging.error(f"Ignoring an unexpected value from client connection: {command}")
+        return f"error {e}"
+    return f"ok {led.state}"
+
+async def _handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, led: Led):
+    """
+    Serve one client for as long as it stays connected. Each command is one line,
+    and gets one line back. A client that sends a single command without a newline
+    and hangs up (as older clients do) still gets its command run.
+    """
+    logging.info("Connected to a client.")
+    try:
+        while line := await reader.readline():
+            command = line.decode(errors='replace').strip().lower()
+            if not command:
+                continue
+            writer.write(_handle_command(command, led).encode() + b"\n")
+            await writer.drain()
+    except ConnectionError:
+        # The client hung up without waiting for its reply
+        logging.debug("Client disconnected.")
+    except ValueError as e:
+        # The client sent a line longer than the reader's limit
+        logging.warning(f"Dropping client connection: {e}")
+    finally:
+        writer.close()
+
+async def _serve(address, led):
+    server = await asyncio.start_unix_server(lambda r, w: _handle_client(r, w, led), path=address)
+    async with server:
+        await server.serve_forever()
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument("mode", choices=('on', 'off', 'heartbeat'), type=str, help="The particular mode of LED operation.")
+    parser.add_argument("mode", choices=sorted(PATTERNS), type=str, help="The particular mode of LED operation.")
     parser.add_argument("-l", "--loglevel", type=str, default="info", choices=["debug", "info", "warning", "error"], help="The log level.")
     args = parser.parse_args()
 
@@ -122,7 +283,7 @@ if __name__ == "__main__":
         # In case previous instance did not shut down cleanly
         if os.path.exists(address):
             os.remove(address)
-        _serve(address, led)
+        asyncio.run(_serve(address, led))
     finally:
         # Cleanup the tmp file
         if os.path.exists(address):
@@ -0,0 +1,88 @@
+"""
+Measure the per-command cost of encoding mouth/eyebrow MCU commands:
+
+- How the drivers used to do it: eyebrow LCD states built bit by bit with Python lists,
+  servo positions mapped with `np.interp` (if NumPy is installed).
+- The precomputed lookup tables in `src-common/cmdtables.py`.
+
+This only measures the encoding, not the I2C write. Run it from this folder:
+
+    python benchmarks/command_encoding.py --ncommands 100000
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src-common"))
+import cmdtables
+
+def _old_eyebrow_encode(eyebrow_state) -> int:
+    lsbs = [0, 0, 0]
+    msbs = [0, 0, 0]
+    for i, pos in enumerate(eyebrow_state):
+        if pos.startswith('H'):
+            msbs[i] = 0
+            lsbs[i] = 1
+        elif pos.startswith('L'):
+            msbs[i] = 0
+            lsbs[i] = 0
+        else:
+            msbs[i] = 1
+            lsbs[i] = 0
+
+    eyebrow_state_bytes = 0x00
+    all = lsbs + msbs
+    for i in range(len(all)):
+        if all[i] == 1:
+            eyebrow_state_bytes |= (0x01 << i)
+    return cmdtables.CMD_MODULE_ID_LCD | eyebrow_state_bytes
+
+def _old_servo_encode(servo_degrees: float) -> int:
+    import numpy as np
+    go_val_bytes = int(round(np.interp(servo_degrees, [0, 180], [0, 63])))
+    go_val_bytes = 0b00000000 if go_val_bytes < 0b00000000 else go_val_bytes
+    go_val_bytes = 0b00111111 if go_val_bytes > 0b00111111 else go_val_bytes
+    return cmdtables.CMD_MODULE_ID_SERVO | go_val_bytes
+
+def _new_servo_encode(servo_degrees: float) -> int:
+    return cmdtables.SERVO_COMMANDS[cmdtables.servo_value(servo_degrees)]
+
+def _bench(name: str, encode, inputs) -> float:
+    ts = time.perf_counter()
+    for x in inputs:
+        encode(x)
+    per_command_s = (time.perf_counter() - ts) / len(inputs)
+    print(f"{name:>36}: {1e9 * per_command_s:8.0f} ns/command")
+    return per_command_s
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ncommands", type=int, default=100_000, help="Number of commands to encode per measurement.")
+    args = parser.parse_args()
+
+    # Make sure the tables say exactly what the old code said
+    for state in itertools.product("HML", repeat=3):
+        assert cmdtables.eyebrow_lcd_command(list(state)) == _old_eyebrow_encode(list(state)), state
+
+    states = [list(random.choice(list(cmdtables.EYEBROW_VERTEX_COMMANDS.keys()))) for _ in range(args.ncommands)]
+    old_s = _bench("eyebrow LCD, bit by bit", _old_eyebrow_encode, states)
+    new_s = _bench("eyebrow LCD, lookup table", cmdtables.eyebrow_lcd_command, states)
+    print(f"{'':>36}  {old_s / new_s:.1f}x faster")
+
+    degrees = [random.uniform(0, 180) for _ in range(args.ncommands)]
+    try:
+        for d in degrees[:1000]:
+            assert _old_servo_encode(d) == _new_servo_encode(d), d
+        old_s = _bench("servo, np.interp", _old_servo_encode, degrees)
+    except ImportError:
+        print("NumPy is not installed; skipping the np.interp measurement.")
+        old_s = None
+    new_s = _bench("servo, lookup table", _new_servo_encode, degrees)
+    if old_s is not None:
+        print(f"{'':>36}  {old_s / new_s:.1f}x faster")
+
+    _bench("mouth LCD drawing, lookup table", cmdtables.MOUTH_DRAWING_CHOICES.get, [random.choice(list(cmdtables.MOUTH_DRAWING_CHOICES.keys())) for _ in range(args.ncommands)])
+    _bench("LED, lookup table", cmdtables.LED_COMMANDS.get, [random.choice(list(cmdtables.LED_COMMANDS.keys())) for _ in range(args.ncommands)])
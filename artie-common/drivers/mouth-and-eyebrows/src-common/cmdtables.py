@@ -0,0 +1,81 @@
+"""
+Precomputed I2C command bytes for the mouth and eyebrow MCUs.
+
+Both MCUs take single-byte commands: the two msb select the submodule
+and the six lsb are the submodule's argument. The command space is small,
+so every command is computed once here, at import time, and the drivers
+just index into these tables instead of building bytes on every request.
+"""
+from typing import Dict, Tuple
+import itertools
+
+CMD_MODULE_ID_LEDS = 0x00
+CMD_MODULE_ID_LCD = 0x40
+CMD_MODULE_ID_SERVO = 0x80
+
+# LED submodule (same on both MCUs)
+LED_COMMANDS: Dict[str, int] = {
+    "on":           CMD_MODULE_ID_LEDS | 0x00,
+    "off":          CMD_MODULE_ID_LEDS | 0x01,
+    "heartbeat":    CMD_MODULE_ID_LEDS | 0x02,
+}
+
+# LCD commands that are the same on both MCUs
+LCD_TEST = CMD_MODULE_ID_LCD | 0x11
+LCD_OFF = CMD_MODULE_ID_LCD | 0x22
+
+# Mouth LCD drawings
+MOUTH_DRAWING_CHOICES: Dict[str, int] = {
+    "SMILE":        CMD_MODULE_ID_LCD | 0x00,
+    "FROWN":        CMD_MODULE_ID_LCD | 0x01,
+    "LINE":         CMD_MODULE_ID_LCD | 0x02,
+    "SMIRK":        CMD_MODULE_ID_LCD | 0x03,
+    "OPEN":         CMD_MODULE_ID_LCD | 0x04,
+    "OPEN-SMILE":   CMD_MODULE_ID_LCD | 0x05,
+    "ZIG-ZAG":      CMD_MODULE_ID_LCD | 0x06,
+}
+MOUTH_TALK = CMD_MODULE_ID_LCD | 0x07
+
+def _encode_eyebrow_vertices(vertices: Tuple[str, str, str]) -> int:
+    # An eyebrow state is encoded as follows:
+    # Six bits (3 msb, 3 lsb)
+    # The 3 lsb determine UP (1) or DOWN (0) for each of the three vertex pairs
+    # The 3 msb override the corresponding lsb to show MIDDLE if set.
+    # HOWEVER, if an msb is set, its corresponding lsb must be cleared, otherwise
+    # it is interpreted as one of the special LCD commands like OFF or TEST.
+    encoded = 0x00
+    for i, pos in enumerate(vertices):
+        if pos == 'H':
+            encoded |= (0x01 << i)
+        elif pos == 'M':
+            encoded |= (0x01 << (i + 3))
+    return CMD_MODULE_ID_LCD | encoded
+
+# All 27 eyebrow LCD states, keyed by a tuple of three vertex positions, each one of 'H', 'M', or 'L'
+EYEBROW_VERTEX_COMMANDS: Dict[Tuple[str, str, str], int] = {
+    vertices: _encode_eyebrow_vertices(vertices) for vertices in itertools.product("HML", repeat=3)
+}
+
+def eyebrow_lcd_command(eyebrow_state) -> int:
+    """
+    Return the LCD draw command for the given eyebrow state (a sequence of three vertex positions).
+    As the driver always has, any position that starts with 'H' is high, with 'L' is low,
+    and anything else is middle.
+    """
+    key = tuple(eyebrow_state)
+    cmd = EYEBROW_VERTEX_COMMANDS.get(key, None)
+    if cmd is None:
+        key = tuple('H' if pos.startswith('H') else 'L' if pos.startswith('L') else 'M' for pos in key)
+        cmd = EYEBROW_VERTEX_COMMANDS[key]
+    return cmd
+
+# Servo submodule (eyebrows only): the position is a 6-bit value
+SERVO_MAX_VALUE = 0b00111111
+SERVO_COMMANDS: Tuple[int, ...] = tuple(CMD_MODULE_ID_SERVO | value for value in range(SERVO_MAX_VALUE + 1))
+
+def servo_value(servo_degrees: float) -> int:
+    """
+    Map degrees in [0, 180] to the 6-bit servo value (an index into `SERVO_COMMANDS`).
+    """
+    value = int(round(servo_degrees * SERVO_MAX_VALUE / 180.0))
+    return min(max(value, 0), SERVO_MAX_VALUE)
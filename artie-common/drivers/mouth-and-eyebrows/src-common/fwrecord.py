@@ -0,0 +1,85 @@
+"""
+Tracks which FW is on the MCUs, so that we can skip reloading FW that is already there.
+
+The MCUs cannot tell us what FW they are running, so after every successful load
+we record the FW file's hash in DRIVER_STATE_DIR (which should be a directory that
+outlives the driver's pod). If that variable is not set, the record is only kept in memory,
+which still saves repeated loads for as long as the driver runs.
+"""
+from artie_util import artie_logging as alog
+from artie_util import constants
+import hashlib
+import json
+import mmap
+import os
+import threading
+
+def file_digest(fpath: str) -> str:
+    """
+    Return the SHA-256 hex digest of the given file's contents.
+    """
+    with open(fpath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256(b'').hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            return hashlib.sha256(m).hexdigest()
+
+class FirmwareRecord:
+    """
+    The digest of the FW last loaded successfully onto the MCUs named `name` (e.g., 'mouth').
+    """
+    def __init__(self, name: str) -> None:
+        state_dpath = os.environ.get(constants.ArtieEnvVariables.DRIVER_STATE_DIR, None)
+        self._fpath = os.path.join(state_dpath, f"{name}-fw.json") if state_dpath else None
+        self._lock = threading.Lock()
+        self._digest = self._read()
+
+    def _read(self) -> str|None:
+        if self._fpath is None or not os.path.isfile(self._fpath):
+            return None
+        try:
+            with open(self._fpath, 'r') as f:
+                return json.load(f).get("sha256", None)
+        except (OSError, ValueError) as e:
+            alog.warning(f"Ignoring unreadable FW record {self._fpath}: {e}")
+            return None
+
+    def _write(self):
+        if self._fpath is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self._fpath), exist_ok=True)
+            tmp_fpath = self._fpath + ".tmp"
+            with open(tmp_fpath, 'w') as f:
+                json.dump({"sha256": self._digest}, f)
+            os.replace(tmp_fpath, self._fpath)
+        except OSError as e:
+            alog.warning(f"Could not persist FW record {self._fpath}: {e}")
+
+    def matches(self, digest: str) -> bool:
+        """
+        Return True if the FW with the given digest is the one we last loaded.
+        """
+        with self._lock:
+            return self._digest is not None and self._digest == digest
+
+    def save(self, digest: str):
+        """
+        Record that the FW with the given digest has been loaded.
+        """
+        with self._lock:
+            self._digest = digest
+            self._write()
+
+    def clear(self):
+        """
+        Forget what is on the MCUs. Call this before starting a load, so that
+        a load that does not finish is never mistaken for one that did.
+        """
+        with self._lock:
+            self._digest = None
+            if self._fpath is not None and os.path.isfile(self._fpath):
+                try:
+                    os.remove(self._fpath)
+                except OSError as e:
+                    alog.warning(f"Could not remove FW record {self._fpath}: {e}")
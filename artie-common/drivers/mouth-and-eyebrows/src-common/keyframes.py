@@ -0,0 +1,161 @@
+"""
+Keyframe sequencer for the mouth and eyebrow drivers.
+
+A client sends a whole timeline in one RPC, and the driver plays it back
+locally against its monotonic clock, so an expression's timing does not depend
+on network jitter. A timeline is a sequence of keyframes:
+
+    (time_s, actuator, command, *args)
+
+where `time_s` is the offset in seconds from the start of the timeline,
+`actuator` is one of the driver's actuator names (e.g., 'lcd-left' or 'led'),
+`command` is one of that actuator's commands (e.g., 'draw'), and `args` are
+the command's arguments. For example, for the eyebrows:
+
+    ((0.0, 'lcd-left', 'draw', ('H', 'M', 'L')), (0.25, 'servo-left', 'go', 45.0))
+
+To keep the mouth and eyebrows in sync, send the same timeline to both
+drivers with the same `start_at_s`. That is a wall-clock (UNIX) time, which
+both drivers share since they run on the same node. Each driver plays the
+keyframes for its own actuators and ignores the rest.
+
+Sending a new timeline replaces the one that is playing.
+"""
+from artie_util import artie_logging as alog
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+import inspect
+import threading
+import time
+
+class Keyframe(NamedTuple):
+    time_s: float
+    actuator: str
+    command: str
+    args: Tuple[Any, ...]
+
+# {actuator: {command: handler(*args) -> bool}}
+ActuatorTable = Dict[str, Dict[str, Callable[..., bool]]]
+
+def _to_local(value):
+    # Copy sequences into plain tuples, so that we do not hold on to RPyC netrefs
+    # (which would make a round trip to the client on every access, and which die with the connection)
+    if isinstance(value, (list, tuple)):
+        return tuple(_to_local(v) for v in value)
+    return value
+
+def compile_timeline(timeline, actuators: ActuatorTable) -> Tuple[List[Keyframe], int]:
+    """
+    Validate the given timeline and turn it into a list of `Keyframe`s sorted by time,
+    keeping only the ones for the given actuators. A keyframe that would send an actuator
+    the same command it was already sent by the previous keyframe is a no-op and is dropped.
+
+    Return the list of keyframes and the number of no-ops dropped.
+    Raise a ValueError if the timeline is malformed.
+    """
+    keyframes = []
+    for entry in timeline:
+        entry = _to_local(entry)
+        if len(entry) < 3:
+            raise ValueError(f"Keyframe {entry} must be (time_s, actuator, command, *args)")
+
+        time_s, actuator, command, args = float(entry[0]), str(entry[1]), str(entry[2]), tuple(entry[3:])
+        if time_s < 0:
+            raise ValueError(f"Keyframe {entry} has a negative time")
+
+        if actuator not in actuators:
+            continue
+
+        handler = actuators[actuator].get(command, None)
+        if handler is None:
+            raise ValueError(f"Keyframe {entry}: actuator '{actuator}' has no command '{command}'. Choose from: {list(actuators[actuator].keys())}")
+
+        try:
+            inspect.signature(handler).bind(*args)
+        except TypeError as e:
+            raise ValueError(f"Keyframe {entry}: bad arguments for '{actuator}' '{command}': {e}")
+
+        keyframes.append(Keyframe(time_s, actuator, command, args))
+
+    # Stable, so keyframes at the same time keep their order
+    keyframes.sort(key=lambda kf: kf.time_s)
+
+    deduped = []
+    last_sent: Dict[str, Tuple[str, Tuple[Any, ...]]] = {}
+    for kf in keyframes:
+        if last_sent.get(kf.actuator, None) == (kf.command, kf.args):
+            continue
+        last_sent[kf.actuator] = (kf.command, kf.args)
+        deduped.append(kf)
+    return deduped, len(keyframes) - len(deduped)
+
+class Sequencer:
+    """
+    Plays timelines against the given actuators on a background thread.
+
+    Every keyframe's drift (how late it was dispatched relative to its scheduled time)
+    is recorded in the `keyframe-drift` histogram.
+    """
+    def __init__(self, actuators: ActuatorTable, submodule_name: str) -> None:
+        self._actuators = actuators
+        self._metric_attributes = {alog.KnownMetricAttributes.SUBMODULE: submodule_name}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def play(self, timeline, start_at_s: float = None) -> bool:
+        """
+        Start playing `timeline` at UNIX time `start_at_s` (or now, if not given),
+        replacing whatever timeline is playing. Return False if the timeline is malformed.
+        """
+        try:
+            keyframes, nnoops = compile_timeline(timeline, self._actuators)
+        except (TypeError, ValueError) as e:
+            alog.error(f"Invalid timeline: {e}")
+            return False
+
+        # Convert the wall-clock start time to our monotonic clock once, up front
+        start_monotonic_s = time.monotonic()
+        if start_at_s is not None:
+            start_monotonic_s += start_at_s - time.time()
+
+        alog.info(f"Playing timeline of {len(keyframes)} keyframes ({nnoops} no-ops dropped).")
+        alog.update_counter(nnoops, "keyframes-deduped", alog.MetricSWCodePathSubmoduleOrder.COMMANDS_PROCESSED, unit=alog.MetricUnits.CALLS, description="Number of no-op keyframes dropped from timelines.", attributes=self._metric_attributes)
+
+        with self._lock:
+            self._stop_event.set()
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(keyframes, start_monotonic_s, self._stop_event), name="keyframe-sequencer", daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self):
+        """
+        Stop playing the current timeline (if any). Actuators stay where they are.
+        """
+        with self._lock:
+            self._stop_event.set()
+
+    def playing(self) -> bool:
+        with self._lock:
+            return self._thread is not None and self._thread.is_alive() and not self._stop_event.is_set()
+
+    def _run(self, keyframes: List[Keyframe], start_monotonic_s: float, stop_event: threading.Event):
+        for kf in keyframes:
+            due_s = start_monotonic_s + kf.time_s
+            wait_s = due_s - time.monotonic()
+            if wait_s > 0 and stop_event.wait(wait_s):
+                return
+            elif stop_event.is_set():
+                return
+
+            drift_s = time.monotonic() - due_s
+            alog.update_histogram(drift_s, "keyframe-drift", alog.MetricSWCodePathSubmoduleOrder.LATENCY, unit=alog.MetricUnits.SECONDS, description="How late each keyframe was dispatched relative to its scheduled time.", attributes=self._metric_attributes)
+            try:
+                worked = self._actuators[kf.actuator][kf.command](*kf.args)
+            except Exception as e:
+                alog.exception(f"Error while playing keyframe {kf}: ", e, stack_trace=True)
+                worked = False
+
+            if not worked:
+                alog.warning(f"Keyframe {kf} did not work.")
+            alog.update_counter(1, "keyframes-sent", alog.MetricSWCodePathSubmoduleOrder.COMMANDS_PROCESSED, unit=alog.MetricUnits.CALLS, description="Number of timeline keyframes dispatched.", attributes=self._metric_attributes)
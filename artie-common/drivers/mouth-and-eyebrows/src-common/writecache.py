@@ -0,0 +1,84 @@
+"""
+Write-if-changed for submodule commands.
+
+Every MCU command sets a state that the MCU keeps until it is told otherwise,
+so sending the same command again is a no-op that only costs I2C traffic. Each submodule
+keeps a `WriteCache` and sends its commands through it: a command that is the same
+as the last one successfully sent to that address is suppressed, unless the last
+send is older than the staleness window (so that an MCU that was reset or glitched
+still gets refreshed the next time it is commanded).
+
+The staleness window comes from the DRIVER_WRITE_STALENESS_S env variable.
+Zero disables suppression.
+"""
+from artie_i2c import i2c
+from artie_util import artie_logging as alog
+from artie_util import constants
+from typing import Dict, Tuple
+import os
+import threading
+import time
+import weakref
+
+# Default staleness window (seconds) if DRIVER_WRITE_STALENESS_S is not set
+DEFAULT_STALENESS_S = 5.0
+
+# Every WriteCache in this process, so that a reset can invalidate all of them
+_caches = weakref.WeakSet()
+
+def invalidate_all():
+    """
+    Invalidate every submodule's cache. Call this after resetting an MCU,
+    since a reset MCU has forgotten everything it was told.
+    """
+    for cache in list(_caches):
+        cache.invalidate()
+
+def _staleness_from_env() -> float:
+    value = os.environ.get(constants.ArtieEnvVariables.DRIVER_WRITE_STALENESS_S, None)
+    return DEFAULT_STALENESS_S if value is None else float(value)
+
+class WriteCache:
+    """
+    Remembers the last command sent to each address and suppresses repeats
+    within `staleness_s` seconds (read from the environment if not given).
+    """
+    def __init__(self, submodule_name: str, staleness_s: float = None) -> None:
+        self._staleness_s = _staleness_from_env() if staleness_s is None else staleness_s
+        self._metric_attributes = {alog.KnownMetricAttributes.SUBMODULE: submodule_name}
+        self._lock = threading.Lock()
+        # {address: (command, monotonic time it was sent)}
+        self._last_sent: Dict[int, Tuple[int, float]] = {}
+        _caches.add(self)
+
+    def write(self, address: int, command: int) -> bool:
+        """
+        Write `command` to `address` unless it would be a no-op. Return True
+        if the command was sent successfully or suppressed, False if the write failed.
+        """
+        with self._lock:
+            last = self._last_sent.get(address, None)
+            now_s = time.monotonic()
+            if last is not None and last[0] == command and now_s - last[1] < self._staleness_s:
+                alog.update_counter(1, "writes-suppressed", alog.MetricSWCodePathSubmoduleOrder.COMMANDS_PROCESSED, unit=alog.MetricUnits.CALLS, description="Number of submodule commands not sent because they would not change anything.", attributes=self._metric_attributes)
+                return True
+
+            wrote = i2c.write_bytes_to_address(address, command)
+            alog.update_counter(1, "writes-sent", alog.MetricSWCodePathSubmoduleOrder.COMMANDS_PROCESSED, unit=alog.MetricUnits.CALLS, description="Number of submodule commands sent over I2C.", attributes=self._metric_attributes)
+            if wrote:
+                self._last_sent[address] = (command, now_s)
+            else:
+                self._last_sent.pop(address, None)
+            return wrote
+
+    def invalidate(self, address: int = None):
+        """
+        Forget what was sent to `address` (or to every address if not given),
+        so that the next command to it is always sent. Use this whenever the MCU's
+        state may have changed behind our back, e.g., after a reset or a self check.
+        """
+        with self._lock:
+            if address is None:
+                self._last_sent.clear()
+            else:
+                self._last_sent.pop(address, None)
@@ -5,21 +5,41 @@ from artie_util import artie_logging as alog
 from artie_util import util
 from artie_util import boardconfig_controller as board
 from artie_util import constants
+from artie_util import statuspublisher
 from artie_i2c import i2c
 from artie_service_client import client as asc
 from . import ebcommon
+from . import metrics
+from .common import fwrecord
+from .common import writecache
 from typing import Dict
 import os
-import time
+import threading
+
+# How long we give the MCUs to come back online after we reset them
+MCU_BOOT_TIMEOUT_S = 1.0
 
 class FirmwareSubmodule:
-    def __init__(self, fw_fpath: str, ipv6=False) -> None:
+    def __init__(self, fw_fpath: str, status_publisher: statuspublisher.StatusPublisher, ipv6=False) -> None:
         self._fw_fpath = fw_fpath
-        self._left_status = constants.SubmoduleStatuses.UNKNOWN
-        self._right_status = constants.SubmoduleStatuses.UNKNOWN
-        self.firmware_status = constants.SubmoduleStatuses.UNKNOWN
+        self._left_status = constants.SubmoduleStatuses.INITIALIZING
+        self._right_status = constants.SubmoduleStatuses.INITIALIZING
+        self.firmware_status = constants.SubmoduleStatuses.INITIALIZING
         self._ipv6 = ipv6
 
+        # The FW file's digest (computed the first time we need it) and the digest of what is on the MCUs
+        self._fw_digest = None
+        self._fw_record = fwrecord.FirmwareRecord("eyebrows")
+
+        # Serializes bring-up and self checks, which both reset our view of the MCUs
+        self._lock = threading.RLock()
+
+        # Readers get this snapshot, which is replaced (never modified) whenever the status changes
+        self._status_snapshot = {"FW": self.firmware_status}
+
+        self._status_publisher = status_publisher
+        self._status_publisher.publish(self.status())
+
     def _set_mcu_status(self, mcu: str, status):
         if mcu == 'left':
             self._left_status = status
@@ -42,44 +62,78 @@ class FirmwareSubmodule:
             self._set_mcu_status(mcu, constants.SubmoduleStatuses.WORKING)
             return True
 
-    def self_check(self):
-        alog.test("Checking FW subsystem...", tests=['eyebrows-driver-unit-tests:self-check'])
-        self._check_mcu('left')
-        self._check_mcu('right')
+    def _update_firmware_status(self):
         if self._left_status == constants.SubmoduleStatuses.WORKING and self._right_status == constants.SubmoduleStatuses.WORKING:
             self.firmware_status = constants.SubmoduleStatuses.WORKING
         elif self._left_status == constants.SubmoduleStatuses.NOT_WORKING and self._right_status == constants.SubmoduleStatuses.NOT_WORKING:
             self.firmware_status = constants.SubmoduleStatuses.NOT_WORKING
         else:
             self.firmware_status = constants.SubmoduleStatuses.DEGRADED
+        self._status_snapshot = {"FW": self.firmware_status}
+        self._status_publisher.publish(self._status_snapshot)
+
+    def self_check(self):
+        alog.test("Checking FW subsystem...", tests=['eyebrows-driver-unit-tests:self-check'])
+        with self._lock:
+            self._check_mcu('left')
+            self._check_mcu('right')
+            self._update_firmware_status()
 
     def status(self) -> Dict[str, str]:
-        return {
-            "FW": self.firmware_status
-        }
+        """
+        Return the latest status. Do not modify the returned dict.
+        """
+        return self._status_snapshot
 
-    def initialize_mcus(self) -> bool:
+    def initialize_mcus(self, force=False) -> bool:
         """
         Attempt to load FW files into the two eyebrow MCUs.
+
+        If both MCUs are up and already have this FW, there is nothing to do,
+        so we skip the load and the reset unless `force` is True.
         """
-        worked = True
-        # Check that we have FW files
-        if not os.path.isfile(self._fw_fpath):
-            alog.error(f"Given a FW file path of {self._fw_fpath}, but it doesn't exist. Unlikely that we can operate the eyebrows.")
-            return False
+        with self._lock:
+            worked = True
+            # Check that we have FW files
+            if not os.path.isfile(self._fw_fpath):
+                alog.error(f"Given a FW file path of {self._fw_fpath}, but it doesn't exist. Unlikely that we can operate the eyebrows.")
+                self.firmware_status = constants.SubmoduleStatuses.NOT_WORKING
+                self._status_snapshot = {"FW": self.firmware_status}
+                self._status_publisher.publish(self._status_snapshot)
+                return False
+
+            if self._fw_digest is None:
+                self._fw_digest = fwrecord.file_digest(self._fw_fpath)
+
+            mcus_online = lambda: all(i2c.probe_address(addr) for addr in ebcommon.MCU_ADDRESS_MAP.values())
+            if not force and self._fw_record.matches(self._fw_digest) and mcus_online():
+                alog.info("Eyebrow MCUs already have this FW. Skipping the load.")
+                alog.update_counter(1, "fw-loads-skipped", alog.MetricSWCodePathSubmoduleOrder.COMMANDS_PROCESSED, unit=alog.MetricUnits.CALLS, description="Number of FW loads skipped because the MCUs already had the FW.", attributes={alog.KnownMetricAttributes.SUBMODULE: metrics.SubmoduleNames.FIRMWARE})
+                worked = self._check_mcu("left")
+                worked &= self._check_mcu("right")
+                self._update_firmware_status()
+                return worked
+            self._fw_record.clear()
+
+            if util.in_test_mode():
+                alog.test("Mocking MCU FW load.", tests=['eyebrows-driver-unit-tests:init-mcu'])
 
-        if util.in_test_mode():
-            alog.test("Mocking MCU FW load.", tests=['eyebrows-driver-unit-tests:init-mcu'])
+            # Use CAN to load the two FW files
+            # TODO
+            pass
 
-        # Use CAN to load the two FW files
-        # TODO
-        pass
+            # Reset the eyebrows
+            worked &= asc.reset(board.MCU_RESET_ADDR_RL_EYEBROWS, ipv6=self._ipv6)
+            writecache.invalidate_all()
 
-        # Reset the eyebrows
-        worked &= asc.reset(board.MCU_RESET_ADDR_RL_EYEBROWS, ipv6=self._ipv6)
-        time.sleep(0.1)  # Give it a moment to come back online
+            # Both MCUs come up at the same time; wait until both answer (or we give up on them)
+            if not util.poll_until(mcus_online, MCU_BOOT_TIMEOUT_S):
+                alog.warning(f"Eyebrow MCUs did not both answer within {MCU_BOOT_TIMEOUT_S}s of being reset.")
 
-        # Sanity check that both MCUs are present on the I2C bus
-        worked &= self._check_mcu("left")
-        worked &= self._check_mcu("right")
-        return worked
+            # Sanity check that both MCUs are present on the I2C bus
+            worked &= self._check_mcu("left")
+            worked &= self._check_mcu("right")
+            self._update_firmware_status()
+            if worked:
+                self._fw_record.save(self._fw_digest)
+            return worked
@@ -2,108 +2,123 @@
 All the code pertaining to the LCD submodule.
 """
 from . import ebcommon
+from . import metrics
+from .common import cmdtables
+from .common import writecache
 from artie_i2c import i2c
 from artie_util import artie_logging as alog
 from artie_util import constants
+from artie_util import statuspublisher
 from typing import List, Dict
-
-CMD_MODULE_ID_LCD = 0x40
+import threading
 
 class LcdSubmodule:
-    def __init__(self) -> None:
+    def __init__(self, status_publisher: statuspublisher.StatusPublisher) -> None:
         self._left_display_state = None
         self._right_display_state = None
 
-        self.left_display_status = constants.SubmoduleStatuses.UNKNOWN
-        self.right_display_status = constants.SubmoduleStatuses.UNKNOWN
-
-    def _set_status(self, side: str, status: constants.SubmoduleStatuses):
-        if side == 'left':
-            self.left_display_status = status
-        else:
-            self.right_display_status = status
+        self.left_display_status = constants.SubmoduleStatuses.INITIALIZING
+        self.right_display_status = constants.SubmoduleStatuses.INITIALIZING
 
-    def self_check(self):
-        # Store original values
-        left_display = self._left_display_state
-        right_display = self._right_display_state
+        # Each side has its own lock, so that commands to the two displays don't wait on each other.
+        # They are reentrant, so that self_check can hold them across the commands it makes.
+        self._locks = {side: threading.RLock() for side in ebcommon.MCU_ADDRESS_MAP}
 
-        # Initializing should set our statuses appropriately
-        alog.test("Checking LCD subsystem...", tests=['eyebrows-driver-unit-tests:self-check'])
-        self.initialize()
+        # Readers get this snapshot, which is replaced (never modified) whenever a status changes
+        self._status_lock = threading.Lock()
+        self._status_snapshot = self._make_status_snapshot()
 
-        # Set back to originals
-        if left_display is not None:
-            self.draw('left', left_display)
+        self._status_publisher = status_publisher
+        self._status_publisher.publish(self.status())
 
-        if right_display is not None:
-            self.draw('right', right_display)
+        self._write_cache = writecache.WriteCache(metrics.SubmoduleNames.LCD)
 
-    def status(self) -> Dict[str, str]:
+    def _make_status_snapshot(self) -> Dict[str, str]:
         return {
             "LCD-LEFT": self.left_display_status,
             "LCD-RIGHT": self.right_display_status,
         }
 
+    def _set_status(self, side: str, status: constants.SubmoduleStatuses):
+        with self._status_lock:
+            if side == 'left':
+                self.left_display_status = status
+            else:
+                self.right_display_status = status
+            self._status_snapshot = self._make_status_snapshot()
+            self._status_publisher.publish(self._status_snapshot)
+
+    def self_check(self):
+        # Hold both sides for the whole check, so that nobody draws in between
+        # our saving and restoring the displays
+        with self._locks['left'], self._locks['right']:
+            # Store original values
+            left_display = self._left_display_state
+            right_display = self._right_display_state
+
+            # Initializing should set our statuses appropriately (make sure it actually writes)
+            alog.test("Checking LCD subsystem...", tests=['eyebrows-driver-unit-tests:self-check'])
+            self._write_cache.invalidate()
+            self.initialize()
+
+            # Set back to originals
+            if left_display is not None:
+                self.draw('left', left_display)
+
+            if right_display is not None:
+                self.draw('right', right_display)
+
+    def status(self) -> Dict[str, str]:
+        """
+        Return the latest statuses. Do not modify the returned dict.
+        """
+        return self._status_snapshot
+
     def test(self, side: str) -> bool:
         alog.test(f"Received request for {side} LCD -> TEST.", tests=['eyebrows-driver-unit-tests:lcd-test'])
         address = ebcommon.get_address(side)
-        lcd_test_bytes = CMD_MODULE_ID_LCD | 0x11
-        wrote = i2c.write_bytes_to_address(address, lcd_test_bytes)
-        if side.lower() == 'left':
-            self._left_display_state = 'test'
-        else:
-            self._right_display_state = 'test'
-        self._set_status(side, constants.SubmoduleStatuses.WORKING if wrote else constants.SubmoduleStatuses.NOT_WORKING)
+        lcd_test_bytes = cmdtables.LCD_TEST
+        with self._locks[side]:
+            wrote = i2c.write_bytes_to_address(address, lcd_test_bytes)
+            self._write_cache.invalidate(address)
+            if side.lower() == 'left':
+                self._left_display_state = 'test'
+            else:
+                self._right_display_state = 'test'
+            self._set_status(side, constants.SubmoduleStatuses.WORKING if wrote else constants.SubmoduleStatuses.NOT_WORKING)
         return wrote
 
     def off(self, side: str) -> bool:
         alog.test(f"Received request for {side} LCD -> OFF.", tests=['eyebrows-driver-unit-tests:lcd-off'])
         address = ebcommon.get_address(side)
-        lcd_off_bytes = CMD_MODULE_ID_LCD | 0x22
-        wrote = i2c.write_bytes_to_address(address, lcd_off_bytes)
-        if side.lower() == 'left':
-            self._left_display_state = 'clear'
-        else:
-            self._right_display_state = 'clear'
-        self._set_status(side, constants.SubmoduleStatuses.WORKING if wrote else constants.SubmoduleStatuses.NOT_WORKING)
+        lcd_off_bytes = cmdtables.LCD_OFF
+        with self._locks[side]:
+            wrote = self._write_cache.write(address, lcd_off_bytes)
+            if side.lower() == 'left':
+                self._left_display_state = 'clear'
+            else:
+                self._right_display_state = 'clear'
+            self._set_status(side, constants.SubmoduleStatuses.WORKING if wrote else constants.SubmoduleStatuses.NOT_WORKING)
         return wrote
 
     def draw(self, side: str, eyebrow_state: List[str]) -> bool:
         alog.test(f"Received request for {side} LCD -> DRAW.", tests=['eyebrows-driver-unit-tests:lcd-draw'])
         address = ebcommon.get_address(side)
-        # An eyebrow state is encoded as follows:
-        # Six bits (3 msb, 3 lsb)
-        # The 3 lsb determine UP (1) or DOWN (0) for each of the three vertex pairs
-        # The 3 msb override the corresponding lsb to show MIDDLE if set.
-        # HOWEVER, if an msb is set, its corresponding lsb must be cleared, otherwise
-        # it is interpreted as one of the special LCD commands like OFF or TEST.
-        lsbs = [0, 0, 0]
-        msbs = [0, 0, 0]
-        for i, pos in enumerate(eyebrow_state):
-            if pos.startswith('H'):
-                msbs[i] = 0
-                lsbs[i] = 1
-            elif pos.startswith('L'):
-                msbs[i] = 0
-                lsbs[i] = 0
+        try:
+            lcd_draw_bytes = cmdtables.eyebrow_lcd_command(eyebrow_state)
+        except KeyError:
+            alog.error(f"Invalid eyebrow state: {eyebrow_state}. Need exactly three vertices, each one of 'H', 'M', or 'L'.")
+            return False
+
+        # Keep our own copy (the given list may be a netref to the client's list)
+        eyebrow_state = list(eyebrow_state)
+        with self._locks[side]:
+            wrote = self._write_cache.write(address, lcd_draw_bytes)
+            if side.lower() == 'left':
+                self._left_display_state = eyebrow_state
             else:
-                msbs[i] = 1
-                lsbs[i] = 0
-
-        eyebrow_state_bytes = 0x00
-        all = lsbs + msbs
-        for i in range(len(all)):
-            if all[i] == 1:
-                eyebrow_state_bytes |= (0x01 << i)
-
-        lcd_draw_bytes = CMD_MODULE_ID_LCD | eyebrow_state_bytes
-        wrote = i2c.write_bytes_to_address(address, lcd_draw_bytes)
-        if side.lower() == 'left':
-            self._left_display_state = eyebrow_state
-        else:
-            self._right_display_state = eyebrow_state
-        self._set_status(side, constants.SubmoduleStatuses.WORKING if wrote else constants.SubmoduleStatuses.NOT_WORKING)
+                self._right_display_state = eyebrow_state
+            self._set_status(side, constants.SubmoduleStatuses.WORKING if wrote else constants.SubmoduleStatuses.NOT_WORKING)
         return wrote
 
     def get(self, side: str) -> List[str]|str:
@@ -117,7 +132,7 @@ class LcdSubmodule:
         else:
             state = self._right_display_state
         alog.test(f"Received request for {side} eyebrow LCD -> State: {state}", tests=['eyebrows-driver-unit-tests:lcd-get'])
-        return state
+        return list(state) if isinstance(state, list) else state
 
     def initialize(self):
         worked = True
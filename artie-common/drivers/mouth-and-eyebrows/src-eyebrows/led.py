@@ -2,52 +2,80 @@
 Code pertaining to the LED Submodule.
 """
 from . import ebcommon
-from artie_i2c import i2c
+from . import metrics
+from .common import cmdtables
+from .common import writecache
 from artie_util import artie_logging as alog
 from artie_util import constants
+from artie_util import statuspublisher
 from typing import Dict
+import threading
 import time
 
-CMD_MODULE_ID_LEDS = 0x00
-
 class LedSubmodule:
-    def __init__(self) -> None:
+    def __init__(self, status_publisher: statuspublisher.StatusPublisher) -> None:
         self._left_led_state = None
         self._right_led_state = None
 
-        self.left_led_status = constants.SubmoduleStatuses.UNKNOWN
-        self.right_led_status = constants.SubmoduleStatuses.UNKNOWN
+        self.left_led_status = constants.SubmoduleStatuses.INITIALIZING
+        self.right_led_status = constants.SubmoduleStatuses.INITIALIZING
+
+        # Each side has its own lock, so that commands to the two LEDs don't wait on each other.
+        # They are reentrant, so that self_check can hold them across the commands it makes.
+        self._locks = {side: threading.RLock() for side in ebcommon.MCU_ADDRESS_MAP}
+
+        # Readers get this snapshot, which is replaced (never modified) whenever a status changes
+        self._status_lock = threading.Lock()
+        self._status_snapshot = self._make_status_snapshot()
+
+        self._status_publisher = status_publisher
+        self._status_publisher.publish(self.status())
+
+        self._write_cache = writecache.WriteCache(metrics.SubmoduleNames.LED)
 
     def _self_check_one_side(self, side: str):
-        prev_state = self._left_led_state if side == 'left' else self._right_led_state
-        self.on(side)
-        time.sleep(0.1)
-        self.off(side)
-        time.sleep(0.1)
-        match prev_state:
-            case 'on':
-                self.on(side)
-            case 'off':
-                self.off(side)
-            case 'heartbeat':
-                self.heartbeat(side)
+        # Hold this side for the whole check, so that nobody changes the LED
+        # in between our saving and restoring its state
+        with self._locks[side]:
+            prev_state = self._left_led_state if side == 'left' else self._right_led_state
+            self.on(side)
+            time.sleep(0.1)
+            self.off(side)
+            time.sleep(0.1)
+            match prev_state:
+                case 'on':
+                    self.on(side)
+                case 'off':
+                    self.off(side)
+                case 'heartbeat':
+                    self.heartbeat(side)
+
+    def _make_status_snapshot(self) -> Dict[str, str]:
+        return {
+            "LED-LEFT": self.left_led_status,
+            "LED-RIGHT": self.right_led_status,
+        }
 
     def _set_status(self, side: str, status: constants.SubmoduleStatuses):
-        if side == 'left':
-            self.left_led_status = status
-        else:
-            self.right_led_status = status
+        with self._status_lock:
+            if side == 'left':
+                self.left_led_status = status
+            else:
+                self.right_led_status = status
+            self._status_snapshot = self._make_status_snapshot()
+            self._status_publisher.publish(self._status_snapshot)
 
     def self_check(self):
         alog.test("Checking LED subsystem...", tests=['eyebrows-driver-unit-tests:self-check'])
+        self._write_cache.invalidate()
         self._self_check_one_side('left')
         self._self_check_one_side('right')
 
     def status(self) -> Dict[str, str]:
-        return {
-            "LED-LEFT": self.left_led_status,
-            "LED-RIGHT": self.right_led_status,
-        }
+        """
+        Return the latest statuses. Do not modify the returned dict.
+        """
+        return self._status_snapshot
 
     def initialize(self) -> bool:
         worked = True
@@ -58,37 +86,40 @@ class LedSubmodule:
     def on(self, side: str) -> bool:
         alog.test(f"Received request for {side} LED -> ON.", tests=['eyebrows-driver-unit-tests:led-on'])
         address = ebcommon.get_address(side)
-        led_on_bytes = CMD_MODULE_ID_LEDS | 0x00
-        wrote = i2c.write_bytes_to_address(address, led_on_bytes)
-        if side.lower() == 'left':
-            self._left_led_state = 'on'
-        else:
-            self._right_led_state = 'on'
-        self._set_status(side, constants.SubmoduleStatuses.WORKING if wrote else constants.SubmoduleStatuses.NOT_WORKING)
+        led_on_bytes = cmdtables.LED_COMMANDS["on"]
+        with self._locks[side]:
+            wrote = self._write_cache.write(address, led_on_bytes)
+            if side.lower() == 'left':
+                self._left_led_state = 'on'
+            else:
+                self._right_led_state = 'on'
+            self._set_status(side, constants.SubmoduleStatuses.WORKING if wrote else constants.SubmoduleStatuses.NOT_WORKING)
         return wrote
 
     def off(self, side: str) -> bool:
         alog.test(f"Received request for {side} LED -> OFF.", tests=['eyebrows-driver-unit-tests:led-off'])
         address = ebcommon.get_address(side)
-        led_on_bytes = CMD_MODULE_ID_LEDS | 0x01
-        wrote = i2c.write_bytes_to_address(address, led_on_bytes)
-        if side.lower() == 'left':
-            self._left_led_state = 'off'
-        else:
-            self._right_led_state = 'off'
-        self._set_status(side, constants.SubmoduleStatuses.WORKING if wrote else constants.SubmoduleStatuses.NOT_WORKING)
+        led_on_bytes = cmdtables.LED_COMMANDS["off"]
+        with self._locks[side]:
+            wrote = self._write_cache.write(address, led_on_bytes)
+            if side.lower() == 'left':
+                self._left_led_state = 'off'
+            else:
+                self._right_led_state = 'off'
+            self._set_status(side, constants.SubmoduleStatuses.WORKING if wrote else constants.SubmoduleStatuses.NOT_WORKING)
         return wrote
 
     def heartbeat(self, side: str) -> bool:
         alog.test(f"Received request for {side} LED -> HEARTBEAT.", tests=['eyebrows-driver-unit-tests:led-heartbeat'])
         address = ebcommon.get_address(side)
-        led_heartbeat_bytes = CMD_MODULE_ID_LEDS | 0x02
-        wrote = i2c.write_bytes_to_address(address, led_heartbeat_bytes)
-        if side.lower() == 'left':
-            self._left_led_state = 'heartbeat'
-        else:
-            self._right_led_state = 'heartbeat'
-        self._set_status(side, constants.SubmoduleStatuses.WORKING if wrote else constants.SubmoduleStatuses.NOT_WORKING)
+        led_heartbeat_bytes = cmdtables.LED_COMMANDS["heartbeat"]
+        with self._locks[side]:
+            wrote = self._write_cache.write(address, led_heartbeat_bytes)
+            if side.lower() == 'left':
+                self._left_led_state = 'heartbeat'
+            else:
+                self._right_led_state = 'heartbeat'
+            self._set_status(side, constants.SubmoduleStatuses.WORKING if wrote else constants.SubmoduleStatuses.NOT_WORKING)
         return wrote
 
     def get(self, side: str) -> str:
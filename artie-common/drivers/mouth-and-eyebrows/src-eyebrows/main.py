@@ -15,10 +15,13 @@ has access to CAN on the Controller Node.
 """
 from artie_i2c import i2c
 from artie_util import artie_logging as alog
+from artie_util import binrpc
+from artie_util import statuspublisher
 from artie_util import util
 from artie_util import rpycserver
 from typing import Dict, List
 from . import ebcommon
+from .common import keyframes
 from . import fw
 from . import lcd
 from . import led
@@ -26,6 +29,7 @@ from . import metrics
 from . import servo
 import argparse
 import rpyc
+import threading
 
 SERVICE_NAME = "eyebrows-service"
 
@@ -33,11 +37,19 @@ SERVICE_NAME = "eyebrows-service"
 @rpyc.service
 class DriverServer(rpycserver.Service):
     def __init__(self, fw_fpath: str, ipv6=False):
-        self._servo_submodule = servo.ServoSubmodule()
-        self._led_submodule = led.LedSubmodule()
-        self._lcd_submodule = lcd.LcdSubmodule()
-        self._fw_submodule = fw.FirmwareSubmodule(fw_fpath, ipv6=ipv6)
+        self._status_publisher = statuspublisher.StatusPublisher()
+        self._servo_submodule = servo.ServoSubmodule(self._status_publisher)
+        self._led_submodule = led.LedSubmodule(self._status_publisher)
+        self._lcd_submodule = lcd.LcdSubmodule(self._status_publisher)
+        self._fw_submodule = fw.FirmwareSubmodule(fw_fpath, self._status_publisher, ipv6=ipv6)
 
+        # Bring up the MCUs in the background, so that we can serve (and report
+        # our submodules as initializing) right away instead of after the whole sequence
+        threading.Thread(target=self._initialize, name="eyebrows-init", daemon=True).start()
+
+        self._sequencer = keyframes.Sequencer(self._timeline_actuators(), metrics.SubmoduleNames.SEQUENCER)
+
+    def _initialize(self):
         # Load FW
         self._fw_submodule.initialize_mcus()
 
@@ -45,6 +57,26 @@ class DriverServer(rpycserver.Service):
         self._led_submodule.initialize()
         self._lcd_submodule.initialize()
 
+    def _timeline_actuators(self) -> keyframes.ActuatorTable:
+        # `side` is keyword-only, so that a keyframe's extra arguments cannot override it
+        actuators = {}
+        for side in ('left', 'right'):
+            actuators[f"led-{side}"] = {
+                "on": lambda *, side=side: self._led_submodule.on(side),
+                "off": lambda *, side=side: self._led_submodule.off(side),
+                "heartbeat": lambda *, side=side: self._led_submodule.heartbeat(side),
+            }
+            actuators[f"lcd-{side}"] = {
+                "test": lambda *, side=side: self._lcd_submodule.test(side),
+                "off": lambda *, side=side: self._lcd_submodule.off(side),
+                "draw": lambda vertices, *, side=side: self._lcd_submodule.draw(side, list(vertices)),
+            }
+            actuators[f"servo-{side}"] = {
+                "go": lambda servo_degrees, *, side=side: self._servo_submodule.go(side, servo_degrees),
+                "move": lambda servo_degrees, duration_s, profile="min-jerk", *, side=side: self._servo_submodule.move(side, servo_degrees, duration_s=duration_s, profile=profile),
+            }
+        return actuators
+
     @rpyc.exposed
     @alog.function_counter("whoami", alog.MetricSWCodePathAPIOrder.CALLS)
     def whoami(self) -> str:
@@ -75,6 +107,29 @@ class DriverServer(rpycserver.Service):
         self._lcd_submodule.self_check()
         self._servo_submodule.self_check()
 
+    @rpyc.exposed
+    @alog.function_counter("subscribe_status", alog.MetricSWCodePathAPIOrder.CALLS)
+    def subscribe_status(self, callback) -> int:
+        """
+        Subscribe to this service's submodule statuses. `callback` is called with
+        a tuple of (submodule, status) pairs: first with every submodule's status, then
+        whenever any of them change. The caller must keep serving its connection
+        (e.g., with `rpyc.BgServingThread`) to receive the callbacks.
+
+        Returns
+        -------
+        The subscription ID, which can be passed to `unsubscribe_status`.
+        """
+        return self._status_publisher.subscribe(callback)
+
+    @rpyc.exposed
+    @alog.function_counter("unsubscribe_status", alog.MetricSWCodePathAPIOrder.CALLS)
+    def unsubscribe_status(self, subscription_id: int):
+        """
+        Cancel a subscription made with `subscribe_status`.
+        """
+        self._status_publisher.unsubscribe(subscription_id)
+
     @rpyc.exposed
     @alog.function_counter("led_on", alog.MetricSWCodePathAPIOrder.CALLS, attributes={alog.KnownMetricAttributes.SUBMODULE: metrics.SubmoduleNames.LED})
     def led_on(self, side: str) -> bool:
@@ -192,17 +247,21 @@ class DriverServer(rpycserver.Service):
 
     @rpyc.exposed
     @alog.function_counter("firmware_load", alog.MetricSWCodePathAPIOrder.CALLS, attributes={alog.KnownMetricAttributes.SUBMODULE: metrics.SubmoduleNames.FIRMWARE})
-    def firmware_load(self) -> bool:
+    def firmware_load(self, force=False) -> bool:
         """
         RPC method to (re)load the FW on both MCUs. This will also
         reinitialize the LCDs and LEDs.
 
+        Args
+        ----
+        - force: Load the FW even if the MCUs already have it.
+
         Returns
         -------
         bool: True if we do not detect an error. False otherwise.
         """
         alog.info("Reloading FW...")
-        worked = self._fw_submodule.initialize_mcus()
+        worked = self._fw_submodule.initialize_mcus(force=force)
 
         # Initialize
         worked &= self._led_submodule.initialize()
@@ -241,6 +300,60 @@ class DriverServer(rpycserver.Service):
         """
         return self._servo_submodule.go(side, servo_degrees)
 
+    @rpyc.exposed
+    @alog.function_counter("servo_move", alog.MetricSWCodePathAPIOrder.CALLS, attributes={alog.KnownMetricAttributes.SUBMODULE: metrics.SubmoduleNames.SERVO})
+    def servo_move(self, side: str, servo_degrees: float, duration_s: float = None, velocity_dps: float = None, profile: str = "min-jerk") -> bool:
+        """
+        RPC method to move the servo smoothly to the given location. The driver
+        generates the intermediate positions itself, so this returns as soon as the
+        move has started. A later call to `servo_go` or `servo_move` replaces the move.
+
+        Args
+        ----
+        - side: One of 'left' or 'right'
+        - servo_degrees: Any value in the interval [0, 180]
+        - duration_s: How long the move should take. Give either this or `velocity_dps`.
+        - velocity_dps: Average speed of the move in degrees per second. Give either this or `duration_s`.
+        - profile: One of 'linear', 'ease-in-out', or 'min-jerk'
+
+        Returns
+        -------
+        bool: True if the move was started. False if the arguments are invalid.
+        """
+        return self._servo_submodule.move(side, servo_degrees, duration_s, velocity_dps, profile)
+
+    @rpyc.exposed
+    @alog.function_counter("play_timeline", alog.MetricSWCodePathAPIOrder.CALLS, attributes={alog.KnownMetricAttributes.SUBMODULE: metrics.SubmoduleNames.SEQUENCER})
+    def play_timeline(self, timeline, start_at_s: float = None) -> bool:
+        """
+        RPC method to play a timed sequence of commands. The driver schedules
+        the keyframes itself, so the whole sequence takes only this one RPC.
+        Replaces whatever timeline is playing.
+
+        Args
+        ----
+        - timeline: A sequence of (time_s, actuator, command, *args) keyframes. See `keyframes` for details.
+                    Keyframes for actuators that are not ours are ignored.
+                    Our actuators are 'led-left'/'led-right' (on, off, heartbeat),
+                    'lcd-left'/'lcd-right' (test, off, draw(vertices)), and
+                    'servo-left'/'servo-right' (go(degrees), move(degrees, duration_s[, profile])).
+        - start_at_s: UNIX time at which to start. Give the mouth and eyebrow drivers the same
+                      value to play a timeline across both in sync. Default is now.
+
+        Returns
+        -------
+        bool: True if the timeline was started. False if it is malformed.
+        """
+        return self._sequencer.play(timeline, start_at_s)
+
+    @rpyc.exposed
+    @alog.function_counter("stop_timeline", alog.MetricSWCodePathAPIOrder.CALLS, attributes={alog.KnownMetricAttributes.SUBMODULE: metrics.SubmoduleNames.SEQUENCER})
+    def stop_timeline(self):
+        """
+        RPC method to stop the timeline that is playing, if any.
+        """
+        self._sequencer.stop()
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description=__doc__)
@@ -248,15 +361,14 @@ if __name__ == "__main__":
     parser.add_argument("--ipv6", action='store_true', help="Use IPv6 if given, otherwise IPv4.")
     parser.add_argument("-l", "--loglevel", type=str, default="info", choices=["debug", "info", "warning", "error"], help="The log level.")
     parser.add_argument("-p", "--port", type=int, default=18863, help="The port to bind for the RPC server.")
+    parser.add_argument("--binrpc-port", type=int, default=None, help="If given, also serve the binary (MsgPack) RPC transport on this port (e.g., 18873).")
     args = parser.parse_args()
 
     # Set up logging
     alog.init(SERVICE_NAME, args)
 
-    # Generate our self-signed certificate (if not already present)
-    certfpath = "/etc/cert.pem"
-    keyfpath = "/etc/pkey.pem"
-    util.generate_self_signed_cert(certfpath, keyfpath, days=None, force=True)
+    # Use the mounted certificate, or the one persisted from a previous start, or generate a new one
+    certfpath, keyfpath = util.provision_cert("/etc/artie-certs/cert.pem", "/etc/artie-certs/pkey.pem", days=None)
 
     # If we are in testing mode, we need to manually initialize some stuff
     if util.in_test_mode():
@@ -264,5 +376,7 @@ if __name__ == "__main__":
 
     # Instantiate the single (multi-tenant) server instance and block forever, serving
     server = DriverServer(args.fw_fpath, ipv6=args.ipv6)
+    if args.binrpc_port is not None:
+        binrpc.create_binrpc_server(server, keyfpath, certfpath, args.binrpc_port, ipv6=args.ipv6).start()
     t = util.create_rpc_server(server, keyfpath, certfpath, args.port, ipv6=args.ipv6)
     t.start()
@@ -0,0 +1,146 @@
+"""
+Driver-side motion engine for the eyebrow servos.
+
+A client asks for a target position plus a duration (or a velocity) and a profile,
+and the engine generates the intermediate setpoints on its own fixed-rate thread.
+Setpoints are quantized to what the servo can actually resolve, and a setpoint is
+only sent if its quantized value differs from the last one sent for that servo.
+"""
+from artie_util import artie_logging as alog
+from typing import Callable, Dict
+import math
+import threading
+import time
+
+# How often the motion thread computes new setpoints
+MOTION_RATE_HZ = 50
+
+def _linear(u: float) -> float:
+    return u
+
+def _ease_in_out(u: float) -> float:
+    return 0.5 - 0.5 * math.cos(math.pi * u)
+
+def _min_jerk(u: float) -> float:
+    return u * u * u * (10.0 - 15.0 * u + 6.0 * u * u)
+
+# Each profile maps normalized time in [0, 1] to normalized progress in [0, 1]
+PROFILES: Dict[str, Callable[[float], float]] = {
+    "linear": _linear,
+    "ease-in-out": _ease_in_out,
+    "min-jerk": _min_jerk,
+}
+
+class Trajectory:
+    """
+    A move from `start_degrees` to `target_degrees` over `duration_s` seconds,
+    starting at monotonic time `start_s`, following the given profile.
+    """
+    def __init__(self, start_degrees: float, target_degrees: float, duration_s: float, profile: str, start_s: float) -> None:
+        self.start_degrees = start_degrees
+        self.target_degrees = target_degrees
+        self.duration_s = duration_s
+        self.profile = PROFILES[profile]
+        self.start_s = start_s
+
+    def position(self, now_s: float) -> float:
+        if self.duration_s <= 0:
+            return self.target_degrees
+        u = min(max((now_s - self.start_s) / self.duration_s, 0.0), 1.0)
+        return self.start_degrees + (self.target_degrees - self.start_degrees) * self.profile(u)
+
+    def done(self, now_s: float) -> bool:
+        return now_s - self.start_s >= self.duration_s
+
+class MotionEngine:
+    """
+    Runs the active trajectories (one per servo) on a background thread.
+
+    Every setpoint is passed to `track(side, degrees)`. `quantize(degrees)` maps it to the value
+    that gets sent to the servo, and `write(side, quantized_value)` sends it, but only when
+    the quantized value changes. The thread sleeps while there is nothing to move.
+
+    `track` and `write` are called with the engine's lock held, so they must not call back
+    into the engine, and callers must not hold any lock that `write` takes while calling the engine.
+    """
+    def __init__(self, quantize: Callable[[float], int], write: Callable[[str, int], bool], track: Callable[[str, float], None], rate_hz=MOTION_RATE_HZ) -> None:
+        self._quantize = quantize
+        self._write = write
+        self._track = track
+        self._period_s = 1.0 / rate_hz
+        self._trajectories: Dict[str, Trajectory] = {}
+        self._last_values: Dict[str, int] = {}
+        # Bumped whenever a side's move is replaced or cancelled, so that we never send a stale setpoint
+        self._generations: Dict[str, int] = {}
+        self._cv = threading.Condition()
+        self._thread = None
+
+    def start(self, side: str, trajectory: Trajectory):
+        """
+        Start moving `side` along `trajectory`, replacing whatever move it was doing.
+        """
+        with self._cv:
+            self._trajectories[side] = trajectory
+            self._generations[side] = self._generations.get(side, 0) + 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="eyebrow-servo-motion", daemon=True)
+                self._thread.start()
+            self._cv.notify()
+
+    def cancel(self, side: str):
+        """
+        Stop moving `side` (e.g., because it was just told to jump somewhere).
+        """
+        with self._cv:
+            self._trajectories.pop(side, None)
+            self._generations[side] = self._generations.get(side, 0) + 1
+
+    def note_written(self, side: str, quantized_value: int):
+        """
+        Tell the engine that `quantized_value` was sent to `side` outside of the engine.
+        """
+        with self._cv:
+            self._last_values[side] = quantized_value
+
+    def is_moving(self, side: str) -> bool:
+        with self._cv:
+            return side in self._trajectories
+
+    def _run(self):
+        next_tick_s = time.monotonic()
+        while True:
+            with self._cv:
+                while not self._trajectories:
+                    self._cv.wait()
+                    next_tick_s = time.monotonic()
+
+                now_s = time.monotonic()
+                setpoints = {}
+                for side, trajectory in list(self._trajectories.items()):
+                    setpoints[side] = (trajectory.position(now_s), self._generations[side])
+                    if trajectory.done(now_s):
+                        del self._trajectories[side]
+
+            for side, (degrees, generation) in setpoints.items():
+                value = self._quantize(degrees)
+                # Check and write atomically, so that a move cancelled in the meantime can't sneak in one last write
+                with self._cv:
+                    if self._generations[side] != generation:
+                        continue
+                    self._track(side, degrees)
+                    if self._last_values.get(side, None) == value:
+                        continue
+                    try:
+                        if self._write(side, value):
+                            self._last_values[side] = value
+                    except Exception as e:
+                        alog.exception(f"Error while moving the {side} servo: ", e, stack_trace=True)
+
+            # Fixed rate: schedule off the previous tick rather than off of now, so we don't drift
+            next_tick_s += self._period_s
+            sleep_s = next_tick_s - time.monotonic()
+            if sleep_s > 0:
+                time.sleep(sleep_s)
+            else:
+                # We fell behind (e.g., slow I2C). Don't try to catch up with a burst of writes.
+                next_tick_s = time.monotonic()
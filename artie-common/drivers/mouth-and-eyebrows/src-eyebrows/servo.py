@@ -2,41 +2,71 @@
 Code pertaining to the servo submodule.
 """
 from . import ebcommon
+from . import motion
+from . import metrics
+from .common import cmdtables
+from .common import writecache
 from artie_util import artie_logging as alog
 from artie_util import constants
-from artie_i2c import i2c
+from artie_util import statuspublisher
 from typing import Dict
-import numpy as np
+import threading
+import time
 
-CMD_MODULE_ID_SERVO = 0x80
 
 class ServoSubmodule:
-    def __init__(self) -> None:
+    def __init__(self, status_publisher: statuspublisher.StatusPublisher) -> None:
         self._left_servo_degrees = 90.0
         self._right_servo_degrees = 90.0
 
-        self.left_servo_status = constants.SubmoduleStatuses.UNKNOWN
-        self.right_servo_status = constants.SubmoduleStatuses.UNKNOWN
+        self.left_servo_status = constants.SubmoduleStatuses.INITIALIZING
+        self.right_servo_status = constants.SubmoduleStatuses.INITIALIZING
+
+        # Each side has its own lock, so that the two servos don't wait on each other.
+        # The motion engine takes these while holding its own lock, so never call into the engine while holding one.
+        self._locks = {side: threading.RLock() for side in ebcommon.MCU_ADDRESS_MAP}
+
+        # Readers get this snapshot, which is replaced (never modified) whenever a status changes
+        self._status_lock = threading.Lock()
+        self._status_snapshot = self._make_status_snapshot()
+
+        self._status_publisher = status_publisher
+        self._status_publisher.publish(self.status())
+
+        self._write_cache = writecache.WriteCache(metrics.SubmoduleNames.SERVO)
+        self._motion_engine = motion.MotionEngine(cmdtables.servo_value, self._write_position, self._track_position)
+
+    def _make_status_snapshot(self) -> Dict[str, str]:
+        return {
+            "LEFT-SERVO": self.left_servo_status,
+            "RIGHT-SERVO": self.right_servo_status,
+        }
 
     def _set_status(self, side: str, status: constants.SubmoduleStatuses):
-        if side == 'left':
-            self.left_servo_status = status
-        else:
-            self.right_servo_status = status
+        with self._status_lock:
+            if side == 'left':
+                self.left_servo_status = status
+            else:
+                self.right_servo_status = status
+            self._status_snapshot = self._make_status_snapshot()
+            self._status_publisher.publish(self._status_snapshot)
 
     def self_check(self):
         # Go to our current position, which shouldn't really move the
         # servos, but should set our statuses appropriately in case we can't write to
         # the I2C bus.
+        # A servo that is in the middle of a move is already being written to, so leave it alone.
         alog.test("Checking servo subsystem...", tests=['eyebrows-driver-unit-tests:self-check'])
-        self.go('left', self._left_servo_degrees)
-        self.go('right', self._right_servo_degrees)
+        self._write_cache.invalidate()
+        for side in ('left', 'right'):
+            if not self._motion_engine.is_moving(side):
+                self.go(side, self._left_servo_degrees if side == 'left' else self._right_servo_degrees)
 
     def status(self) -> Dict[str, str]:
-        return {
-            "LEFT-SERVO": self.left_servo_status,
-            "RIGHT-SERVO": self.right_servo_status,
-        }
+        """
+        Return the latest statuses. Do not modify the returned dict.
+        """
+        return self._status_snapshot
 
     def get(self, side: str) -> float:
         side = side.lower()
@@ -51,6 +81,20 @@ class ServoSubmodule:
         alog.test(f"Received request for {side} servo position -> {degrees:0.2f}", tests=['eyebrows-driver-unit-tests:servo-get'])
         return degrees
 
+    def _track_position(self, side: str, servo_degrees: float):
+        if side == 'left':
+            self._left_servo_degrees = servo_degrees
+        else:
+            self._right_servo_degrees = servo_degrees
+
+    def _write_position(self, side: str, value: int) -> bool:
+        address = ebcommon.get_address(side)
+        servo_go_bytes = cmdtables.SERVO_COMMANDS[value]
+        with self._locks[side]:
+            wrote = self._write_cache.write(address, servo_go_bytes)
+            self._set_status(side, constants.SubmoduleStatuses.WORKING if wrote else constants.SubmoduleStatuses.NOT_WORKING)
+        return wrote
+
     def go(self, side: str, servo_degrees: float) -> bool:
         alog.test(f"Received request for {side} SERVO -> GO.", tests=['eyebrows-driver-unit-tests:servo-go'])
 
@@ -59,15 +103,48 @@ class ServoSubmodule:
             alog.error(errmsg)
             return False
 
-        address = ebcommon.get_address(side)
-        go_val_bytes = int(round(np.interp(servo_degrees, [0, 180], [0, 63]))) # map 0 to 180 into 0 to 63
-        go_val_bytes = 0b00000000 if go_val_bytes < 0b00000000 else go_val_bytes
-        go_val_bytes = 0b00111111 if go_val_bytes > 0b00111111 else go_val_bytes
-        servo_go_bytes = CMD_MODULE_ID_SERVO | go_val_bytes
-        wrote = i2c.write_bytes_to_address(address, servo_go_bytes)
-        if side.lower() == 'left':
-            self._left_servo_degrees = servo_degrees
-        else:
-            self._right_servo_degrees = servo_degrees
-        self._set_status(side, constants.SubmoduleStatuses.WORKING if wrote else constants.SubmoduleStatuses.NOT_WORKING)
+        side = side.lower()
+        ebcommon.get_address(side)  # Validate the side
+        value = cmdtables.servo_value(servo_degrees)
+        self._motion_engine.cancel(side)
+        with self._locks[side]:
+            wrote = self._write_position(side, value)
+            self._track_position(side, servo_degrees)
+        self._motion_engine.note_written(side, value)
         return wrote
+
+    def move(self, side: str, servo_degrees: float, duration_s: float = None, velocity_dps: float = None, profile="min-jerk") -> bool:
+        """
+        Move smoothly from the current position to `servo_degrees`, either over `duration_s` seconds
+        or at an average speed of `velocity_dps` degrees per second (give exactly one of the two),
+        following the given `profile` (see `motion.PROFILES`).
+
+        Returns as soon as the move has started. Return False if the arguments are invalid.
+        """
+        if servo_degrees < 0 or servo_degrees > 180:
+            alog.error(f"Need a servo value in range [0, 180] but got {servo_degrees}")
+            return False
+
+        if profile not in motion.PROFILES:
+            alog.error(f"Invalid motion profile '{profile}'. Choose from: {list(motion.PROFILES.keys())}")
+            return False
+
+        if (duration_s is None) == (velocity_dps is None):
+            alog.error(f"Need exactly one of duration_s and velocity_dps but got {duration_s} and {velocity_dps}")
+            return False
+
+        side = side.lower()
+        ebcommon.get_address(side)  # Validate the side
+        start_degrees = self._left_servo_degrees if side == 'left' else self._right_servo_degrees
+        if duration_s is None:
+            if velocity_dps <= 0:
+                alog.error(f"Need a positive velocity but got {velocity_dps}")
+                return False
+            duration_s = abs(servo_degrees - start_degrees) / velocity_dps
+        elif duration_s < 0:
+            alog.error(f"Need a non-negative duration but got {duration_s}")
+            return False
+
+        alog.info(f"Moving {side} servo from {start_degrees:0.2f} to {servo_degrees:0.2f} degrees over {duration_s:0.2f}s ({profile}).")
+        self._motion_engine.start(side, motion.Trajectory(start_degrees, servo_degrees, duration_s, profile, time.monotonic()))
+        return True
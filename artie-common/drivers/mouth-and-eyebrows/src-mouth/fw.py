@@ -1,62 +1,109 @@
 """
 Code pertaining to the FW subsystem.
 """
+from . import metrics
+from .common import fwrecord
+from .common import writecache
 from artie_i2c import i2c
 from artie_service_client import client as asc
 from artie_util import artie_logging as alog
 from artie_util import boardconfig_controller as board
 from artie_util import constants
+from artie_util import statuspublisher
 from artie_util import util
 import os
-import time
+import threading
+
+# How long we give the MCU to come back online after we reset it
+MCU_BOOT_TIMEOUT_S = 1.0
 
 class FirmwareSubmodule:
-    def __init__(self, fw_fpath: str, ipv6=False) -> None:
+    def __init__(self, fw_fpath: str, status_publisher: statuspublisher.StatusPublisher, ipv6=False) -> None:
         self._fw_fpath = fw_fpath
-        self._fw_status = constants.SubmoduleStatuses.UNKNOWN
+        self._fw_status = constants.SubmoduleStatuses.INITIALIZING
         self._ipv6 = ipv6
 
+        # The FW file's digest (computed the first time we need it) and the digest of what is on the MCU
+        self._fw_digest = None
+        self._fw_record = fwrecord.FirmwareRecord("mouth")
+
+        # Serializes loads and self checks, which both reset our view of the MCU
+        self._lock = threading.RLock()
+
+        # Readers get this snapshot, which is replaced (never modified) whenever the status changes
+        self._status_lock = threading.Lock()
+        self._status_snapshot = {"FW": self._fw_status}
+
+        self._status_publisher = status_publisher
+        self._status_publisher.publish(self.status())
+
     def _set_status(self, worked: bool):
-        if worked:
-            self._fw_status = constants.SubmoduleStatuses.WORKING
-        else:
-            self._fw_status = constants.SubmoduleStatuses.NOT_WORKING
+        with self._status_lock:
+            if worked:
+                self._fw_status = constants.SubmoduleStatuses.WORKING
+            else:
+                self._fw_status = constants.SubmoduleStatuses.NOT_WORKING
+            self._status_snapshot = {"FW": self._fw_status}
+            self._status_publisher.publish(self._status_snapshot)
 
     def status(self):
-        return {
-            "FW": self._fw_status
-        }
+        """
+        Return the latest status. Do not modify the returned dict.
+        """
+        return self._status_snapshot
 
     def self_check(self):
         alog.test("Checking FW subsystem...", tests=['mouth-driver-unit-tests:self-check'])
-        self._check_mcu()
+        with self._lock:
+            self._check_mcu()
 
-    def load(self) -> bool:
+    def load(self, force=False) -> bool:
         """
         Attempt to load the FW. Return True if we succeed. False if we fail.
+
+        If the MCU is up and already has this FW, there is nothing to do,
+        so we skip the load and the reset unless `force` is True.
         """
         alog.info("Loading FW...")
 
-        # Check that we have FW files
-        if not os.path.isfile(self._fw_fpath):
-            alog.error(f"Given a FW file path of {self._fw_fpath}, but it doesn't exist.")
-            return False
+        with self._lock:
+            # Check that we have FW files
+            if not os.path.isfile(self._fw_fpath):
+                alog.error(f"Given a FW file path of {self._fw_fpath}, but it doesn't exist.")
+                self._set_status(False)
+                return False
+
+            if self._fw_digest is None:
+                self._fw_digest = fwrecord.file_digest(self._fw_fpath)
+
+            if not force and self._fw_record.matches(self._fw_digest) and i2c.probe_address(board.I2C_ADDRESS_MOUTH_MCU):
+                alog.info("Mouth MCU already has this FW. Skipping the load.")
+                alog.update_counter(1, "fw-loads-skipped", alog.MetricSWCodePathSubmoduleOrder.COMMANDS_PROCESSED, unit=alog.MetricUnits.CALLS, description="Number of FW loads skipped because the MCU already had the FW.", attributes={alog.KnownMetricAttributes.SUBMODULE: metrics.SubmoduleNames.FIRMWARE})
+                self._set_status(True)
+                return True
+            self._fw_record.clear()
+
+            if util.in_test_mode():
+                alog.test("Mocking MCU FW load.", tests=['mouth-driver-unit-tests:init-mcu'])
 
-        if util.in_test_mode():
-            alog.test("Mocking MCU FW load.", tests=['mouth-driver-unit-tests:init-mcu'])
+            # Use CAN to load the FW file
+            # TODO
+            pass
 
-        # Use CAN to load the FW file
-        # TODO
-        pass
+            # Reset the MCU to start running the new FW
+            worked = asc.reset(board.MCU_RESET_ADDR_MOUTH, ipv6=self._ipv6)
+            writecache.invalidate_all()
 
-        # Reset the MCU to start running the new FW
-        worked = asc.reset(board.MCU_RESET_ADDR_MOUTH, ipv6=self._ipv6)
-        time.sleep(0.1)  # Give it a moment to come back online
+            # Wait for the MCU to come back online
+            if not util.poll_until(lambda: i2c.probe_address(board.I2C_ADDRESS_MOUTH_MCU), MCU_BOOT_TIMEOUT_S):
+                alog.warning(f"Mouth MCU did not answer within {MCU_BOOT_TIMEOUT_S}s of being reset.")
 
-        # Sanity check that the MCU is present on the I2C bus
-        worked &= self._check_mcu()
-        self._set_status(worked)
-        return worked
+            # Sanity check that the MCU is present on the I2C bus
+            worked &= self._check_mcu()
+            self._set_status(worked)
+            if worked:
+                self._fw_record.save(self._fw_digest)
+            return worked
 
     def _check_mcu(self) -> bool:
         """
@@ -1,65 +1,80 @@
 """
 All the code pertaining to the LCD Submodule.
 """
+from . import metrics
+from .common import cmdtables
+from .common import writecache
 from artie_i2c import i2c
 from artie_util import artie_logging as alog
 from artie_util import boardconfig_controller as board
 from artie_util import constants
+from artie_util import statuspublisher
+import threading
 
-CMD_MODULE_ID_LCD = 0x40
-
-MOUTH_DRAWING_CHOICES = {
-    "SMILE":        (CMD_MODULE_ID_LCD | 0x00),
-    "FROWN":        (CMD_MODULE_ID_LCD | 0x01),
-    "LINE":         (CMD_MODULE_ID_LCD | 0x02),
-    "SMIRK":        (CMD_MODULE_ID_LCD | 0x03),
-    "OPEN":         (CMD_MODULE_ID_LCD | 0x04),
-    "OPEN-SMILE":   (CMD_MODULE_ID_LCD | 0x05),
-    "ZIG-ZAG":      (CMD_MODULE_ID_LCD | 0x06),
-}
+MOUTH_DRAWING_CHOICES = cmdtables.MOUTH_DRAWING_CHOICES
 
 class LcdSubmodule:
-    def __init__(self) -> None:
+    def __init__(self, status_publisher: statuspublisher.StatusPublisher) -> None:
         self._current_display = None
-        self._lcd_status = constants.SubmoduleStatuses.UNKNOWN
+        self._lcd_status = constants.SubmoduleStatuses.INITIALIZING
+
+        # Serializes commands, so that state and status always match what we last sent.
+        # It is reentrant, so that self_check can hold it across the commands it makes.
+        self._lock = threading.RLock()
+
+        # Readers get this snapshot, which is replaced (never modified) whenever the status changes
+        self._status_lock = threading.Lock()
+        self._status_snapshot = {"LCD": self._lcd_status}
+
+        self._status_publisher = status_publisher
+        self._status_publisher.publish(self.status())
+        self._write_cache = writecache.WriteCache(metrics.SubmoduleNames.LCD)
 
     def _set_status(self, worked: bool):
-        if worked:
-            self._lcd_status = constants.SubmoduleStatuses.WORKING
-        else:
-            self._lcd_status = constants.SubmoduleStatuses.NOT_WORKING
+        with self._status_lock:
+            if worked:
+                self._lcd_status = constants.SubmoduleStatuses.WORKING
+            else:
+                self._lcd_status = constants.SubmoduleStatuses.NOT_WORKING
+            self._status_snapshot = {"LCD": self._lcd_status}
+            self._status_publisher.publish(self._status_snapshot)
 
     def status(self):
-        return {
-            "LCD": self._lcd_status
-        }
+        """
+        Return the latest status. Do not modify the returned dict.
+        """
+        return self._status_snapshot
 
     def self_check(self):
         alog.test("Checking LCD subsystem...", tests=['mouth-driver-unit-tests:self-check'])
-        # Get current value
-        prev_state = self._current_display
+        with self._lock:
+            # Get current value
+            prev_state = self._current_display
 
-        # Run test (which will set our status appropriately)
-        self.test()
+            # Run test (which will set our status appropriately)
+            self.test()
 
-        # Set back to previous value
-        if prev_state == "TALKING":
-            self.talk()
-        elif prev_state is not None:
-            self.draw(prev_state)
+            # Set back to previous value
+            if prev_state == "TALKING":
+                self.talk()
+            elif prev_state is not None:
+                self.draw(prev_state)
 
     def test(self) -> bool:
         alog.test("Received request for mouth LCD -> TEST.", tests=['mouth-driver-unit-tests:lcd-test'])
-        lcd_test_bytes = CMD_MODULE_ID_LCD | 0x11
-        worked = i2c.write_bytes_to_address(board.I2C_ADDRESS_MOUTH_MCU, lcd_test_bytes)
-        self._set_status(worked)
+        lcd_test_bytes = cmdtables.LCD_TEST
+        with self._lock:
+            worked = i2c.write_bytes_to_address(board.I2C_ADDRESS_MOUTH_MCU, lcd_test_bytes)
+            self._write_cache.invalidate()
+            self._set_status(worked)
         return worked
 
     def off(self) -> bool:
         alog.test("Received request for mouth LCD -> OFF.", tests=['mouth-driver-unit-tests:lcd-off'])
-        lcd_off_bytes = CMD_MODULE_ID_LCD | 0x22
-        worked = i2c.write_bytes_to_address(board.I2C_ADDRESS_MOUTH_MCU, lcd_off_bytes)
-        self._set_status(worked)
+        lcd_off_bytes = cmdtables.LCD_OFF
+        with self._lock:
+            worked = self._write_cache.write(board.I2C_ADDRESS_MOUTH_MCU, lcd_off_bytes)
+            self._set_status(worked)
         return worked
 
     def draw(self, val: str) -> bool:
@@ -72,9 +87,10 @@ class LcdSubmodule:
             alog.error(f"Cannot draw {val} - choose from: {MOUTH_DRAWING_CHOICES}")
             return False
 
-        worked = i2c.write_bytes_to_address(board.I2C_ADDRESS_MOUTH_MCU, lcd_draw_bytes)
-        self._current_display = val
-        self._set_status(worked)
+        with self._lock:
+            worked = self._write_cache.write(board.I2C_ADDRESS_MOUTH_MCU, lcd_draw_bytes)
+            self._current_display = val
+            self._set_status(worked)
         return worked
 
     def get(self) -> str:
@@ -83,8 +99,9 @@ class LcdSubmodule:
 
     def talk(self) -> bool:
         alog.test("Received request for mouth LCD -> Talking mode.", tests=['mouth-driver-unit-tests:lcd-draw-talk'])
-        lcd_talk_bytes = CMD_MODULE_ID_LCD | 0x07
-        worked = i2c.write_bytes_to_address(board.I2C_ADDRESS_MOUTH_MCU, lcd_talk_bytes)
-        self._current_display = "TALKING"
-        self._set_status(worked)
+        lcd_talk_bytes = cmdtables.MOUTH_TALK
+        with self._lock:
+            worked = self._write_cache.write(board.I2C_ADDRESS_MOUTH_MCU, lcd_talk_bytes)
+            self._current_display = "TALKING"
+            self._set_status(worked)
         return worked
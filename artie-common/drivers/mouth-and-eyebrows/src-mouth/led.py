@@ -1,72 +1,95 @@
 """
 Code pertaining to the LED subsystem.
 """
-from artie_i2c import i2c
+from . import metrics
+from .common import cmdtables
+from .common import writecache
 from artie_util import artie_logging as alog
 from artie_util import boardconfig_controller as board
 from artie_util import constants
+from artie_util import statuspublisher
+import threading
 import time
 
-CMD_MODULE_ID_LEDS = 0x00
-
 class LedSubmodule:
-    def __init__(self) -> None:
+    def __init__(self, status_publisher: statuspublisher.StatusPublisher) -> None:
         self._led_state = None
-        self._led_status = constants.SubmoduleStatuses.UNKNOWN
+        self._led_status = constants.SubmoduleStatuses.INITIALIZING
+
+        # Serializes commands, so that state and status always match what we last sent.
+        # It is reentrant, so that self_check can hold it across the commands it makes.
+        self._lock = threading.RLock()
+
+        # Readers get this snapshot, which is replaced (never modified) whenever the status changes
+        self._status_lock = threading.Lock()
+        self._status_snapshot = {"LED": self._led_status}
+
+        self._status_publisher = status_publisher
+        self._status_publisher.publish(self.status())
+        self._write_cache = writecache.WriteCache(metrics.SubmoduleNames.LED)
 
     def _set_status(self, worked: bool):
-        if worked:
-            self._led_status = constants.SubmoduleStatuses.WORKING
-        else:
-            self._led_status = constants.SubmoduleStatuses.NOT_WORKING
+        with self._status_lock:
+            if worked:
+                self._led_status = constants.SubmoduleStatuses.WORKING
+            else:
+                self._led_status = constants.SubmoduleStatuses.NOT_WORKING
+            self._status_snapshot = {"LED": self._led_status}
+            self._status_publisher.publish(self._status_snapshot)
 
     def status(self):
-        return {
-            "LED": self._led_status
-        }
+        """
+        Return the latest status. Do not modify the returned dict.
+        """
+        return self._status_snapshot
 
     def self_check(self):
         alog.test("Checking LED subsystem...", tests=['mouth-driver-unit-tests:self-check'])
-        # Store previous state
-        prev_state = self._led_state
+        with self._lock:
+            self._write_cache.invalidate()
+            # Store previous state
+            prev_state = self._led_state
 
-        # Turn on, then off
-        self.on()
-        time.sleep(0.1)
-        self.off()
-        time.sleep(0.1)
+            # Turn on, then off
+            self.on()
+            time.sleep(0.1)
+            self.off()
+            time.sleep(0.1)
 
-        # Set back to previous state
-        match prev_state:
-            case 'on':
-                self.on()
-            case 'off':
-                self.off()
-            case 'heartbeat':
-                self.heartbeat()
+            # Set back to previous state
+            match prev_state:
+                case 'on':
+                    self.on()
+                case 'off':
+                    self.off()
+                case 'heartbeat':
+                    self.heartbeat()
 
     def on(self) -> bool:
         alog.test("Received request for mouth LED -> ON.", tests=['mouth-driver-unit-tests:led-on'])
-        led_on_bytes = CMD_MODULE_ID_LEDS | 0x00
-        worked = i2c.write_bytes_to_address(board.I2C_ADDRESS_MOUTH_MCU, led_on_bytes)
-        self._led_state = 'on'
-        self._set_status(worked)
+        led_on_bytes = cmdtables.LED_COMMANDS["on"]
+        with self._lock:
+            worked = self._write_cache.write(board.I2C_ADDRESS_MOUTH_MCU, led_on_bytes)
+            self._led_state = 'on'
+            self._set_status(worked)
         return worked
 
     def off(self) -> bool:
         alog.test("Received request for mouth LED -> OFF.", tests=['mouth-driver-unit-tests:led-off'])
-        led_on_bytes = CMD_MODULE_ID_LEDS | 0x01
-        worked = i2c.write_bytes_to_address(board.I2C_ADDRESS_MOUTH_MCU, led_on_bytes)
-        self._led_state = 'off'
-        self._set_status(worked)
+        led_on_bytes = cmdtables.LED_COMMANDS["off"]
+        with self._lock:
+            worked = self._write_cache.write(board.I2C_ADDRESS_MOUTH_MCU, led_on_bytes)
+            self._led_state = 'off'
+            self._set_status(worked)
         return worked
 
     def heartbeat(self) -> bool:
         alog.test("Received request for mouth LED -> HEARTBEAT.", tests=['mouth-driver-unit-tests:led-heartbeat'])
-        led_heartbeat_bytes = CMD_MODULE_ID_LEDS | 0x02
-        worked = i2c.write_bytes_to_address(board.I2C_ADDRESS_MOUTH_MCU, led_heartbeat_bytes)
-        self._led_state = 'heartbeat'
-        self._set_status(worked)
+        led_heartbeat_bytes = cmdtables.LED_COMMANDS["heartbeat"]
+        with self._lock:
+            worked = self._write_cache.write(board.I2C_ADDRESS_MOUTH_MCU, led_heartbeat_bytes)
+            self._led_state = 'heartbeat'
+            self._set_status(worked)
         return worked
 
     def get(self) -> str:
@@ -15,25 +15,49 @@ on the Controller Node.
 from artie_i2c import i2c
 from artie_util import boardconfig_controller as board
 from artie_util import artie_logging as alog
+from artie_util import binrpc
 from artie_util import rpycserver
+from artie_util import statuspublisher
 from artie_util import util
 from typing import Dict
+from .common import keyframes
 from . import fw
 from . import lcd
 from . import led
 from . import metrics
 import argparse
 import rpyc
+import threading
 
 SERVICE_NAME = "mouth-driver"
 
 @rpyc.service
 class DriverServer(rpycserver.Service):
     def __init__(self, fw_fpath: str, ipv6=False):
-        self._fw_submodule = fw.FirmwareSubmodule(fw_fpath, ipv6=ipv6)
-        self._led_submodule = led.LedSubmodule()
-        self._lcd_submodule = lcd.LcdSubmodule()
-
+        self._status_publisher = statuspublisher.StatusPublisher()
+        self._fw_submodule = fw.FirmwareSubmodule(fw_fpath, self._status_publisher, ipv6=ipv6)
+        self._led_submodule = led.LedSubmodule(self._status_publisher)
+        self._lcd_submodule = lcd.LcdSubmodule(self._status_publisher)
+
+        # Bring up the MCU in the background, so that we can serve (and report
+        # our submodules as initializing) right away instead of after the whole sequence
+        threading.Thread(target=self._initialize, name="mouth-init", daemon=True).start()
+
+        self._sequencer = keyframes.Sequencer({
+            "led": {
+                "on": self._led_submodule.on,
+                "off": self._led_submodule.off,
+                "heartbeat": self._led_submodule.heartbeat,
+            },
+            "lcd": {
+                "test": self._lcd_submodule.test,
+                "off": self._lcd_submodule.off,
+                "draw": self._lcd_submodule.draw,
+                "talk": self._lcd_submodule.talk,
+            },
+        }, metrics.SubmoduleNames.SEQUENCER)
+
+    def _initialize(self):
         # Load the FW file
         self._fw_submodule.load()
 
@@ -72,6 +96,29 @@ class DriverServer(rpycserver.Service):
         self._led_submodule.self_check()
         self._lcd_submodule.self_check()
 
+    @rpyc.exposed
+    @alog.function_counter("subscribe_status", alog.MetricSWCodePathAPIOrder.CALLS)
+    def subscribe_status(self, callback) -> int:
+        """
+        Subscribe to this service's submodule statuses. `callback` is called with
+        a tuple of (submodule, status) pairs: first with every submodule's status, then
+        whenever any of them change. The caller must keep serving its connection
+        (e.g., with `rpyc.BgServingThread`) to receive the callbacks.
+
+        Returns
+        -------
+        The subscription ID, which can be passed to `unsubscribe_status`.
+        """
+        return self._status_publisher.subscribe(callback)
+
+    @rpyc.exposed
+    @alog.function_counter("unsubscribe_status", alog.MetricSWCodePathAPIOrder.CALLS)
+    def unsubscribe_status(self, subscription_id: int):
+        """
+        Cancel a subscription made with `subscribe_status`.
+        """
+        self._status_publisher.unsubscribe(subscription_id)
+
     @rpyc.exposed
     @alog.function_counter("led_on", alog.MetricSWCodePathAPIOrder.CALLS, attributes={alog.KnownMetricAttributes.SUBMODULE: metrics.SubmoduleNames.LED})
     def led_on(self) -> bool:
@@ -181,17 +228,21 @@ class DriverServer(rpycserver.Service):
 
     @rpyc.exposed
     @alog.function_counter("firmware_load", alog.MetricSWCodePathAPIOrder.CALLS, attributes={alog.KnownMetricAttributes.SUBMODULE: metrics.SubmoduleNames.FIRMWARE})
-    def firmware_load(self):
+    def firmware_load(self, force=False):
         """
         RPC method to (re)load the FW on the mouth MCU.
         This will also reinitialize the LED and LCD.
 
+        Args
+        ----
+        - force: Load the FW even if the MCU already has it.
+
         Returns
         ----
         True if it worked. False otherwise.
 
         """
-        worked = self._fw_submodule.load()
+        worked = self._fw_submodule.load(force=force)
 
         # Set up the starting display
         self.lcd_draw("SMILE")
@@ -201,6 +252,36 @@ class DriverServer(rpycserver.Service):
 
         return worked
 
+    @rpyc.exposed
+    @alog.function_counter("play_timeline", alog.MetricSWCodePathAPIOrder.CALLS, attributes={alog.KnownMetricAttributes.SUBMODULE: metrics.SubmoduleNames.SEQUENCER})
+    def play_timeline(self, timeline, start_at_s: float = None) -> bool:
+        """
+        RPC method to play a timed sequence of commands. The driver schedules
+        the keyframes itself, so the whole sequence takes only this one RPC.
+        Replaces whatever timeline is playing.
+
+        Args
+        ----
+        - timeline: A sequence of (time_s, actuator, command, *args) keyframes. See `keyframes` for details.
+                    Keyframes for actuators that are not ours are ignored.
+                    Our actuators are 'led' (on, off, heartbeat) and 'lcd' (test, off, draw(val), talk).
+        - start_at_s: UNIX time at which to start. Give the mouth and eyebrow drivers the same
+                      value to play a timeline across both in sync. Default is now.
+
+        Returns
+        -------
+        bool: True if the timeline was started. False if it is malformed.
+        """
+        return self._sequencer.play(timeline, start_at_s)
+
+    @rpyc.exposed
+    @alog.function_counter("stop_timeline", alog.MetricSWCodePathAPIOrder.CALLS, attributes={alog.KnownMetricAttributes.SUBMODULE: metrics.SubmoduleNames.SEQUENCER})
+    def stop_timeline(self):
+        """
+        RPC method to stop the timeline that is playing, if any.
+        """
+        self._sequencer.stop()
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description=__doc__)
@@ -208,15 +289,14 @@ if __name__ == "__main__":
     parser.add_argument("--ipv6", action='store_true', help="Use IPv6 if given, otherwise IPv4.")
     parser.add_argument("-l", "--loglevel", type=str, default="info", choices=["debug", "info", "warning", "error"], help="The log level.")
     parser.add_argument("-p", "--port", type=int, default=18862, help="The port to bind for the RPC server.")
+    parser.add_argument("--binrpc-port", type=int, default=None, help="If given, also serve the binary (MsgPack) RPC transport on this port (e.g., 18872).")
     args = parser.parse_args()
 
     # Set up logging
     alog.init(SERVICE_NAME, args)
 
-    # Generate our self-signed certificate (if not already present)
-    certfpath = "/etc/cert.pem"
-    keyfpath = "/etc/pkey.pem"
-    util.generate_self_signed_cert(certfpath, keyfpath, days=None, force=True)
+    # Use the mounted certificate, or the one persisted from a previous start, or generate a new one
+    certfpath, keyfpath = util.provision_cert("/etc/artie-certs/cert.pem", "/etc/artie-certs/pkey.pem", days=None)
 
     # If we are in testing mode, we need to manually initialize some stuff
     if util.in_test_mode():
@@ -224,5 +304,7 @@ if __name__ == "__main__":
 
     # Instantiate the single (multi-tenant) server instance and block forever, serving
     server = DriverServer(args.fw_fpath, ipv6=args.ipv6)
+    if args.binrpc_port is not None:
+        binrpc.create_binrpc_server(server, keyfpath, certfpath, args.binrpc_port, ipv6=args.ipv6).start()
     t = util.create_rpc_server(server, keyfpath, certfpath, args.port, ipv6=args.ipv6)
     t.start()
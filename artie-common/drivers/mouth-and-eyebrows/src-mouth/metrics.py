@@ -9,3 +9,4 @@ class SubmoduleNames(enum.StrEnum):
     LED = "led"
     LCD = "lcd"
     FIRMWARE = "fw"
+    SEQUENCER = "sequencer"
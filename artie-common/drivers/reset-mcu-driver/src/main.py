@@ -13,19 +13,25 @@ This driver must be run on a node with CAN access.
 from artie_gpio import gpio
 from artie_i2c import i2c
 from artie_util import artie_logging as alog
+from artie_util import binrpc
 from artie_util import boardconfig_controller as board
 from artie_util import constants
 from artie_util import rpycserver
+from artie_util import statuspublisher
 from artie_util import util
 from typing import Dict
 import argparse
 import datetime
 import os
 import rpyc
+import threading
 import time
 
 SERVICE_NAME = "reset-driver"
 
+# How long we give the reset MCU to come back online after we reset it
+MCU_BOOT_TIMEOUT_S = 2.0
+
 @rpyc.service
 class ResetMcuDriver(rpycserver.Service):
     """
@@ -40,14 +46,18 @@ class ResetMcuDriver(rpycserver.Service):
         super().__init__()
         self._fw_fpath = fw_fpath
         self._reset_pin = board.RESET_RESET
-        self._mcu_status = constants.SubmoduleStatuses.UNKNOWN
+        self._mcu_status = constants.SubmoduleStatuses.INITIALIZING
+        self._status_publisher = statuspublisher.StatusPublisher()
+        self._status_publisher.publish({"MCU": self._mcu_status})
 
         # Initialize GPIO
         gpio.setup(self._reset_pin, gpio.OUT)
         gpio.output(self._reset_pin, gpio.LOW)
 
         # Initialize the MCU (load firmware and check that the MCU is present on the I2C bus)
-        self._init_mcu()
+        # in the background, so that we can start serving right away. Resets wait for it to finish.
+        self._mcu_initialized = threading.Event()
+        threading.Thread(target=self._init_mcu, name="reset-mcu-init", daemon=True).start()
 
     def _check_mcu(self):
         """
@@ -60,12 +70,22 @@ class ResetMcuDriver(rpycserver.Service):
             self._mcu_status = constants.SubmoduleStatuses.NOT_WORKING
         else:
             self._mcu_status = constants.SubmoduleStatuses.WORKING
+        self._status_publisher.publish({"MCU": self._mcu_status})
 
     def _init_mcu(self):
         """
-        Attempt to initialize the reset MCU on the i2c bus. Raise an exception
-        if something goes wrong.
+        Attempt to initialize the reset MCU on the i2c bus, then set our status accordingly.
         """
+        try:
+            self._bring_up_mcu()
+        except Exception as e:
+            alog.exception("Could not initialize the reset MCU: ", e, stack_trace=True)
+            self._mcu_status = constants.SubmoduleStatuses.NOT_WORKING
+            self._status_publisher.publish({"MCU": self._mcu_status})
+        finally:
+            self._mcu_initialized.set()
+
+    def _bring_up_mcu(self):
         if not os.path.isfile(self._fw_fpath):
             msg = f"Cannot find FW at specified fpath: {self._fw_fpath}"
             alog.error(msg)
@@ -82,7 +102,10 @@ class ResetMcuDriver(rpycserver.Service):
         gpio.output(self._reset_pin, gpio.HIGH)
         time.sleep(0.1)  # Give it a moment to reset
         gpio.output(self._reset_pin, gpio.LOW)
-        time.sleep(1)    # Give the MCU a moment to come back online
+
+        # Wait for the MCU to come back online
+        if not util.poll_until(lambda: i2c.probe_address(board.I2C_ADDRESS_RESET_MCU), MCU_BOOT_TIMEOUT_S):
+            alog.warning(f"Reset MCU did not answer within {MCU_BOOT_TIMEOUT_S}s of being reset.")
 
         # Sanity check that the MCU is present on the I2C bus and set status
         self._check_mcu()
@@ -118,27 +141,65 @@ class ResetMcuDriver(rpycserver.Service):
         alog.test("Running self check...", tests=['reset-driver-unit-tests:self-check'])
         self._check_mcu()
 
+    @rpyc.exposed
+    @alog.function_counter("subscribe_status", alog.MetricSWCodePathAPIOrder.CALLS)
+    def subscribe_status(self, callback) -> int:
+        """
+        Subscribe to this service's submodule statuses. `callback` is called with
+        a tuple of (submodule, status) pairs: first with every submodule's status, then
+        whenever any of them change. The caller must keep serving its connection
+        (e.g., with `rpyc.BgServingThread`) to receive the callbacks.
+
+        Returns
+        -------
+        The subscription ID, which can be passed to `unsubscribe_status`.
+        """
+        return self._status_publisher.subscribe(callback)
+
+    @rpyc.exposed
+    @alog.function_counter("unsubscribe_status", alog.MetricSWCodePathAPIOrder.CALLS)
+    def unsubscribe_status(self, subscription_id: int):
+        """
+        Cancel a subscription made with `subscribe_status`.
+        """
+        self._status_publisher.unsubscribe(subscription_id)
+
     @rpyc.exposed
     @alog.function_counter("reset_target", alog.MetricSWCodePathAPIOrder.CALLS)
     def reset_target(self, addr) -> bool:
         """
-        Attempts to reset the device at the given `addr`. See boardconfig_controller.py for the
+        Attempts to reset the device at the given `addr`, or every device in it if `addr` is a list
+        (or tuple) of addresses, in a single I2C transaction. See boardconfig_controller.py for the
         list of valid addresses. Returns `True` if we think we succeeded, otherwise `False`
         and we log whatever error we encountered.
         """
-        if addr == board.MCU_RESET_BROADCAST:
+        # Each byte we write to the reset MCU is an address to reset; duplicates would just reset a device twice
+        targets = [addr] if isinstance(addr, int) else list(dict.fromkeys(int(a) for a in addr))
+        if not targets:
+            return True
+        elif board.MCU_RESET_BROADCAST in targets:
+            targets = [board.MCU_RESET_BROADCAST]
+
+        if targets == [board.MCU_RESET_BROADCAST]:
             alog.test("Resetting ALL MCU-class devices", tests=['reset-all-mcus'])
 
+        # We serve while the MCU is still coming up; don't send it anything until it is done
+        if not self._mcu_initialized.wait(timeout=MCU_BOOT_TIMEOUT_S + 1.0):
+            alog.warning("Reset MCU is still initializing. Trying the reset anyway.")
+
+        target_str = hex(targets[0]) if len(targets) == 1 else str([hex(a) for a in targets])
         ts = datetime.datetime.now().timestamp()
         try:
-            alog.test(f"Writing {hex(addr)} to {hex(board.I2C_ADDRESS_RESET_MCU)}", tests=['reset-single-mcu', '*-hardware-tests:init-mcu', '*-hardware-tests:fw-load'])
-            i2c.write_bytes_to_address(board.I2C_ADDRESS_RESET_MCU, [addr])
+            alog.test(f"Writing {target_str} to {hex(board.I2C_ADDRESS_RESET_MCU)}", tests=['reset-single-mcu', '*-hardware-tests:init-mcu', '*-hardware-tests:fw-load'])
+            worked = i2c.write_bytes_to_address(board.I2C_ADDRESS_RESET_MCU, targets)
         except Exception as e:
-            alog.exception(f"Could not reset target {addr}", e, stack_trace=True)
+            alog.exception(f"Could not reset target {target_str}", e, stack_trace=True)
             return False
         duration_s = datetime.datetime.now().timestamp() - ts
-        alog.update_histogram(duration_s, "adc-reset", alog.MetricSWCodePathAPIOrder.LATENCY, unit=alog.MetricUnits.SECONDS, description="Durations of reset calls over the network.", attributes={"target_addr": hex(addr), alog.KnownMetricAttributes.FUNCTION_NAME: "reset_target"})
-        return True
+        alog.update_histogram(duration_s, "adc-reset", alog.MetricSWCodePathAPIOrder.LATENCY, unit=alog.MetricUnits.SECONDS, description="Durations of reset calls over the network.", attributes={"target_addr": ",".join(hex(a) for a in targets), alog.KnownMetricAttributes.FUNCTION_NAME: "reset_target"})
+        if not worked:
+            alog.error(f"Could not write reset target {target_str} to the reset MCU.")
+        return worked
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description=__doc__)
@@ -146,15 +207,14 @@ if __name__ == "__main__":
     parser.add_argument("--ipv6", action='store_true', help="Use IPv6 if given, otherwise IPv4.")
     parser.add_argument("-l", "--loglevel", type=str, default="info", choices=["debug", "info", "warning", "error"], help="The log level.")
     parser.add_argument("-p", "--port", type=int, default=18861, help="The port to bind for the RPC server.")
+    parser.add_argument("--binrpc-port", type=int, default=None, help="If given, also serve the binary (MsgPack) RPC transport on this port (e.g., 18871).")
     args = parser.parse_args()
 
     # Set up logging
     alog.init(SERVICE_NAME, args)
 
-    # Generate our self-signed certificate (if not already present)
-    certfpath = "/etc/cert.pem"
-    keyfpath = "/etc/pkey.pem"
-    util.generate_self_signed_cert(certfpath, keyfpath, days=None, force=True)
+    # Use the mounted certificate, or the one persisted from a previous start, or generate a new one
+    certfpath, keyfpath = util.provision_cert("/etc/artie-certs/cert.pem", "/etc/artie-certs/pkey.pem", days=None)
 
     # If we are in testing mode, we need to manually initialize some stuff
     if util.in_test_mode():
@@ -162,5 +222,7 @@ if __name__ == "__main__":
 
     # Instantiate the single (multi-tenant) server instance and block forever, serving
     server = ResetMcuDriver(args.fw_fpath)
+    if args.binrpc_port is not None:
+        binrpc.create_binrpc_server(server, keyfpath, certfpath, args.binrpc_port, ipv6=args.ipv6).start()
     t = util.create_rpc_server(server, keyfpath, certfpath, args.port, ipv6=args.ipv6)
     t.start()
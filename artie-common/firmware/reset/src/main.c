@@ -47,5 +47,6 @@ int main()
         // TODO
         // Contract is this:
         //      Controller Module tells us who to reset, then we handle the reset logic asynchronously.
+        //      Each byte of an I2C write is one reset address, so a multi-byte write resets several targets.
     }
 }
@@ -15,9 +15,16 @@ def _send_to_leddaemon(cmd: str):
 
     s = socket.socket(family=socket.AF_UNIX)
     s.connect("/tmp/leddaemonconnection")
-    s.send(cmd.encode())
+    s.sendall(cmd.encode() + b"\n")
+    reply = s.makefile('r').readline().strip()
     s.close()
 
+    status, _, detail = reply.partition(" ")
+    if status != "ok":
+        print(f"LED daemon: {detail or 'no reply'}")
+        exit(errno.EINVAL)
+    return detail
+
 def _cmd_led_on(args):
     _send_to_leddaemon("on")
 
@@ -27,6 +34,15 @@ def _cmd_led_off(args):
 def _cmd_led_heartbeat(args):
     _send_to_leddaemon("heartbeat")
 
+def _cmd_led_get(args):
+    print(_send_to_leddaemon("get"))
+
+def _cmd_led_blink(args):
+    _send_to_leddaemon(f"blink {args.code}")
+
+def _cmd_led_fade(args):
+    _send_to_leddaemon(f"fade-{args.direction}")
+
 def _cmd_i2c_list(args):
     if i2c is None:
         print("No i2c bus available. This command is meant to be run only from the controller node locally.")
@@ -80,6 +96,20 @@ def _fill_led_subparser(parser: argparse.ArgumentParser, parent: argparse.Argume
     p = subparsers.add_parser("heartbeat", help="[Controller Node locally only] Turn LED to heartbeat mode.", parents=[option_parser])
     p.set_defaults(cmd=_cmd_led_heartbeat)
 
+    ## 'get' command
+    p = subparsers.add_parser("get", help="[Controller Node locally only] Print the LED's current pattern.", parents=[option_parser])
+    p.set_defaults(cmd=_cmd_led_get)
+
+    ## 'blink' command
+    p = subparsers.add_parser("blink", help="[Controller Node locally only] Blink the LED N times, pause, and repeat (e.g., to show an error code).", parents=[option_parser])
+    p.add_argument("code", type=int, choices=range(1, 10), help="How many times to blink before each pause.")
+    p.set_defaults(cmd=_cmd_led_blink)
+
+    ## 'fade' command
+    p = subparsers.add_parser("fade", help="[Controller Node locally only] Fade the LED on or off.", parents=[option_parser])
+    p.add_argument("direction", choices=("on", "off"), help="Whether to fade on or off.")
+    p.set_defaults(cmd=_cmd_led_fade)
+
 def _fill_i2c_subparser(parser: argparse.ArgumentParser, parent: argparse.ArgumentParser):
     subparsers = parser.add_subparsers(title="i2c", description="The i2c subsystem")
 
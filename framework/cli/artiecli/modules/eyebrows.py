@@ -164,7 +164,7 @@ def _check_servo_range(arg):
 #########################################################################################
 def _cmd_firmware_load(args):
     client = _connect_client(args)
-    common.format_print_result(client.firmware_load(), "eyebrows", "FW", args.artie_id)
+    common.format_print_result(client.firmware_load(force=args.force), "eyebrows", "FW", args.artie_id)
 
 #########################################################################################
 ################################# Status Commands #######################################
@@ -208,6 +208,7 @@ def _fill_fw_subparser(parser: argparse.ArgumentParser, parent: argparse.Argumen
 
     # Load command
     p = subparsers.add_parser("load", help="(Re)load the firmware. Targets both sides at once.", parents=[option_parser])
+    p.add_argument("--force", action='store_true', help="Load the firmware even if the MCU already has it.")
     p.set_defaults(cmd=_cmd_firmware_load)
 
 def _fill_servo_subparser(parser: argparse.ArgumentParser, parent: argparse.ArgumentParser):
@@ -80,7 +80,7 @@ def _cmd_lcd_talk(args):
 
 def _cmd_firmware_load(args):
     client = _connect_client(args)
-    common.format_print_result(client.firmware_load(), "mouth", "FW", args.artie_id)
+    common.format_print_result(client.firmware_load(force=args.force), "mouth", "FW", args.artie_id)
 
 #########################################################################################
 ################################# Status Commands #######################################
@@ -124,6 +124,7 @@ def _fill_fw_subparser(parser: argparse.ArgumentParser, parent: argparse.Argumen
 
     # Load command
     p = subparsers.add_parser("load", help="(Re)load the firmware. Targets both sides at once.", parents=[option_parser])
+    p.add_argument("--force", action='store_true', help="Load the firmware even if the MCU already has it.")
     p.set_defaults(cmd=_cmd_firmware_load)
 
 def _fill_lcd_subparser(parser: argparse.ArgumentParser, parent: argparse.ArgumentParser):
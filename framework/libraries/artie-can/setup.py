@@ -0,0 +1,12 @@
+from setuptools import setup
+setup(
+    name='artie-can',
+    version="0.0.1",
+    python_requires=">=3.10",
+    license="MIT",
+    packages=["artie_can"],
+    package_dir={"artie_can": "src/artie_can"},
+    install_requires=[
+        "artie-util",
+    ]
+)
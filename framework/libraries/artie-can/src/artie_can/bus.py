@@ -0,0 +1,123 @@
+"""
+CAN bus access: SocketCAN on Linux (which includes `vcan` loopback interfaces),
+or an in-memory bus for development and testing.
+
+Both give you a node that can `send` and `recv` extended-ID frames.
+"""
+from typing import List, NamedTuple
+import errno
+import queue
+import socket
+import struct
+import threading
+import time
+
+# Linux SocketCAN frame layout: 32-bit ID (with flags), 8-bit DLC, 3 padding bytes, 8 data bytes
+_CAN_FRAME_FORMAT = "=IB3x8s"
+_CAN_FRAME_SIZE = struct.calcsize(_CAN_FRAME_FORMAT)
+_CAN_EFF_FLAG = 0x80000000
+_CAN_EFF_MASK = 0x1FFFFFFF
+
+class Frame(NamedTuple):
+    """A CAN frame with a 29-bit ID and 0 to 8 bytes of data."""
+    can_id: int
+    data: bytes
+
+class SocketCANNode:
+    """
+    A node on a SocketCAN interface, such as 'can0' or 'vcan0'.
+    """
+    def __init__(self, channel: str) -> None:
+        self._sock = socket.socket(socket.AF_CAN, socket.SOCK_RAW, socket.CAN_RAW)
+        self._sock.bind((channel,))
+
+    def send(self, frame: Frame):
+        data = bytes(frame.data)
+        raw = struct.pack(_CAN_FRAME_FORMAT, frame.can_id | _CAN_EFF_FLAG, len(data), data.ljust(8, b'\x00'))
+        while True:
+            try:
+                self._sock.send(raw)
+                return
+            except OSError as e:
+                # The interface's transmit queue is full; wait for it to drain
+                if e.errno != errno.ENOBUFS:
+                    raise
+                time.sleep(0.0005)
+
+    def recv(self, timeout_s: float = None) -> Frame|None:
+        """
+        Return the next frame, or `None` if there isn't one within `timeout_s` seconds
+        (a timeout of 0 polls; `None` blocks).
+        """
+        self._sock.settimeout(timeout_s)
+        try:
+            raw = self._sock.recv(_CAN_FRAME_SIZE)
+        except (socket.timeout, BlockingIOError):
+            return None
+        can_id, dlc, data = struct.unpack(_CAN_FRAME_FORMAT, raw)
+        return Frame(can_id & _CAN_EFF_MASK, data[:dlc])
+
+    def close(self):
+        self._sock.close()
+
+class InMemoryBus:
+    """
+    A CAN bus in this process. Every frame sent by one node is received by all the others.
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._nodes: List[InMemoryNode] = []
+
+    def attach(self) -> 'InMemoryNode':
+        node = InMemoryNode(self)
+        with self._lock:
+            self._nodes.append(node)
+        return node
+
+    def _detach(self, node: 'InMemoryNode'):
+        with self._lock:
+            self._nodes.remove(node)
+
+    def _broadcast(self, sender: 'InMemoryNode', frame: Frame):
+        with self._lock:
+            nodes = list(self._nodes)
+        for node in nodes:
+            if node is not sender:
+                node._inbox.put(frame)
+
+class InMemoryNode:
+    """
+    A node on an `InMemoryBus`. Same interface as `SocketCANNode`.
+    """
+    def __init__(self, bus: InMemoryBus) -> None:
+        self._bus = bus
+        self._inbox = queue.SimpleQueue()
+
+    def send(self, frame: Frame):
+        if len(frame.data) > 8:
+            raise ValueError(f"A CAN frame carries at most 8 data bytes, but got {len(frame.data)}")
+        self._bus._broadcast(self, Frame(frame.can_id & _CAN_EFF_MASK, bytes(frame.data)))
+
+    def recv(self, timeout_s: float = None) -> Frame|None:
+        """
+        Return the next frame, or `None` if there isn't one within `timeout_s` seconds
+        (a timeout of 0 polls; `None` blocks).
+        """
+        try:
+            if timeout_s == 0:
+                return self._inbox.get_nowait()
+            return self._inbox.get(timeout=timeout_s)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._bus._detach(self)
+
+def open_node(channel: str = None):
+    """
+    Return a node on the given SocketCAN `channel` (e.g., 'can0' or 'vcan0'),
+    or on a new in-memory bus if `channel` is `None`.
+    """
+    if channel is None:
+        return InMemoryBus().attach()
+    return SocketCANNode(channel)
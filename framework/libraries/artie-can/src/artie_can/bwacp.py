@@ -0,0 +1,472 @@
+"""
+Block Write Artie CAN Protocol (BWACP), as specified in docs/sdk/CANProtocol.md.
+
+A block transfer is a READY frame (CRC24, 4 byte address, first stuffing byte),
+followed by DATA frames carrying the rest of the byte-stuffed payload, 8 bytes at a time.
+Receivers answer with REPEAT frames if they miss a frame (repeat the last frame)
+or lose track of the transfer (repeat the whole sequence). A repeat-last REPEAT carries
+the parity of the frame it asks for, and the writer waits a moment after each DATA frame
+for such a request before it sends the next one, so that it repeats the frame that was missed.
+
+`BlockWriter` is the sending side. It splits an image into blocks, sends them one at a time,
+services REPEAT requests, and can record its progress to a file so that an interrupted
+transfer resumes at the block it was on instead of starting over.
+
+`BlockReceiver` is a reference receiving side, for development, testing, and benchmarking
+against a bus with no real nodes on it.
+"""
+from . import bus as canbus
+from . import bytestuffing
+from artie_util import artie_logging as alog
+from typing import Callable, List, NamedTuple, Tuple
+import enum
+import hashlib
+import json
+import os
+import random
+import struct
+import threading
+import time
+
+# Protocol bits that every BWACP ID starts with
+PROTOCOL_BITS = 0b101
+
+# Target address that means "every node in the class mask"
+MULTICAST_ADDRESS = 0x3F
+
+# Bytes of (stuffed) payload in each DATA frame
+DATA_BYTES_PER_FRAME = 8
+
+class FrameType(enum.IntEnum):
+    REPEAT = 0b0001
+    READY = 0b0011
+    DATA = 0b0111
+
+class Priority(enum.IntEnum):
+    HIGH = 0b00
+    MED_HIGH = 0b01
+    MED_LOW = 0b10
+    LOW = 0b11
+
+class DeviceClass(enum.IntFlag):
+    """Bits of the class mask used to multicast."""
+    SBC = 1 << 0
+    MCU = 1 << 1
+    SENSOR_NODE = 1 << 2
+    MOTOR_NODE = 1 << 3
+
+class BWACPError(Exception):
+    """A block transfer failed."""
+    pass
+
+class FrameId(NamedTuple):
+    """The fields of a BWACP ID."""
+    frame_type: FrameType
+    priority: Priority
+    sender: int
+    target: int
+    class_mask: int
+    flag: bool
+    """The repeat bit of a DATA frame, the interrupt bit of a READY frame, or the repeat-last bit of a REPEAT frame."""
+    parity: int
+
+class TransferStats(NamedTuple):
+    """What it took to send an image."""
+    nbytes: int
+    blocks: int
+    frames: int
+    repeats: int
+    restarts: int
+    elapsed_s: float
+
+def make_id(frame_type: FrameType, sender: int, target: int, class_mask: int = 0, flag: bool = False, parity: int = 1, priority: Priority = Priority.LOW) -> int:
+    """
+    Return the 29 bit CAN ID for the given fields.
+    """
+    if frame_type == FrameType.REPEAT:
+        class_mask = 0
+    return (
+        (PROTOCOL_BITS << 26)
+        | (frame_type << 22)
+        | (priority << 20)
+        | ((sender & 0x3F) << 14)
+        | ((target & 0x3F) << 8)
+        | ((class_mask & 0x3F) << 2)
+        | (int(flag) << 1)
+        | (parity & 0x01)
+    )
+
+def parse_id(can_id: int) -> FrameId|None:
+    """
+    Return the fields of the given CAN ID, or `None` if it is not a BWACP ID.
+    """
+    if (can_id >> 26) & 0b111 != PROTOCOL_BITS:
+        return None
+    try:
+        frame_type = FrameType((can_id >> 22) & 0x0F)
+    except ValueError:
+        return None
+    return FrameId(
+        frame_type=frame_type,
+        priority=Priority((can_id >> 20) & 0b11),
+        sender=(can_id >> 14) & 0x3F,
+        target=(can_id >> 8) & 0x3F,
+        class_mask=(can_id >> 2) & 0x3F,
+        flag=bool((can_id >> 1) & 0x01),
+        parity=can_id & 0x01,
+    )
+
+def _make_crc24_table() -> Tuple[int]:
+    table = []
+    for i in range(256):
+        crc = i << 16
+        for _ in range(8):
+            crc <<= 1
+            if crc & 0x1000000:
+                crc ^= 0x1864CFB
+        table.append(crc & 0xFFFFFF)
+    return tuple(table)
+
+_CRC24_TABLE = _make_crc24_table()
+
+def crc24(data: bytes) -> int:
+    """
+    CRC-24 (the OpenPGP one: polynomial 0x864CFB, initial value 0xB704CE).
+    """
+    crc = 0xB704CE
+    for b in data:
+        crc = ((crc << 8) & 0xFFFFFF) ^ _CRC24_TABLE[((crc >> 16) ^ b) & 0xFF]
+    return crc
+
+def block_crc(address: int, payload: bytes) -> int:
+    """
+    The CRC that goes in a READY frame: over the address and the (unstuffed) payload.
+    """
+    return crc24(struct.pack(">I", address) + payload)
+
+def load_image(fpath: str, base_address: int = 0) -> List[Tuple[int, bytes]]:
+    """
+    Return the [(address, data)] segments to write for the given firmware file.
+
+    ELF files give one segment per loadable program header (at its physical address).
+    Anything else is treated as a raw binary to write starting at `base_address`.
+    """
+    with open(fpath, 'rb') as f:
+        image = f.read()
+
+    if image[:4] != b'\x7fELF':
+        return [(base_address, image)]
+
+    if image[4] != 1:
+        raise ValueError(f"{fpath} is not a 32 bit ELF file")
+    endian = "<" if image[5] == 1 else ">"
+    phoff, = struct.unpack_from(endian + "I", image, 0x1C)
+    phentsize, phnum = struct.unpack_from(endian + "HH", image, 0x2A)
+
+    segments = []
+    for i in range(phnum):
+        p_type, p_offset, _, p_paddr, p_filesz, _, _, _ = struct.unpack_from(endian + "8I", image, phoff + i * phentsize)
+        if p_type == 1 and p_filesz > 0:  # PT_LOAD
+            segments.append((p_paddr, image[p_offset:p_offset + p_filesz]))
+    return segments
+
+def _blocks(segments: List[Tuple[int, bytes]], block_size: int) -> List[Tuple[int, bytes]]:
+    blocks = []
+    for address, data in segments:
+        for offset in range(0, len(data), block_size):
+            blocks.append((address + offset, data[offset:offset + block_size]))
+    return blocks
+
+def _frame_payloads(address: int, payload: bytes) -> Tuple[bytes, List[bytes]]:
+    """
+    Return the READY frame's data and the list of DATA frames' data for one block.
+    """
+    stuffed = bytestuffing.stuff(payload)
+    ready = struct.pack(">I", block_crc(address, payload))[1:] + struct.pack(">I", address) + stuffed[:1]
+    rest = stuffed[1:]
+    return ready, [rest[i:i + DATA_BYTES_PER_FRAME] for i in range(0, len(rest), DATA_BYTES_PER_FRAME)]
+
+class BlockWriter:
+    """
+    Sends images to a node (or a class of nodes) with BWACP.
+
+    Args
+    ----
+    - node: A node from `artie_can.bus`.
+    - sender: Our 6 bit address on the bus.
+    - target: The node to write to, or MULTICAST_ADDRESS to write to every node in `class_mask`.
+    - class_mask: Which classes of node to write to when multicasting (`DeviceClass` bits).
+    - block_size: Payload bytes per block. Each block is checked and acknowledged on its own,
+      so this is the most that has to be resent if a receiver loses track.
+    - repeat_window_s: How long to wait after each DATA frame for a receiver to ask for it again,
+      before sending the next one. A request that comes later than this restarts the block.
+    - settle_s: How long to wait for REPEATs after the last frame of a block.
+    - max_restarts: How many times a block may be restarted before we give up.
+    - state_fpath: If given, progress is saved here after every block, and a transfer of the same image
+      to the same target resumes from it. The file is removed once the transfer completes.
+    """
+    def __init__(self, node, sender: int, target: int = MULTICAST_ADDRESS, class_mask: int = DeviceClass.MCU, priority: Priority = Priority.LOW,
+                 block_size: int = 1024, repeat_window_s: float = 0.001, settle_s: float = 0.01, max_restarts: int = 8, state_fpath: str = None) -> None:
+        if target == MULTICAST_ADDRESS and not class_mask:
+            raise ValueError("Multicasting needs at least one bit in the class mask")
+        self._node = node
+        self._sender = sender
+        self._target = target
+        self._class_mask = int(class_mask) if target == MULTICAST_ADDRESS else 0
+        self._priority = priority
+        self._block_size = block_size
+        self._repeat_window_s = repeat_window_s
+        self._settle_s = settle_s
+        self._max_restarts = max_restarts
+        self._state_fpath = state_fpath
+
+    def write(self, address: int, payload: bytes) -> TransferStats:
+        """
+        Send `payload` to be written starting at `address`.
+        """
+        return self.write_segments([(address, payload)])
+
+    def write_image(self, fpath: str, base_address: int = 0) -> TransferStats:
+        """
+        Send a firmware file (see `load_image`).
+        """
+        return self.write_segments(load_image(fpath, base_address))
+
+    def write_segments(self, segments: List[Tuple[int, bytes]]) -> TransferStats:
+        """
+        Send each (address, payload) segment. Raise a BWACPError if a block cannot be delivered.
+        """
+        blocks = _blocks(segments, self._block_size)
+        key = self._transfer_key(segments)
+        first_block = self._load_progress(key)
+        if first_block:
+            alog.info(f"Resuming BWACP transfer at block {first_block} of {len(blocks)}.")
+
+        start_s = time.monotonic()
+        totals = [0, 0, 0, 0]  # bytes, frames, repeats, restarts
+        for i in range(first_block, len(blocks)):
+            address, payload = blocks[i]
+            frames, repeats, restarts = self._write_block(address, payload)
+            totals[0] += len(payload)
+            totals[1] += frames
+            totals[2] += repeats
+            totals[3] += restarts
+            self._save_progress(key, i + 1)
+
+            attributes = {"target": str(self._target)}
+            alog.update_counter(len(payload), "bwacp-bytes-sent", alog.MetricHWBusCANOrder.TRAFFIC, unit=alog.MetricUnits.BYTES, description="Number of payload bytes delivered over BWACP.", attributes=attributes)
+            alog.update_counter(frames, "bwacp-frames-sent", alog.MetricHWBusCANOrder.TRAFFIC, unit=alog.MetricUnits.CALLS, description="Number of BWACP frames sent, including repeats.", attributes=attributes)
+            if repeats or restarts:
+                alog.update_counter(repeats + restarts, "bwacp-repeats", alog.MetricHWBusCANOrder.TRAFFIC, unit=alog.MetricUnits.CALLS, description="Number of REPEAT requests serviced over BWACP.", attributes=attributes)
+
+        self._clear_progress()
+        return TransferStats(nbytes=totals[0], blocks=len(blocks) - first_block, frames=totals[1], repeats=totals[2], restarts=totals[3], elapsed_s=time.monotonic() - start_s)
+
+    def _id(self, frame_type: FrameType, flag: bool = False, parity: int = 1) -> int:
+        return make_id(frame_type, self._sender, self._target, self._class_mask, flag, parity, self._priority)
+
+    def _poll_repeat(self, timeout_s: float) -> FrameId|None:
+        """
+        Return the next REPEAT frame addressed to us within `timeout_s` seconds, if any.
+        Frames that are not for us are ignored.
+        """
+        deadline_s = time.monotonic() + timeout_s
+        while True:
+            remaining_s = max(0.0, deadline_s - time.monotonic())
+            frame = self._node.recv(remaining_s)
+            if frame is None:
+                return None
+            fid = parse_id(frame.can_id)
+            if fid is not None and fid.frame_type == FrameType.REPEAT and fid.target == self._sender:
+                return fid
+            if remaining_s == 0:
+                return None
+
+    def _service_repeats(self, last: canbus.Frame|None, timeout_s: float) -> Tuple[bool, int]:
+        """
+        Repeat `last` for every receiver that asks for it within `timeout_s` seconds (of the previous request).
+        Return (whether the block has to be restarted, number of repeats sent).
+        """
+        nrepeats = 0
+        while True:
+            request = self._poll_repeat(timeout_s)
+            if request is None:
+                return False, nrepeats
+            if not request.flag or last is None or request.parity != (last.can_id & 0x01):
+                # Asked for the whole block, or (too late) for a frame before the last one
+                return True, nrepeats
+            # Marked as a repeat, so that only the nodes that asked for it take it
+            self._node.send(canbus.Frame(last.can_id | 0x02, last.data))
+            nrepeats += 1
+
+    def _write_block(self, address: int, payload: bytes) -> Tuple[int, int, int]:
+        """
+        Send one block, servicing REPEATs. Return (frames sent, repeats, restarts).
+        """
+        ready, data_frames = _frame_payloads(address, payload)
+        frames = repeats = restarts = 0
+        interrupt = False
+        while True:
+            self._node.send(canbus.Frame(self._id(FrameType.READY, flag=interrupt), ready))
+            frames += 1
+            restart = False
+            last = None
+            for i, data in enumerate(data_frames):
+                last = canbus.Frame(self._id(FrameType.DATA, parity=i & 0x01), data)
+                self._node.send(last)
+                frames += 1
+
+                # A receiver that missed this frame asks for it right away, and "the last frame"
+                # has to still be this one when we answer
+                restart, nrepeats = self._service_repeats(last, self._repeat_window_s)
+                frames += nrepeats
+                repeats += nrepeats
+                if restart:
+                    break
+
+            # Give the receivers a chance to complain about the end of the block
+            if not restart:
+                restart, nrepeats = self._service_repeats(last, self._settle_s)
+                frames += nrepeats
+                repeats += nrepeats
+
+            if not restart:
+                return frames, repeats, restarts
+
+            restarts += 1
+            if restarts > self._max_restarts:
+                raise BWACPError(f"Gave up on the block at 0x{address:08X} after {self._max_restarts} restarts")
+            alog.debug(f"Restarting BWACP block at 0x{address:08X} (restart {restarts}).")
+            interrupt = True
+
+    def _transfer_key(self, segments: List[Tuple[int, bytes]]) -> str:
+        h = hashlib.sha256()
+        for address, data in segments:
+            h.update(struct.pack(">II", address, len(data)))
+            h.update(data)
+        return f"{h.hexdigest()}:{self._block_size}:{self._target}:{self._class_mask}"
+
+    def _load_progress(self, key: str) -> int:
+        if self._state_fpath is None or not os.path.isfile(self._state_fpath):
+            return 0
+        try:
+            with open(self._state_fpath, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            alog.warning(f"Ignoring unreadable BWACP progress file {self._state_fpath}: {e}")
+            return 0
+        return state.get("next-block", 0) if state.get("key") == key else 0
+
+    def _save_progress(self, key: str, next_block: int):
+        if self._state_fpath is None:
+            return
+        tmp_fpath = self._state_fpath + ".tmp"
+        with open(tmp_fpath, 'w') as f:
+            json.dump({"key": key, "next-block": next_block}, f)
+        os.replace(tmp_fpath, self._state_fpath)
+
+    def _clear_progress(self):
+        if self._state_fpath is not None and os.path.isfile(self._state_fpath):
+            os.remove(self._state_fpath)
+
+class BlockReceiver:
+    """
+    A receiving node, for testing and benchmarking `BlockWriter` without real nodes on the bus.
+
+    Runs in its own thread once started, and calls `on_block(address, payload)` for every block
+    that arrives intact. `drop_rate` is the probability of pretending to miss each DATA frame
+    (and asking for it again).
+    """
+    def __init__(self, node, address: int, device_class: DeviceClass, on_block: Callable[[int, bytes], None], drop_rate: float = 0.0, seed: int = None) -> None:
+        self._node = node
+        self._address = address
+        self._device_class = device_class
+        self._on_block = on_block
+        self._drop_rate = drop_rate
+        self._rng = random.Random(seed)
+        self._stop = threading.Event()
+        self._thread = None
+        self._reset()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"bwacp-receiver-{self._address}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _reset(self):
+        self._writer = None
+        self._crc = None
+        self._block_address = None
+        self._unstuffer = None
+        self._expected_parity = 0
+        self._awaiting_repeat = False
+
+    def _is_for_me(self, fid: FrameId) -> bool:
+        if fid.target == MULTICAST_ADDRESS:
+            return bool(fid.class_mask & self._device_class)
+        return fid.target == self._address
+
+    def _request(self, repeat_last: bool):
+        # Asking for the last frame again names it by its parity, so the writer can tell if it has moved on
+        parity = self._expected_parity if repeat_last else 1
+        self._node.send(canbus.Frame(make_id(FrameType.REPEAT, self._address, self._writer, flag=repeat_last, parity=parity), b''))
+
+    def _request_whole(self):
+        self._request(repeat_last=False)
+        writer = self._writer
+        self._reset()
+        self._writer = writer
+
+    def _run(self):
+        while not self._stop.is_set():
+            frame = self._node.recv(0.05)
+            if frame is None:
+                continue
+            fid = parse_id(frame.can_id)
+            if fid is None or fid.frame_type == FrameType.REPEAT or not self._is_for_me(fid):
+                continue
+
+            if fid.frame_type == FrameType.READY:
+                self._reset()
+                self._writer = fid.sender
+                self._crc = int.from_bytes(frame.data[0:3], 'big')
+                self._block_address = int.from_bytes(frame.data[3:7], 'big')
+                self._unstuffer = bytestuffing.Unstuffer()
+                self._feed(frame.data[7:])
+                continue
+
+            if self._unstuffer is None:
+                continue  # Not in a transfer (or waiting for the writer to restart one)
+
+            if fid.flag and not self._awaiting_repeat:
+                continue  # A repeat someone else asked for
+            if fid.parity != self._expected_parity:
+                self._request_whole()
+                continue
+            if not fid.flag and self._rng.random() < self._drop_rate:
+                self._awaiting_repeat = True
+                self._request(repeat_last=True)
+                continue
+
+            self._awaiting_repeat = False
+            self._expected_parity ^= 1
+            self._feed(frame.data)
+
+    def _feed(self, data: bytes):
+        try:
+            self._unstuffer.feed(data)
+        except ValueError:
+            self._request_whole()
+            return
+
+        if self._unstuffer.done:
+            payload = bytes(self._unstuffer.payload)
+            if block_crc(self._block_address, payload) != self._crc:
+                self._request_whole()
+                return
+            self._on_block(self._block_address, payload)
+            self._reset()
@@ -0,0 +1,69 @@
+"""
+Byte stuffing as specified in docs/sdk/ByteStuffing.md.
+
+The payload is split into runs of at most 254 bytes. Each run is preceded
+by a special byte giving its length (the index of the next special byte),
+and the whole thing ends with a 0xFF special byte.
+"""
+
+# Longest run of payload between two special bytes
+MAX_RUN = 0xFE
+
+# The special byte that ends a stuffed payload
+END = 0xFF
+
+def stuff(payload: bytes) -> bytes:
+    """
+    Return the byte-stuffed version of `payload`.
+    """
+    stuffed = bytearray()
+    for start in range(0, len(payload), MAX_RUN):
+        run = payload[start:start + MAX_RUN]
+        stuffed.append(len(run))
+        stuffed += run
+    stuffed.append(END)
+    return bytes(stuffed)
+
+class Unstuffer:
+    """
+    Incrementally decodes a byte-stuffed stream that arrives in pieces (e.g., one CAN frame at a time).
+    """
+    def __init__(self) -> None:
+        self.payload = bytearray()
+        self.done = False
+        # Number of payload bytes left before the next special byte (0: the next byte is special)
+        self._remaining = 0
+
+    def feed(self, data: bytes):
+        """
+        Decode the next piece of the stream. Raise a ValueError if the stream is malformed.
+        """
+        i = 0
+        while i < len(data):
+            if self.done:
+                raise ValueError("Got data after the end of the stuffed payload")
+
+            if self._remaining == 0:
+                special = data[i]
+                i += 1
+                if special == END:
+                    self.done = True
+                elif special == 0x00:
+                    raise ValueError("Got a 0x00 special byte")
+                else:
+                    self._remaining = special
+            else:
+                n = min(self._remaining, len(data) - i)
+                self.payload += data[i:i + n]
+                self._remaining -= n
+                i += n
+
+def unstuff(stuffed: bytes) -> bytes:
+    """
+    Return the payload of a complete byte-stuffed stream. Raise a ValueError if it is malformed or incomplete.
+    """
+    unstuffer = Unstuffer()
+    unstuffer.feed(stuffed)
+    if not unstuffer.done:
+        raise ValueError("Stuffed payload is missing its final special byte")
+    return bytes(unstuffer.payload)
@@ -0,0 +1,61 @@
+"""
+Round trips through `BlockWriter` and the reference `BlockReceiver` over an in-memory bus.
+"""
+from artie_can import bus as canbus
+from artie_can import bwacp
+import os
+import threading
+import unittest
+
+class TestBlockTransfer(unittest.TestCase):
+    def _transfer(self, nbytes: int, drop_rate: float, nreceivers: int = 2, block_size: int = 256) -> bwacp.TransferStats:
+        bus = canbus.InMemoryBus()
+        image = os.urandom(nbytes)
+        received = [bytearray(nbytes) for _ in range(nreceivers)]
+        counts = [0] * nreceivers
+        done = [threading.Event() for _ in range(nreceivers)]
+
+        def make_on_block(i: int):
+            def on_block(address: int, payload: bytes):
+                received[i][address:address + len(payload)] = payload
+                counts[i] += len(payload)
+                if counts[i] >= nbytes:
+                    done[i].set()
+            return on_block
+
+        receivers = [bwacp.BlockReceiver(bus.attach(), address=0x10 + i, device_class=bwacp.DeviceClass.MCU, on_block=make_on_block(i), drop_rate=drop_rate, seed=i) for i in range(nreceivers)]
+        for receiver in receivers:
+            receiver.start()
+        try:
+            # A roomier REPEAT window than the default, so that a busy test machine does not turn repeats into restarts
+            writer = bwacp.BlockWriter(bus.attach(), sender=0x01, target=bwacp.MULTICAST_ADDRESS, class_mask=bwacp.DeviceClass.MCU, block_size=block_size, repeat_window_s=0.005)
+            stats = writer.write(0, image)
+            for event in done:
+                self.assertTrue(event.wait(timeout=5.0))
+        finally:
+            for receiver in receivers:
+                receiver.stop()
+
+        for r in received:
+            self.assertEqual(bytes(r), image)
+        return stats
+
+    def test_lossless(self):
+        stats = self._transfer(4096, drop_rate=0.0)
+        self.assertEqual(stats.repeats, 0)
+        self.assertEqual(stats.restarts, 0)
+
+    def test_lossy_bus_repeats_the_missed_frame(self):
+        # Every dropped frame should be fixed by repeating it, not by restarting its block
+        for drop_rate in (0.01, 0.05):
+            with self.subTest(drop_rate=drop_rate):
+                stats = self._transfer(4096, drop_rate=drop_rate)
+                self.assertGreater(stats.repeats, 0)
+                self.assertLessEqual(stats.restarts, 1)
+
+    def test_very_lossy_bus(self):
+        stats = self._transfer(2048, drop_rate=0.2)
+        self.assertGreater(stats.repeats, 0)
+
+if __name__ == "__main__":
+    unittest.main()
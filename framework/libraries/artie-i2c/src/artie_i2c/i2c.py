@@ -35,6 +35,10 @@ class MockBus:
     def write_byte(self, addr, data):
         alog.info(f"Mocking the write of a single byte of data ({data}) to {hex(addr)} on i2c instance {self.instance}.")
 
+    def read_byte(self, addr):
+        alog.info(f"Mocking the read of a single byte of data from {hex(addr)} on i2c instance {self.instance}.")
+        return 0x00
+
 
 class I2CBus:
     def __init__(self, i2c_instances=None, instance_to_address_map=None) -> None:
@@ -76,6 +80,27 @@ class I2CBus:
         except FileNotFoundError:
             self._instance_to_bus_map = {instance: MockBus(instance) for instance in self.i2c_instances}
 
+    def probe(self, address: int):
+        """
+        Check whether a device currently answers at `address` by reading a byte from it
+        (unlike the scan at startup, this reflects a device that was just reset).
+        Return the bus instance it answered on, or `None`.
+        """
+        hex_addr = hex(address)[2:]
+        known_instance = self.address_to_instance_map.get(hex_addr, None)
+        instances = [known_instance] if known_instance is not None else self.i2c_instances
+        for instance in instances:
+            try:
+                self._instance_to_bus_map[instance].read_byte(address)
+            except OSError:
+                continue
+
+            if known_instance is None:
+                self.address_to_instance_map[hex_addr] = instance
+                self.instance_to_address_map.setdefault(instance, []).append(hex_addr)
+            return instance
+        return None
+
     def write(self, address: int, data: list) -> bool:
         """
         Write the data to the address.
@@ -111,7 +136,7 @@ class I2CBus:
         alog.update_counter(nbytes, "bytes-out", alog.MetricHWBusI2COrder.TRAFFIC, unit=alog.MetricUnits.BYTES, description="Number of bytes written to i2c bus", attributes={metrics.Attributes.I2C_ADDRESS: hex(address)})
         try:
             if nbytes > 1:
-                data_bytes = [int(b) for b in data.to_bytes(nbytes, 'big')]
+                data_bytes = [int(b) for b in data]
                 self._instance_to_bus_map[instance].write_i2c_block_data(address, data_bytes[0], data_bytes[1:])
             else:
                 assert nbytes == 1
@@ -167,6 +192,18 @@ def check_for_address(address: int):
     hexaddr = hex(address)[2:]  # hex() leads with '0x', so strip that off as well
     return bus.address_to_instance_map.get(hexaddr, None)
 
+@public_i2c_function
+def probe_address(address: int) -> bool:
+    """
+    Return whether a device answers at the given `address` right now.
+    Use this to poll for a device to come back after a reset.
+    """
+    if address < 0 or address > 255:
+        errmsg = f"Address must be a single (unsigned) byte, but is the value {address}"
+        alog.error(errmsg)
+        raise ValueError(errmsg)
+    return bus.probe(address) is not None
+
 @public_i2c_function
 def list_all_instances():
     """
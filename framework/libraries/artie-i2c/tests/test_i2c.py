@@ -0,0 +1,49 @@
+"""
+Writes through `I2CBus` to a fake SMBus, checking what goes out on the wire.
+"""
+from artie_i2c import i2c
+from artie_util import boardconfig_controller as board
+import unittest
+
+class FakeSMBus:
+    """
+    Records every write instead of doing it.
+    """
+    def __init__(self) -> None:
+        self.writes = []
+
+    def write_i2c_block_data(self, addr, register, data):
+        self.writes.append(("block", addr, register, list(data)))
+
+    def write_byte(self, addr, data):
+        self.writes.append(("byte", addr, data))
+
+class TestWrite(unittest.TestCase):
+    def setUp(self) -> None:
+        self.smbus = FakeSMBus()
+        i2c.manually_initialize(i2c_instances=[1], instance_to_address_map={1: [board.I2C_ADDRESS_RESET_MCU]})
+        i2c.bus._instance_to_bus_map = {1: self.smbus}
+
+    def tearDown(self) -> None:
+        i2c.bus = None
+
+    def test_single_byte(self):
+        self.assertTrue(i2c.write_bytes_to_address(board.I2C_ADDRESS_RESET_MCU, board.MCU_RESET_ADDR_MOUTH))
+        self.assertEqual(self.smbus.writes, [("byte", board.I2C_ADDRESS_RESET_MCU, board.MCU_RESET_ADDR_MOUTH)])
+
+    def test_group_reset_is_one_block_write(self):
+        targets = [board.MCU_RESET_ADDR_RL_EYEBROWS, board.MCU_RESET_ADDR_MOUTH, board.MCU_RESET_ADDR_HEAD_SENSORS]
+        self.assertTrue(i2c.write_bytes_to_address(board.I2C_ADDRESS_RESET_MCU, targets))
+        self.assertEqual(self.smbus.writes, [("block", board.I2C_ADDRESS_RESET_MCU, targets[0], targets[1:])])
+
+    def test_tuple(self):
+        self.assertTrue(i2c.write_bytes_to_address(board.I2C_ADDRESS_RESET_MCU, (1, 2, 3, 4)))
+        self.assertEqual(self.smbus.writes, [("block", board.I2C_ADDRESS_RESET_MCU, 1, [2, 3, 4])])
+
+    def test_out_of_range_byte(self):
+        with self.assertRaises(ValueError):
+            i2c.write_bytes_to_address(board.I2C_ADDRESS_RESET_MCU, [1, 256])
+        self.assertEqual(self.smbus.writes, [])
+
+if __name__ == "__main__":
+    unittest.main()
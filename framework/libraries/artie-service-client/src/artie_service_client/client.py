@@ -2,12 +2,17 @@
 The public interface for the various services is exposed through this module.
 """
 from artie_util import artie_logging as alog
+from artie_util import binrpc
 from artie_util import constants
 from artie_util import dns
+from artie_util import tls
 from artie_util import util
-from rpyc.utils import factory
+from typing import Dict, List, Tuple
+import contextlib
 import datetime
 import enum
+import rpyc
+import threading
 
 # A cache to store services that we have determined to be online
 online_cache = set()
@@ -60,26 +65,213 @@ class ServiceConnection:
                 alog.update_counter(1, "connection", alog.MetricSWCodePathAPICallFamily.FAILURE, unit=alog.MetricUnits.CALLS, description="Number of times we encounter an error when trying to connect to an Artie service.")
 
     def _initialize_connection(self, service: Service):
-        match service:
-            case Service.RESET_SERVICE:
-                dns_lookup = dns.Lookups.RESET_DRIVER
-            case Service.EYEBROWS_SERVICE:
-                dns_lookup = dns.Lookups.EYEBROWS_DRIVER
-            case Service.MOUTH_SERVICE:
-                dns_lookup = dns.Lookups.MOUTH_DRIVER
-            case _:
-                raise ValueError(f"Given an invalid Service for ServiceConnection: {service}")
+        dns_lookup = _service_to_dns_lookup(service)
 
         # DNS
         block_until_online(dns_lookup, timeout_s=self.timeout_s, ipv6=self.ipv6, artie_id=self.artie_id)
-        host, port = dns.lookup(dns_lookup, artie_id=self.artie_id)
+        connect = lambda address, port: tls.ssl_connect(address, port, ipv6=self.ipv6)
+        return _connect_to_any_address(connect, dns_lookup, self.n_retries, artie_id=self.artie_id, ipv6=self.ipv6)
 
-        for _ in range(self.n_retries):
+class BinaryServiceConnection(ServiceConnection):
+    """
+    Same API as ServiceConnection, but talks to the service over the compact
+    binary RPC transport (see artie_util.binrpc) instead of RPyC. All return values
+    come back by value (lists, dicts, strings, numbers), never as remote proxies.
+    """
+    def __getattr__(self, attr):
+        if attr.startswith("_") or 'connection' not in self.__dict__:
+            raise AttributeError(attr)
+
+        remote_method = getattr(self.connection, attr)
+        def hooked(*args, **kwargs):
+            return self._retry_n_times(remote_method, args, kwargs)
+        return hooked
+
+    def _initialize_connection(self, service: Service):
+        dns_lookup = _service_to_dns_lookup(service)
+
+        # DNS
+        block_until_online(dns_lookup, timeout_s=self.timeout_s, ipv6=self.ipv6, artie_id=self.artie_id)
+        connect = lambda address, port: binrpc.BinaryRPCClient(address, port, ipv6=self.ipv6, timeout_s=self.timeout_s)
+        return _connect_to_any_address(connect, dns_lookup, self.n_retries, artie_id=self.artie_id, ipv6=self.ipv6, binrpc=True)
+
+class StatusSubscription:
+    """
+    A long-lived subscription to a service's submodule statuses.
+
+    `callback` is called (on a background thread) with a tuple of (submodule, status) pairs:
+    first with the status of every submodule, then whenever any of them change.
+    Check `closed` to find out whether the subscription is still alive; if the service
+    goes away, the subscription closes and you need to make a new one.
+    """
+    def __init__(self, service: Service, callback, n_retries=3, artie_id=None, timeout_s=None, ipv6=False) -> None:
+        self.service = service
+        dns_lookup = _service_to_dns_lookup(service)
+        block_until_online(dns_lookup, timeout_s=timeout_s, ipv6=ipv6, artie_id=artie_id)
+        connect = lambda address, port: tls.ssl_connect(address, port, ipv6=ipv6)
+        self.connection = _connect_to_any_address(connect, dns_lookup, n_retries, artie_id=artie_id, ipv6=ipv6)
+        if self.connection is None:
+            raise ConnectionError(f"Could not connect to {service} to subscribe to its status.")
+
+        # The service calls us back over this connection, so something has to serve it
+        self._serving_thread = rpyc.BgServingThread(self.connection)
+        try:
+            self._subscription_id = self.connection.root.subscribe_status(callback)
+        except BaseException:
+            # E.g., a driver that predates status subscriptions; don't leave the thread and connection behind
+            self._serving_thread.stop()
+            self.connection.close()
+            raise
+
+    def __del__(self):
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        return self.connection.closed
+
+    def close(self):
+        """
+        Unsubscribe and close the connection.
+        """
+        if not hasattr(self, '_serving_thread') or self.connection.closed:
+            return
+
+        try:
+            self.connection.root.unsubscribe_status(self._subscription_id)
+        except Exception as e:
+            alog.debug(f"Could not unsubscribe from {self.service}: {e}")
+
+        try:
+            self._serving_thread.stop()
+        except Exception:
+            pass
+        self.connection.close()
+
+def _is_alive(connection: ServiceConnection) -> bool:
+    """
+    Cheaply check that the other end of an idle connection is still there, by serving anything it
+    has sent us without waiting. A peer that has gone away shows up as an EOF (or a socket error).
+    """
+    if connection.connection.closed:
+        return False
+    try:
+        connection.connection.poll(0)
+    except (EOFError, OSError):
+        return False
+    return not connection.connection.closed
+
+class ConnectionPool:
+    """
+    Keeps idle ServiceConnections around for reuse, so that a process that calls services
+    over and over (like the API server) does not pay for a DNS lookup, a TCP connection,
+    and a TLS handshake on every call.
+
+    A connection is only ever used by one caller at a time: `connection()` checks one out
+    (or makes a new one) and puts it back when the caller is done with it, unless it
+    has been closed or the caller raised an exception while using it. Idle connections are
+    checked on the way out, and dropped if their service has gone away in the meantime.
+    """
+    def __init__(self, max_idle_per_service=8) -> None:
+        self.max_idle_per_service = max_idle_per_service
+        self._lock = threading.Lock()
+        # {(service, artie_id, ipv6): [idle connections, most recently used last]}
+        self._idle: Dict[Tuple[Service, str, bool], List[ServiceConnection]] = {}
+
+    def _checkout(self, key) -> ServiceConnection|None:
+        while True:
+            with self._lock:
+                idle = self._idle.get(key, [])
+                if not idle:
+                    return None
+                connection = idle.pop()
+
+            # A connection whose service went away (a driver restart, say) still looks open until we read from it
+            if _is_alive(connection):
+                return connection
+            connection.connection.close()
+            alog.update_counter(1, "pool-connections-dropped", alog.MetricSWCodePathAPIOrder.CALLS, unit=alog.MetricUnits.CALLS, description="Number of stale service connections dropped by a connection pool.", attributes={"service": key[0].value})
+
+    def _checkin(self, key, connection: ServiceConnection):
+        if connection.connection.closed:
+            return
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_service:
+                idle.append(connection)
+                return
+        connection.connection.close()
+
+    @contextlib.contextmanager
+    def connection(self, service: Service, artie_id=None, ipv6=False):
+        """
+        Context manager that gives you a ServiceConnection to `service` for the duration of the `with` block.
+        """
+        key = (service, artie_id, ipv6)
+        connection = self._checkout(key)
+        if connection is None:
+            connection = ServiceConnection(service, artie_id=artie_id, ipv6=ipv6)
+            alog.update_counter(1, "pool-connections-opened", alog.MetricSWCodePathAPIOrder.CALLS, unit=alog.MetricUnits.CALLS, description="Number of service connections opened by a connection pool.", attributes={"service": service.value})
+
+        try:
+            yield connection
+        except BaseException:
+            connection.connection.close()
+            raise
+        self._checkin(key, connection)
+
+    def clear(self):
+        """
+        Close every idle connection.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.connection.close()
+
+# The pool used by `pooled_connection`. Each process has its own.
+pool = ConnectionPool()
+
+def pooled_connection(service: Service, artie_id=None, ipv6=False):
+    """
+    Context manager that lends you a ServiceConnection from this process's connection pool:
+
+        with pooled_connection(Service.MOUTH_SERVICE, artie_id=artie_id) as connection:
+            connection.lcd_get()
+    """
+    return pool.connection(service, artie_id=artie_id, ipv6=ipv6)
+
+def _connect_to_any_address(connect, dns_lookup: dns.Lookups, n_retries: int, artie_id=None, ipv6=False, binrpc=False):
+    """
+    Resolve `dns_lookup` (using the DNS cache) and call `connect(address, port)` on each of its
+    addresses until one succeeds. If none of them do, drop the cached addresses and try again,
+    up to `n_retries` times. Return the result of `connect` or None if we never connected.
+    """
+    for _ in range(n_retries):
+        addresses, port = dns.resolve(dns_lookup, artie_id=artie_id, binrpc=binrpc, ipv6=ipv6)
+        for address in addresses:
             try:
-                return factory.ssl_connect(host, port, ipv6=self.ipv6)
+                return connect(address, port)
             except Exception as e:
-                alog.exception(f"Exception when trying to connect to {host}:{port}: ", e, stack_trace=True)
+                alog.exception(f"Exception when trying to connect to {address}:{port}: ", e, stack_trace=True)
                 alog.update_counter(1, "connection", alog.MetricSWCodePathAPICallFamily.FAILURE, unit=alog.MetricUnits.CALLS, description="Number of times we encounter an error when trying to connect to an Artie service.")
+        dns.invalidate(dns_lookup, artie_id=artie_id, binrpc=binrpc)
+
+def _service_to_dns_lookup(service: Service) -> dns.Lookups:
+    """
+    Map a Service to its entry in the DNS library.
+    """
+    match service:
+        case Service.RESET_SERVICE:
+            dns_lookup = dns.Lookups.RESET_DRIVER
+        case Service.EYEBROWS_SERVICE:
+            dns_lookup = dns.Lookups.EYEBROWS_DRIVER
+        case Service.MOUTH_SERVICE:
+            dns_lookup = dns.Lookups.MOUTH_DRIVER
+        case _:
+            raise ValueError(f"Given an invalid Service for ServiceConnection: {service}")
+    return dns_lookup
 
 def _try_connect(host: str, port: int, ipv6=False) -> bool:
     """
@@ -88,7 +280,7 @@ def _try_connect(host: str, port: int, ipv6=False) -> bool:
     """
     connection = None
     try:
-        connection = factory.ssl_connect(host, port, ipv6=ipv6)
+        connection = tls.ssl_connect(host, port, ipv6=ipv6)
         connection.root.whoami()
         return True
     except AttributeError as e:
@@ -112,18 +304,15 @@ def block_until_online(service: dns.Lookups, timeout_s=30, ipv6=False, artie_id=
 
     alog.info(f"Waiting for {service} to come online...")
 
-    # Lookup the service in the DNS
-    host, port = dns.lookup(service, artie_id=artie_id)
-
-    # Keep trying to connect forever if no timeout, or until timeout if we have one
+    # Keep trying to connect forever if no timeout, or until timeout if we have one.
+    # Re-resolve the service on every failed attempt, since it may not have an address yet.
     ts = datetime.datetime.now().timestamp()
     success = False
-    if timeout_s is None:
-        while not success:
-            success = _try_connect(host, port, ipv6=ipv6)
-    else:
-        while not success and datetime.datetime.now().timestamp() - ts < timeout_s:
-            success = _try_connect(host, port, ipv6=ipv6)
+    while not success and (timeout_s is None or datetime.datetime.now().timestamp() - ts < timeout_s):
+        addresses, port = dns.resolve(service, artie_id=artie_id, ipv6=ipv6)
+        success = any(_try_connect(address, port, ipv6=ipv6) for address in addresses)
+        if not success:
+            dns.invalidate(service, artie_id=artie_id)
 
     # Add to cache or raise an error
     if success:
@@ -146,3 +335,22 @@ def reset(addr: int, ipv6=False, n_retries=3, timeout_s=None, artie_id=None) ->
 
     connection = ServiceConnection(Service.RESET_SERVICE, n_retries=n_retries, timeout_s=timeout_s, artie_id=artie_id, ipv6=ipv6)
     return connection.reset_target(addr)
+
+def reset_group(addrs, ipv6=False, n_retries=3, timeout_s=None, artie_id=None) -> bool:
+    """
+    Attempt to reset every device in `addrs` (an iterable of target addresses) at once.
+    This costs one RPC and one transaction on the reset MCU's bus, however many devices there are.
+    See the appropriate board config file for valid reset addresses.
+
+    Convenience method for interacting with the reset driver through a ServiceConnection object.
+    """
+    # A tuple is sent by value, whereas a list would be proxied back to us one item at a time
+    addrs = tuple(addrs)
+    alog.info(f"Reseting {addrs}")
+
+    if util.in_test_mode() and util.mode() != constants.ArtieRunModes.INTEGRATION_TESTING:
+        alog.info("Mocking a DNS lookup and RPC call for reset.")
+        return True
+
+    connection = ServiceConnection(Service.RESET_SERVICE, n_retries=n_retries, timeout_s=timeout_s, artie_id=artie_id, ipv6=ipv6)
+    return connection.reset_target(addrs)
@@ -12,6 +12,7 @@ class ModuleStatus(enum.StrEnum):
     DEGRADED = "degraded"
     NOT_WORKING = "not_working"
     UNKNOWN = "unknown"
+    INITIALIZING = "initializing"
 
 
 class APIClient:
@@ -68,6 +69,57 @@ class APIClient:
                     raise e
         return r
 
+    def get_stream(self, endpoint: str, params=None, https=True, read_timeout_s=60) -> requests.Response:
+        """
+        Like `get`, but for endpoints that keep the response open and stream it (e.g., Server-Sent Events).
+        The body is not read; iterate over the response's content as it arrives, and close the response when done.
+
+        Args:
+
+        * `endpoint`: The URL not including the "http(s)://" portion.
+        * `params`: Dictionary, list of tuples or bytes to send in the query string.
+        * `https`: If `True` (the default), we use HTTPS. Otherwise we use HTTP.
+        * `read_timeout_s`: Give up if the server sends nothing for this long.
+
+        """
+        scheme = "https" if https else "http"
+        uri = f"{scheme}://{self.ip_and_port}{endpoint}"
+        delay_s = 2
+        for i in range(self.nretries):
+            try:
+                return self.session.get(uri, params=params, stream=True, timeout=(10, read_timeout_s))
+            except requests.RequestException as e:
+                time.sleep(delay_s)
+                if i == self.nretries - 1:
+                    print(f"Error connecting: {e}")
+                    raise e
+
+    def post_stream(self, endpoint: str, body=None, params=None, https=True, read_timeout_s=60) -> requests.Response:
+        """
+        Like `post`, but the response body is streamed instead of read: iterate over the response's
+        content as it arrives, and close the response when done.
+
+        Args:
+
+        * `endpoint`: The URL not including the "http(s)://" portion.
+        * `body`: A JSON-serializable Python object (probably a dict) to send as the body.
+        * `params`: Dictionary, list of tuples or bytes to send in the query string.
+        * `https`: If `True` (the default), we use HTTPS. Otherwise we use HTTP.
+        * `read_timeout_s`: Give up if the server sends nothing for this long.
+
+        """
+        scheme = "https" if https else "http"
+        uri = f"{scheme}://{self.ip_and_port}{endpoint}"
+        delay_s = 2
+        for i in range(self.nretries):
+            try:
+                return self.session.post(uri, json=body, params=params, stream=True, timeout=(10, read_timeout_s))
+            except requests.RequestException as e:
+                time.sleep(delay_s)
+                if i == self.nretries - 1:
+                    print(f"Error connecting: {e}")
+                    raise e
+
     def post(self, endpoint: str, body=None, params=None, https=True) -> requests.Response:
         """
         Post the given body to the given endpoint with the given params.
@@ -176,8 +176,11 @@ class EyebrowClient(api_client.APIClient):
             degrees=response.json().get('degrees')
         )
 
-    def firmware_load(self) -> errors.HTTPError|None:
-        response = self.post(f"/eyebrows/fw", params={'artie-id': self.artie.artie_name})
+    def firmware_load(self, force=False) -> errors.HTTPError|None:
+        params = {'artie-id': self.artie.artie_name}
+        if force:
+            params['force'] = 'true'
+        response = self.post(f"/eyebrows/fw", params=params)
         if response.status_code != 200:
             return errors.HTTPError(response.status_code, f"Error reloading eyebrow FW: {response.content.decode('utf-8')}")
         return None
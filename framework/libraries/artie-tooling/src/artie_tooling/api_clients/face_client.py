@@ -0,0 +1,99 @@
+"""
+Face API client for communicating with the API Server's face endpoints,
+which set several face actuators (mouth, eyebrows, eye servos) in one request.
+
+Each `*Response` object corresponds to the response from a specific API endpoint.
+
+See [API documentation](../../../../../misc-micro-services/artie-api-server/README.md) for more details.
+"""
+from . import api_client
+from . import eyebrow_client
+from . import mouth_client
+from .. import errors
+import dataclasses
+
+@dataclasses.dataclass
+class EyebrowPose:
+    """What to set on one eyebrow. Anything left as `None` is not changed."""
+    vertices: list[eyebrow_client.VertexPosition]|None = None
+    """The LCD's vertex positions ('H', 'M', 'L')."""
+
+    led: eyebrow_client.LEDState|None = None
+    """The LED state."""
+
+    servo: float|None = None
+    """The eye servo position in degrees."""
+
+@dataclasses.dataclass
+class Pose:
+    """A face pose. Anything left as `None` is not changed."""
+    mouth_display: mouth_client.MouthDisplay|None = None
+    """The mouth display."""
+
+    mouth_led: mouth_client.LEDState|None = None
+    """The mouth LED state."""
+
+    left: EyebrowPose|None = None
+    """The left eyebrow."""
+
+    right: EyebrowPose|None = None
+    """The right eyebrow."""
+
+    def to_json(self) -> dict:
+        """Return the pose as the JSON document the API server expects."""
+        body = {}
+        mouth = {k: str(v) for k, v in (("display", self.mouth_display), ("led", self.mouth_led)) if v is not None}
+        if mouth:
+            body['mouth'] = mouth
+        eyebrows = {}
+        for side, eyebrow in ((eyebrow_client.EyebrowSide.LEFT, self.left), (eyebrow_client.EyebrowSide.RIGHT, self.right)):
+            if eyebrow is None:
+                continue
+            side_pose = {}
+            if eyebrow.vertices is not None:
+                side_pose['vertices'] = [str(v) for v in eyebrow.vertices]
+            if eyebrow.led is not None:
+                side_pose['led'] = str(eyebrow.led)
+            if eyebrow.servo is not None:
+                side_pose['servo'] = float(eyebrow.servo)
+            if side_pose:
+                eyebrows[str(side)] = side_pose
+        if eyebrows:
+            body['eyebrows'] = eyebrows
+        return body
+
+@dataclasses.dataclass
+class PoseResponse:
+    """Response object for pose requests."""
+    artie_id: str
+    """The Artie ID."""
+
+    results: dict[str, errors.HTTPError|None]
+    """{actuator (e.g., 'mouth-lcd' or 'eyebrows-left-servo'): None if it worked, otherwise the error}."""
+
+    @property
+    def ok(self) -> bool:
+        """Whether every actuator in the pose was set."""
+        return all(err is None for err in self.results.values())
+
+class FaceClient(api_client.APIClient):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+
+    def pose(self, pose: Pose) -> errors.HTTPError|PoseResponse:
+        """
+        Set everything in `pose` in one request. Returns an `HTTPError` if the server rejected
+        the pose as a whole (in which case nothing was set), otherwise the per-actuator results.
+        """
+        response = self.post("/face/pose", body=pose.to_json(), params={'artie-id': self.artie.artie_name})
+        if response.status_code not in (200, 207):
+            return errors.HTTPError(response.status_code, f"Error setting face pose: {response.content.decode('utf-8')}")
+
+        results = {}
+        for actuator, result in response.json().get('results', {}).items():
+            status = result.get('status', 500)
+            results[actuator] = None if status == 200 else errors.HTTPError(status, f"Error setting {actuator}: {result.get('error', 'Unknown error')}")
+        return PoseResponse(
+            artie_id=response.json().get('artie-id'),
+            results=results
+        )
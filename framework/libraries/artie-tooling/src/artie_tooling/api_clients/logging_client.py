@@ -10,6 +10,15 @@ from .. import errors
 import dataclasses
 import datetime
 import enum
+import json
+import requests
+import socket
+import threading
+import time
+from typing import Iterator
+
+# How many times `LoggingClient.iter_logs` waits for the server's log index to be built before giving up
+INDEX_WAIT_RETRIES = 12
 
 class LogLevel(enum.StrEnum):
     """Log levels supported by the API."""
@@ -17,7 +26,9 @@ class LogLevel(enum.StrEnum):
     INFO = "INFO"
     WARNING = "WARNING"
     ERROR = "ERROR"
+    UNKNOWN = "UNKNOWN"
 
+@dataclasses.dataclass
 class LogEntry:
     """A single log entry."""
     timestamp: str
@@ -38,6 +49,58 @@ class LogEntry:
     message: str
     """The log message."""
 
+    @staticmethod
+    def from_json(entry: dict) -> 'LogEntry':
+        """Make a LogEntry from a log entry as the server sends it (whichever way its fields are spelled)."""
+        level = entry.get('level', LogLevel.UNKNOWN.value)
+        return LogEntry(
+            timestamp=entry.get('timestamp', entry.get('date', '')),
+            level=LogLevel(level) if level in [l.value for l in LogLevel] else LogLevel.UNKNOWN,
+            service=entry.get('service', entry.get('servicename')),
+            process=entry.get('process', entry.get('processname')),
+            thread=entry.get('thread', entry.get('threadname')),
+            message=entry.get('message', '')
+        )
+
+class LogStream:
+    """
+    An open stream of new log entries (see `LoggingClient.stream_logs`).
+    Iterating over it blocks until each entry arrives. Close it (from any thread) to stop.
+    """
+    def __init__(self, response) -> None:
+        self._response = response
+        self._closed = False
+        self.ndropped = 0
+        """How many entries the server dropped because we were not keeping up."""
+
+    def __iter__(self):
+        event = None
+        try:
+            for line in self._response.iter_lines(decode_unicode=True):
+                if line.startswith('event:'):
+                    event = line[len('event:'):].strip()
+                elif line.startswith('data:'):
+                    data = json.loads(line[len('data:'):])
+                    if event == 'dropped':
+                        self.ndropped += data.get('count', 0)
+                    else:
+                        yield LogEntry.from_json(data)
+                elif not line:
+                    event = None
+        except (AttributeError, ValueError, OSError, requests.RequestException):
+            # The stream was closed out from under us
+            if not self._closed:
+                raise
+
+    def close(self):
+        self._closed = True
+        try:
+            # Closing the response does not wake up a thread blocked reading it, but shutting down the socket does
+            self._response.raw.connection.sock.shutdown(socket.SHUT_RDWR)
+        except (AttributeError, OSError):
+            pass
+        self._response.close()
+
 @dataclasses.dataclass
 class RecentLogsResponse:
     """Response object for recent logs API call."""
@@ -104,6 +167,24 @@ class ListServicesResponse:
     services: list[str]
     """List of service names."""
 
+@dataclasses.dataclass
+class CatalogResponse:
+    """Response object for the log catalog API call."""
+    artie_id: str
+    """The Artie ID."""
+
+    levels: list[LogLevel]
+    """Log levels that have been logged."""
+
+    services: list[str]
+    """Service names."""
+
+    processes: list[str]
+    """Process names."""
+
+    threads: list[str]
+    """Thread names."""
+
 
 class LoggingClient(api_client.APIClient):
     """Client for interacting with the Logging API endpoints."""
@@ -216,6 +297,128 @@ class LoggingClient(api_client.APIClient):
         else:
             return errors.APIClientError(f"Failed to query logs: {response.status_code} {response.text}")
 
+    def iter_logs(self, starttime: datetime.datetime|None = None, endtime: datetime.datetime|None = None, message_contains: str|None = None,
+                  level: LogLevel|None = None, service: str|None = None, limit: int|None = None, page_size=1000, stream=False,
+                  stop_event: threading.Event|None = None) -> Iterator[LogEntry]:
+        """
+        Iterate over every log entry that matches the given filters, oldest first. Unlike `query_logs`,
+        entries are fetched as you go, so there is no limit on how many you can get and memory use does not grow with it.
+
+        Args:
+            starttime: Start time filter.
+            endtime: End time filter.
+            message_contains: Substring that must be in the log message.
+            level: Log level filter.
+            service: Service name filter.
+            limit: Stop after this many entries (all of them if None).
+            page_size: How many entries to ask for per request.
+            stream: If True, get every entry in one streamed (NDJSON) response instead of one request per page.
+            stop_event: If given, stop (without an error) as soon as it is set, even while waiting for the server's log index.
+
+        Returns:
+            An iterator of LogEntry objects. Iterating raises `errors.HTTPError` if the server returns an error.
+        """
+        body = {
+            'start_time': starttime.isoformat() if starttime is not None else None,
+            'end_time': endtime.isoformat() if endtime is not None else None,
+            'message_contains': message_contains,
+            'level': str(level) if level is not None else None,
+            'service': service,
+        }
+        body = {k: v for k, v in body.items() if v is not None}
+        params = {'artie-id': self.artie.artie_name}
+
+        if stream:
+            body['format'] = 'ndjson'
+            if limit is not None:
+                body['limit'] = limit
+            response = self._post_query(body, params, stream=True, stop_event=stop_event)
+            if response is None:
+                return
+            try:
+                for line in response.iter_lines(decode_unicode=True):
+                    if line:
+                        yield LogEntry.from_json(json.loads(line))
+            finally:
+                response.close()
+            return
+
+        nreceived = 0
+        while limit is None or nreceived < limit:
+            body['limit'] = page_size if limit is None else min(page_size, limit - nreceived)
+            response = self._post_query(body, params, wanted=None if limit is None else limit - nreceived, stop_event=stop_event)
+            if response is None:
+                return
+            data = response.json()
+            for entry in data.get('logs', []):
+                yield LogEntry.from_json(entry)
+            nreceived += len(data.get('logs', []))
+            if not data.get('next_cursor'):
+                return
+            body['cursor'] = data['next_cursor']
+
+    def _post_query(self, body: dict, params: dict, stream=False, wanted: int|None = None, stop_event: threading.Event|None = None) -> requests.Response|None:
+        """
+        POST a query to /logs/query, waiting (up to `INDEX_WAIT_RETRIES` times) if the server cannot
+        page through the results yet because it is still building its log index. No need to wait
+        for the rest of the results if the first page already holds the `wanted` entries.
+        Returns `None` if `stop_event` is set while we wait.
+        """
+        for _ in range(INDEX_WAIT_RETRIES):
+            if stream:
+                response = self.post_stream('/logs/query', body=body, params=params)
+            else:
+                response = self.post('/logs/query', body=body, params=params)
+
+            if response.status_code == 503:
+                wait_s = float(response.headers.get('Retry-After', 5))
+            elif response.status_code != 200:
+                err = errors.HTTPError(response.status_code, f"Failed to query logs: {response.text}")
+                response.close()
+                raise err
+            elif stream or not response.json().get('truncated') or response.json().get('next_cursor'):
+                return response
+            elif wanted is not None and len(response.json().get('logs', [])) >= wanted:
+                return response
+            else:
+                # Answered without the index, so there is no way to get the rest yet
+                wait_s = 5
+
+            response.close()
+            if stop_event is None:
+                time.sleep(wait_s)
+            elif stop_event.wait(wait_s):
+                return None
+        raise errors.HTTPError(503, "Gave up waiting for the API server to build its log index.")
+
+    def stream_logs(self, level: LogLevel|None = None, process: str|None = None, thread: str|None = None, service: str|None = None) -> errors.HTTPError|LogStream:
+        """
+        Open a stream of log entries as they are logged from now on, instead of polling `get_recent_logs`.
+
+        Args:
+            level: Optional log level filter.
+            process: Optional process name filter.
+            thread: Optional thread name filter.
+            service: Optional service name filter.
+
+        Returns:
+            LogStream to iterate over (and close when done).
+        """
+        params = {
+            'artie-id': self.artie.artie_name,
+            'level': level.value if level is not None else '*',
+            'process': process if process is not None else '*',
+            'thread': thread if thread is not None else '*',
+            'service': service if service is not None else '*'
+        }
+
+        response = self.get_stream('/logs/stream', params=params)
+        if response.status_code != 200:
+            err = errors.HTTPError(response.status_code, f"Failed to stream logs: {response.text}")
+            response.close()
+            return err
+        return LogStream(response)
+
     def list_services(self) -> errors.HTTPError|ListServicesResponse:
         """
         List all services that have logged messages.
@@ -231,8 +434,32 @@ class LoggingClient(api_client.APIClient):
         if response.status_code == 200:
             data = response.json()
             return ListServicesResponse(
-                artie_id=data['artie_id'],
+                artie_id=data.get('artie_id', self.artie.artie_name),
                 services=data.get('services', [])
             )
         else:
-            return errors.APIClientError(f"Failed to list services: {response.status_code} {response.text}")
+            return errors.HTTPError(response.status_code, f"Failed to list services: {response.text}")
+
+    def get_catalog(self) -> errors.HTTPError|CatalogResponse:
+        """
+        List all levels, services, processes, and threads that have logged messages.
+
+        Returns:
+            CatalogResponse object containing the names.
+        """
+        params = {
+            'artie-id': self.artie.artie_name
+        }
+
+        response = self.get('/logs/catalog', params=params)
+        if response.status_code != 200:
+            return errors.HTTPError(response.status_code, f"Failed to get log catalog: {response.text}")
+
+        data = response.json()
+        return CatalogResponse(
+            artie_id=data.get('artie_id', self.artie.artie_name),
+            levels=[LogLevel(level) if level in [l.value for l in LogLevel] else LogLevel.UNKNOWN for level in data.get('levels', [])],
+            services=data.get('services', []),
+            processes=data.get('processes', []),
+            threads=data.get('threads', [])
+        )
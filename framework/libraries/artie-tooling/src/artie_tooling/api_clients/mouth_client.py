@@ -126,8 +126,11 @@ class MouthClient(api_client.APIClient):
             return errors.HTTPError(response.status_code, f"Error setting mouth LCD: {response.content.decode('utf-8')}")
         return None
 
-    def firmware_load(self) -> errors.HTTPError|None:
-        response = self.post(f"/mouth/fw", params={'artie-id': self.artie.artie_name})
+    def firmware_load(self, force=False) -> errors.HTTPError|None:
+        params = {'artie-id': self.artie.artie_name}
+        if force:
+            params['force'] = 'true'
+        response = self.post(f"/mouth/fw", params=params)
         if response.status_code != 200:
             return errors.HTTPError(response.status_code, f"Error reloading mouth FW: {response.content.decode('utf-8')}")
         return None
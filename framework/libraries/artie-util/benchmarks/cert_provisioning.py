@@ -0,0 +1,46 @@
+"""
+Measure the part of a driver's cold start that goes to getting a TLS certificate:
+
+- What drivers used to do: generate a new RSA-4096 certificate on every start.
+- A new ECDSA P-256 certificate (first start with an empty certificate directory).
+- Reusing the certificate persisted by a previous start.
+
+Run this on the controller node to get numbers that matter:
+
+    python benchmarks/cert_provisioning.py --nruns 5
+"""
+from artie_util import util
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+def _bench(name: str, provision, nruns: int):
+    durations = []
+    for _ in range(nruns):
+        ts = time.perf_counter()
+        provision()
+        durations.append(time.perf_counter() - ts)
+    print(f"{name:>32}: mean {1e3 * statistics.mean(durations):8.1f} ms | max {1e3 * max(durations):8.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nruns", type=int, default=5, help="Number of runs per measurement.")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    certfpath = os.path.join(tmpdir, "certs", "cert.pem")
+    keyfpath = os.path.join(tmpdir, "certs", "pkey.pem")
+    os.makedirs(os.path.dirname(certfpath))
+
+    def fresh_ecdsa():
+        shutil.rmtree(os.path.dirname(certfpath), ignore_errors=True)
+        util.provision_cert(certfpath, keyfpath, days=None)
+
+    _bench("RSA-4096, generated every start", lambda: util.generate_self_signed_cert(certfpath, keyfpath, days=None, force=True, key_type="rsa"), args.nruns)
+    _bench("ECDSA P-256, first start", fresh_ecdsa, args.nruns)
+    _bench("Persisted certificate reused", lambda: util.provision_cert(certfpath, keyfpath, days=None), args.nruns)
+
+    shutil.rmtree(tmpdir, ignore_errors=True)
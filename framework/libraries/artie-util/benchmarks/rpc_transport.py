@@ -0,0 +1,98 @@
+"""
+Compare per-call latency and CPU cost of the RPyC transport against the
+binary (MsgPack) RPC transport.
+
+Both servers run in this process on localhost, serving the same service object,
+so the CPU numbers include both the client and the server side of each call.
+Run this on the controller node to get numbers that matter:
+
+    python benchmarks/rpc_transport.py --ncalls 500
+"""
+from artie_util import artie_logging as alog
+from artie_util import binrpc
+from artie_util import rpycserver
+from artie_util import util
+from rpyc.utils import factory
+import argparse
+import os
+import resource
+import rpyc
+import statistics
+import tempfile
+import threading
+import time
+
+@rpyc.service
+class BenchmarkService(rpycserver.Service):
+    @rpyc.exposed
+    def whoami(self) -> str:
+        return "artie-rpc-benchmark"
+
+    @rpyc.exposed
+    def lcd_get(self, side: str):
+        return ['M', 'H', 'M']
+
+    @rpyc.exposed
+    def status(self):
+        return {"FW": "working", "LED-LEFT": "working", "LED-RIGHT": "working", "LCD-LEFT": "working", "LCD-RIGHT": "working"}
+
+def _cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def _bench(name: str, call, ncalls: int):
+    # Warm up
+    for _ in range(min(10, ncalls)):
+        call()
+
+    latencies = []
+    cpu_start = _cpu_seconds()
+    wall_start = time.perf_counter()
+    for _ in range(ncalls):
+        ts = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - ts)
+    wall_s = time.perf_counter() - wall_start
+    cpu_s = _cpu_seconds() - cpu_start
+
+    latencies.sort()
+    p99 = latencies[int(0.99 * (len(latencies) - 1))]
+    print(f"{name:>28}: mean {1e6 * statistics.mean(latencies):8.1f} us | p50 {1e6 * statistics.median(latencies):8.1f} us | p99 {1e6 * p99:8.1f} us | CPU/call {1e6 * cpu_s / ncalls:8.1f} us | {ncalls / wall_s:8.0f} calls/s")
+
+def _as_list_rpyc(conn):
+    # This is what callers of the RPyC transport have to do to get a list out of a netref
+    return [v for v in conn.root.lcd_get('left')]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ncalls", type=int, default=500, help="Number of calls per measurement.")
+    parser.add_argument("--rpyc-port", type=int, default=28861, help="Port for the RPyC server.")
+    parser.add_argument("--binrpc-port", type=int, default=28871, help="Port for the binary RPC server.")
+    args = parser.parse_args()
+
+    os.environ.setdefault("ARTIE_RUN_MODE", "unit")
+    alog.init("rpc-benchmark")
+
+    tmpdir = tempfile.mkdtemp()
+    certfpath = os.path.join(tmpdir, "cert.pem")
+    keyfpath = os.path.join(tmpdir, "pkey.pem")
+    util.generate_self_signed_cert(certfpath, keyfpath, days=1, force=True)
+
+    service = BenchmarkService()
+    rpyc_server = util.create_rpc_server(service, keyfpath, certfpath, args.rpyc_port)
+    threading.Thread(target=rpyc_server.start, daemon=True).start()
+    binrpc.create_binrpc_server(service, keyfpath, certfpath, args.binrpc_port).start()
+    time.sleep(0.5)
+
+    rpyc_conn = factory.ssl_connect("localhost", args.rpyc_port)
+    bin_conn = binrpc.BinaryRPCClient("localhost", args.binrpc_port)
+
+    _bench("rpyc whoami()", lambda: rpyc_conn.root.whoami(), args.ncalls)
+    _bench("binrpc whoami()", lambda: bin_conn.whoami(), args.ncalls)
+    _bench("rpyc lcd_get() -> list", lambda: _as_list_rpyc(rpyc_conn), args.ncalls)
+    _bench("binrpc lcd_get() -> list", lambda: bin_conn.lcd_get('left'), args.ncalls)
+    _bench("rpyc status() -> dict", lambda: {k: v for k, v in rpyc_conn.root.status().items()}, args.ncalls)
+    _bench("binrpc status() -> dict", lambda: bin_conn.status(), args.ncalls)
+
+    bin_conn.close()
+    rpyc_conn.close()
@@ -0,0 +1,108 @@
+"""
+Measure the cost of a TLS connection to a driver-style server:
+
+- RSA-4096 vs ECDSA P-256 certificates
+- A fresh SSLContext per connection (what rpyc's SSLAuthenticator and factory.ssl_connect do)
+  vs the shared contexts in artie_util.tls, which resume the previous session.
+
+The server runs in this process on localhost, so the CPU numbers include both sides
+of each handshake. Run this on the controller node to get numbers that matter:
+
+    python benchmarks/tls_handshake.py --nconnections 200
+"""
+from artie_util import artie_logging as alog
+from artie_util import tls
+from artie_util import util
+import argparse
+import os
+import resource
+import socket
+import ssl
+import statistics
+import tempfile
+import threading
+import time
+
+def _cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def _fresh_server_context(keyfpath: str, certfpath: str) -> ssl.SSLContext:
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.set_ciphers(':'.join(util.get_cipher_list()))
+    context.load_cert_chain(certfile=certfpath, keyfile=keyfpath)
+    return context
+
+def _fresh_client_wrap(sock: socket.socket, host: str, port: int) -> ssl.SSLSocket:
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context.wrap_socket(sock, server_hostname=host)
+
+def _serve(listener: socket.socket, get_context):
+    """
+    Accept connections forever. Each connection: handshake, echo one byte, close.
+    """
+    while True:
+        sock, _ = listener.accept()
+        try:
+            with get_context().wrap_socket(sock, server_side=True) as ssock:
+                ssock.sendall(ssock.recv(1))
+        except (OSError, ssl.SSLError):
+            pass
+
+def _bench(name: str, port: int, wrap, nconnections: int):
+    def connect_once():
+        sock = socket.create_connection(("localhost", port))
+        ssock = wrap(sock, "localhost", port)
+        # One round trip, so that the TLS 1.3 session tickets get read before we close
+        ssock.sendall(b'\0')
+        ssock.recv(1)
+        resumed = ssock.session_reused
+        ssock.close()
+        return resumed
+
+    # Warm up (this also gets us a session to resume)
+    for _ in range(min(5, nconnections)):
+        connect_once()
+
+    latencies = []
+    nresumed = 0
+    cpu_start = _cpu_seconds()
+    for _ in range(nconnections):
+        ts = time.perf_counter()
+        nresumed += int(connect_once())
+        latencies.append(time.perf_counter() - ts)
+    cpu_s = _cpu_seconds() - cpu_start
+
+    latencies.sort()
+    p99 = latencies[int(0.99 * (len(latencies) - 1))]
+    print(f"{name:>40}: mean {1e3 * statistics.mean(latencies):7.2f} ms | p99 {1e3 * p99:7.2f} ms | CPU/connection {1e3 * cpu_s / nconnections:7.2f} ms | resumed {nresumed}/{nconnections}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nconnections", type=int, default=200, help="Number of connections per measurement.")
+    args = parser.parse_args()
+
+    os.environ.setdefault("ARTIE_RUN_MODE", "unit")
+    alog.init("tls-benchmark")
+
+    tmpdir = tempfile.mkdtemp()
+    for key_type in ("rsa", "ecdsa"):
+        certfpath = os.path.join(tmpdir, f"{key_type}-cert.pem")
+        keyfpath = os.path.join(tmpdir, f"{key_type}-pkey.pem")
+        ts = time.perf_counter()
+        util.generate_self_signed_cert(certfpath, keyfpath, days=1, force=True, key_type=key_type)
+        print(f"{key_type}: generated key and certificate in {time.perf_counter() - ts:.2f} s")
+
+        for shared in (False, True):
+            listener = socket.create_server(("localhost", 0))
+            port = listener.getsockname()[1]
+            if shared:
+                get_context = lambda: tls.server_context(keyfpath, certfpath, util.get_cipher_list())
+                wrap = tls.wrap_client_socket
+            else:
+                get_context = lambda: _fresh_server_context(keyfpath, certfpath)
+                wrap = _fresh_client_wrap
+            threading.Thread(target=_serve, args=(listener, get_context), daemon=True).start()
+            _bench(f"{key_type} {'shared contexts + resumption' if shared else 'new context per connection'}", port, wrap, args.nconnections)
@@ -11,5 +11,10 @@ setup(
         "opentelemetry-sdk==1.17.0",
         "opentelemetry-exporter-otlp==1.17.0",
         "opentelemetry-exporter-prometheus==1.12.0rc1",
-    ]
+    ],
+    extras_require={
+        "binrpc": [
+            "msgpack>=1.0",
+        ],
+    },
 )
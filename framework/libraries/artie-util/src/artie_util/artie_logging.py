@@ -23,7 +23,6 @@ import os
 import prometheus_client as promc
 import queue
 import random
-import ssl
 import string
 import traceback
 
@@ -64,9 +63,6 @@ class ArtieLogSocketHandler(loghandlers.SocketHandler):
     """
     def __init__(self, host: str, port: int | None) -> None:
         super().__init__(host, port)
-        self.sslcontext = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-        self.sslcontext.check_hostname = False
-        self.sslcontext.verify_mode = ssl.CERT_NONE
         self.QUIT_SIGNAL = "".join(random.choices(string.ascii_letters + string.digits, k=32))
         self.queue = multiprocessing.Queue(maxsize=1000)
         self.emitter_proc = multiprocessing.Process(target=_emit_records_to_remote, args=(self,), daemon=True)
@@ -117,7 +113,10 @@ class ArtieLogSocketHandler(loghandlers.SocketHandler):
             # Unix socket
             return sock
 
-        return self.sslcontext.wrap_socket(sock, server_hostname=self.host)
+        # Share one context and resume the previous session, so reconnecting after a dropped connection is cheap.
+        # Imported here because tls needs rpyc, which not everyone who logs has installed.
+        from . import tls
+        return tls.wrap_client_socket(sock, self.host, self.port)
 
     def close(self):
         self.queue.put(self.QUIT_SIGNAL, timeout=2.0)
@@ -0,0 +1,249 @@
+"""
+A compact binary RPC transport for driver services.
+
+This is meant to run side by side with the RPyC server that `util.create_rpc_server`
+creates. Unlike RPyC, there are no netrefs: every return value is serialized
+by value, so a list of vertices comes back as a list rather than as a proxy whose every
+element access is another round trip.
+
+Wire format
+-----------
+
+Every message in either direction is a 4-byte big-endian length followed by
+that many bytes of MsgPack. The whole stream is wrapped in TLS.
+
+* On connect, the server sends the method table: a list of method names, which is
+  derived from the service's `@rpyc.exposed` methods (sorted by name).
+* A request is `[msgid, method index, [args...], {kwargs...}]`.
+* A response is `[msgid, errmsg or None, result]`.
+"""
+from . import artie_logging as alog
+from . import rpycserver
+from . import tls
+from . import util
+from typing import Any, Dict, List
+import enum
+import inspect
+import itertools
+import socket
+import socketserver
+import ssl
+import struct
+import threading
+
+try:
+    import msgpack
+except ModuleNotFoundError:
+    msgpack = None
+
+# Frame header: 4 byte, big-endian, unsigned payload length
+_HEADER = struct.Struct(">I")
+
+# Refuse to allocate frames larger than this
+MAX_FRAME_NBYTES = 4 * 1024 * 1024
+
+class BinaryRPCError(Exception):
+    """
+    Raised on the client side when the remote method raised an exception
+    or when the method does not exist in the server's method table.
+    """
+    pass
+
+def _check_msgpack():
+    if msgpack is None:
+        raise ModuleNotFoundError("The binary RPC transport requires msgpack. Install artie-util with the 'binrpc' extra.")
+
+def _to_builtin(obj):
+    """
+    MsgPack `default` hook for values it does not know how to serialize.
+    """
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    elif isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return str(obj)
+
+def _send_frame(sock, obj):
+    payload = msgpack.packb(obj, default=_to_builtin, use_bin_type=True)
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+def _recv_exactly(sock, nbytes: int) -> bytes|None:
+    buf = bytearray()
+    while len(buf) < nbytes:
+        chunk = sock.recv(nbytes - len(buf))
+        if not chunk:
+            return None
+        buf.extend(chunk)
+    return bytes(buf)
+
+def _recv_frame(sock):
+    """
+    Read one frame from `sock` and return the unpacked object.
+    Return `None` if the connection was closed.
+    """
+    header = _recv_exactly(sock, _HEADER.size)
+    if header is None:
+        return None
+
+    (nbytes,) = _HEADER.unpack(header)
+    if nbytes > MAX_FRAME_NBYTES:
+        raise BinaryRPCError(f"Refusing to read a frame of {nbytes} bytes (max is {MAX_FRAME_NBYTES}).")
+
+    payload = _recv_exactly(sock, nbytes)
+    if payload is None:
+        return None
+    return msgpack.unpackb(payload, raw=False)
+
+def exposed_method_names(service) -> List[str]:
+    """
+    Return the sorted list of method names that `service` exposes over RPyC.
+    The index of each name in this list is its ID on the wire.
+    """
+    exposed_prefix = "exposed_"
+    names = set()
+    for name, attr in inspect.getmembers(type(service)):
+        if name.startswith(exposed_prefix):
+            continue
+        if getattr(attr, '__exposed__', False) and callable(attr):
+            names.add(name)
+    return sorted(names)
+
+class _BinaryRPCHandler(socketserver.BaseRequestHandler):
+    """
+    Serves one client connection until that client disconnects.
+    """
+    def handle(self):
+        server: BinaryRPCServer = self.server
+        sock = self.request
+        try:
+            _send_frame(sock, server.method_names)
+            while True:
+                request = _recv_frame(sock)
+                if request is None:
+                    return
+
+                msgid, method_index, args, kwargs = request
+                try:
+                    result = server.method_table[method_index](*args, **kwargs)
+                    _send_frame(sock, [msgid, None, result])
+                except IndexError:
+                    _send_frame(sock, [msgid, f"No method with index {method_index}", None])
+                except Exception as e:
+                    alog.exception(f"Exception in binary RPC handler for method index {method_index}", e, stack_trace=True)
+                    _send_frame(sock, [msgid, f"{type(e).__name__}: {e}", None])
+        except (ConnectionError, ssl.SSLError, OSError) as e:
+            alog.debug(f"Binary RPC client {self.client_address} disconnected: {e}")
+
+class BinaryRPCServer(socketserver.ThreadingTCPServer):
+    """
+    A TLS-wrapped, threaded TCP server that dispatches MsgPack-framed
+    requests onto the `@rpyc.exposed` methods of a single (multi-tenant) service instance.
+    """
+    daemon_threads = True
+    allow_reuse_address = False
+
+    def __init__(self, service, keyfpath: str, certfpath: str, port: int, ipv6=False):
+        _check_msgpack()
+        self.address_family = socket.AF_INET6 if ipv6 else socket.AF_INET
+        self.method_names = exposed_method_names(service)
+        self.method_table = [rpycserver.instrumented(getattr(service, name), name) for name in self.method_names]
+
+        self.sslcontext = tls.server_context(keyfpath, certfpath, util.get_cipher_list())
+
+        hostname = "::" if ipv6 else "0.0.0.0"
+        super().__init__((hostname, port), _BinaryRPCHandler)
+
+    def get_request(self):
+        sock, addr = super().get_request()
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return self.sslcontext.wrap_socket(sock, server_side=True), addr
+
+    def start(self):
+        """
+        Serve forever on a background (daemon) thread and return that thread.
+        """
+        alog.info(f"Serving binary RPC on port {self.server_address[1]} with methods: {self.method_names}")
+        t = threading.Thread(target=self.serve_forever, name="binrpc-server", daemon=True)
+        t.start()
+        return t
+
+class BinaryRPCClient:
+    """
+    Client side of the binary RPC transport. Remote methods are available
+    as attributes, so `client.lcd_get('left')` works the same way it does on an RPyC root.
+
+    A single client may be shared between threads; calls are serialized on the connection.
+    """
+    def __init__(self, host: str, port: int, ipv6=False, timeout_s=None) -> None:
+        _check_msgpack()
+        self.host = host
+        self.port = port
+        self._lock = threading.Lock()
+        self._msgids = itertools.count()
+
+        family = socket.AF_INET6 if ipv6 else socket.AF_INET
+        raw = socket.socket(family, socket.SOCK_STREAM)
+        raw.settimeout(timeout_s)
+        raw.connect((host, port))
+        raw.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            self._sock = tls.wrap_client_socket(raw, host, port)
+        except BaseException:
+            raw.close()
+            raise
+
+        method_names = _recv_frame(self._sock)
+        if method_names is None:
+            raise ConnectionError(f"Binary RPC server at {host}:{port} closed the connection before sending its method table.")
+        self.method_ids: Dict[str, int] = {name: i for i, name in enumerate(method_names)}
+
+    def __getattr__(self, attr):
+        if attr.startswith("_") or attr not in self.method_ids:
+            raise AttributeError(f"Binary RPC server at {self.host}:{self.port} does not expose '{attr}'")
+
+        def remote_method(*args, **kwargs):
+            return self.call(attr, *args, **kwargs)
+        return remote_method
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def call(self, method: str, *args, **kwargs) -> Any:
+        """
+        Call `method` on the remote service and return its result.
+        Raise a `BinaryRPCError` if the remote method raised.
+        """
+        method_id = self.method_ids.get(method, None)
+        if method_id is None:
+            raise BinaryRPCError(f"Binary RPC server at {self.host}:{self.port} does not expose '{method}'")
+
+        with self._lock:
+            msgid = next(self._msgids)
+            _send_frame(self._sock, [msgid, method_id, list(args), kwargs])
+            response = _recv_frame(self._sock)
+
+        if response is None:
+            raise ConnectionError(f"Binary RPC server at {self.host}:{self.port} closed the connection.")
+
+        response_id, errmsg, result = response
+        if response_id != msgid:
+            raise BinaryRPCError(f"Out of order response from {self.host}:{self.port}: expected {msgid}, got {response_id}")
+        elif errmsg is not None:
+            raise BinaryRPCError(errmsg)
+        return result
+
+    def close(self):
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+def create_binrpc_server(service, keyfpath: str, certfpath: str, port: int, ipv6=False) -> BinaryRPCServer:
+    """
+    Create and return a binary RPC server for `service` (the same object that is handed
+    to `util.create_rpc_server`). Call `start()` on the result to serve in the background.
+    """
+    return BinaryRPCServer(service, keyfpath, certfpath, port, ipv6=ipv6)
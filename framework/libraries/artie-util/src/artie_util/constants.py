@@ -10,6 +10,16 @@ class ArtieEnvVariables(enum.StrEnum):
     LOG_COLLECTOR_HOSTNAME = "LOG_COLLECTOR_HOSTNAME"
     LOG_COLLECTOR_PORT = "LOG_COLLECTOR_PORT"
     METRICS_SERVER_PORT = "METRICS_SERVER_PORT"
+    ARTIE_TLS_SECRET_DIR = "ARTIE_TLS_SECRET_DIR"
+    ARTIE_DNS_TTL_S = "ARTIE_DNS_TTL_S"
+    ARTIE_DNS_OVERRIDES = "ARTIE_DNS_OVERRIDES"
+    ARTIE_DNS_OVERRIDES_FILE = "ARTIE_DNS_OVERRIDES_FILE"
+    RPC_NWORKERS = "RPC_NWORKERS"
+    RPC_ACCEPT_BACKLOG = "RPC_ACCEPT_BACKLOG"
+    RPC_MAX_CONNECTIONS = "RPC_MAX_CONNECTIONS"
+    RPC_REQUEST_BATCH_SIZE = "RPC_REQUEST_BATCH_SIZE"
+    DRIVER_WRITE_STALENESS_S = "DRIVER_WRITE_STALENESS_S"
+    DRIVER_STATE_DIR = "DRIVER_STATE_DIR"
 
 class ArtieRunModes(enum.StrEnum):
     """
@@ -29,3 +39,4 @@ class SubmoduleStatuses(enum.StrEnum):
     DEGRADED = "degraded"
     NOT_WORKING = "not working"
     UNKNOWN = "unknown"
+    INITIALIZING = "initializing"
@@ -1,10 +1,29 @@
 """
 This module contains mappings from hostnames to IP addresses/Kubernetes Services, etc.
+
+`lookup` gives the (host, port) of a service. `resolve` goes one step further and gives
+the IP addresses of that host, which are cached for `ARTIE_DNS_TTL_S` seconds so that
+opening many connections to the same driver does not query the cluster DNS every time.
+
+Resolution can be overridden (e.g., to point at test stand-ins) by means of:
+
+- The ARTIE_DNS_OVERRIDES env variable: a comma-separated list of `host=ip[;ip...]`
+  entries, e.g., `reset-driver=127.0.0.1,mouth-driver=10.0.0.5;10.0.0.6`.
+- The file given by the ARTIE_DNS_OVERRIDES_FILE env variable: one `host ip [ip...]`
+  entry per line, like /etc/hosts but with the host first. '#' starts a comment.
+
+The env variable takes precedence over the file.
 """
+from . import artie_logging as alog
 from . import constants
 from . import util
+from typing import Dict, List, Tuple
 import enum
+import functools
 import os
+import socket
+import threading
+import time
 
 @enum.unique
 class Lookups(enum.Enum):
@@ -22,6 +41,13 @@ _ports = {
     Lookups.MOUTH_DRIVER: 18862,
 }
 
+# The ports for each service's binary RPC transport (see binrpc.py), which runs alongside RPyC
+_binrpc_ports = {
+    Lookups.RESET_DRIVER: 18871,
+    Lookups.EYEBROWS_DRIVER: 18873,
+    Lookups.MOUTH_DRIVER: 18872,
+}
+
 # The service names. These should be the same in this file, in the Kubernetes Service definitions, and in the Docker-compose tests.
 _services = {
     Lookups.RESET_DRIVER: "reset-driver",
@@ -29,13 +55,27 @@ _services = {
     Lookups.MOUTH_DRIVER: "mouth-driver",
 }
 
-def lookup(item: Lookups, artie_id=None):
+# Default number of seconds to keep a resolved address before resolving it again
+DEFAULT_TTL_S = 30.0
+
+# Resolved addresses: {(host, ipv6): (expiration timestamp, [address, ...])}
+_resolved: Dict[Tuple[str, bool], Tuple[float, List[str]]] = {}
+_resolved_lock = threading.Lock()
+
+@functools.cache
+def lookup(item: Lookups, artie_id=None, binrpc=False):
     """
     Look up the given item and return a tuple of the form (host (str), port (int))
     Raise a KeyError if we can't find the given item.
+
+    If `binrpc` is True, the port is the one for the binary RPC transport instead of RPyC.
+
+    The result depends only on the arguments and on env variables that are fixed for the lifetime
+    of the process, so it is computed once per set of arguments.
     """
-    if item not in _ports:
-        raise KeyError(f"Item {item} cannot be found in Artie's DNS library. Allowable values: {_ports.keys()}")
+    ports = _binrpc_ports if binrpc else _ports
+    if item not in ports:
+        raise KeyError(f"Item {item} cannot be found in Artie's DNS library. Allowable values: {ports.keys()}")
 
     # If we are running on Kubernetes, we need to include Artie's ID
     if artie_id is None:
@@ -46,6 +86,90 @@ def lookup(item: Lookups, artie_id=None):
         artie_id = None
 
     if artie_id:
-        return f"{_services[item]}-{artie_id}", _ports[item]
+        return f"{_services[item]}-{artie_id}", ports[item]
     else:
-        return _services[item], _ports[item]
+        return _services[item], ports[item]
+
+def _ttl_s() -> float:
+    return float(os.environ.get(constants.ArtieEnvVariables.ARTIE_DNS_TTL_S, DEFAULT_TTL_S))
+
+@functools.cache
+def _overrides() -> Dict[str, List[str]]:
+    """
+    Read the address overrides from the file and the env variable (see module docstring).
+    """
+    overrides = {}
+
+    fpath = os.environ.get(constants.ArtieEnvVariables.ARTIE_DNS_OVERRIDES_FILE, None)
+    if fpath:
+        try:
+            with open(fpath, 'r') as f:
+                for line in f:
+                    fields = line.split('#', 1)[0].split()
+                    if len(fields) >= 2:
+                        overrides[fields[0]] = fields[1:]
+        except OSError as e:
+            alog.exception(f"Could not read DNS overrides file {fpath}: ", e)
+
+    for entry in os.environ.get(constants.ArtieEnvVariables.ARTIE_DNS_OVERRIDES, "").split(','):
+        if '=' in entry:
+            host, addresses = entry.split('=', 1)
+            overrides[host.strip()] = [a.strip() for a in addresses.split(';') if a.strip()]
+
+    return overrides
+
+def resolve(item: Lookups, artie_id=None, binrpc=False, ipv6=False) -> Tuple[List[str], int]:
+    """
+    Look up the given item (see `lookup`), then resolve its host and return a tuple
+    of the form ([address (str), ...], port (int)).
+
+    Addresses are cached for ARTIE_DNS_TTL_S seconds (default `DEFAULT_TTL_S`).
+    If the host can't be resolved, we return the host name itself as the only address,
+    and let the connection attempt report the error.
+    """
+    host, port = lookup(item, artie_id=artie_id, binrpc=binrpc)
+
+    overrides = _overrides()
+    if host in overrides:
+        return list(overrides[host]), port
+
+    key = (host, ipv6)
+    now = time.monotonic()
+    with _resolved_lock:
+        cached = _resolved.get(key, None)
+    if cached is not None and cached[0] > now:
+        return list(cached[1]), port
+
+    family = socket.AF_INET6 if ipv6 else socket.AF_INET
+    try:
+        infos = socket.getaddrinfo(host, port, family=family, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        alog.warning(f"Could not resolve {host}: {e}")
+        return [host], port
+
+    # Preserve the resolver's order but drop duplicates
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    with _resolved_lock:
+        _resolved[key] = (now + _ttl_s(), addresses)
+    return list(addresses), port
+
+def invalidate(item: Lookups, artie_id=None, binrpc=False):
+    """
+    Drop the cached addresses for the given item, so that the next call to `resolve`
+    queries DNS again. Call this when connecting to a cached address fails
+    (e.g., because the pod behind it was rescheduled).
+    """
+    host, _ = lookup(item, artie_id=artie_id, binrpc=binrpc)
+    with _resolved_lock:
+        _resolved.pop((host, False), None)
+        _resolved.pop((host, True), None)
+
+def clear_cache():
+    """
+    Forget all cached lookups, addresses, and overrides.
+    Useful if the DNS-related env variables change at run time (e.g., in tests).
+    """
+    lookup.cache_clear()
+    _overrides.cache_clear()
+    with _resolved_lock:
+        _resolved.clear()
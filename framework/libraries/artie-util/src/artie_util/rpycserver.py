@@ -1,8 +1,33 @@
 """
 This module exposes an RPyC Server subclass which should act as the
-base class for all driver services.
+base class for all driver services, as well as the thread pool server
+that `util.create_rpc_server` uses to serve them.
 """
+from . import artie_logging as alog
+from rpyc.utils.server import ThreadPoolServer
+import functools
+import os
+import queue
 import rpyc
+import time
+
+def instrumented(f, method_name: str):
+    """
+    Wrap `f` (an exposed method) so that every call records in-flight requests
+    and handler duration metrics under `method_name`.
+    """
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        attributes = {alog.KnownMetricAttributes.FUNCTION_NAME: method_name}
+        alog.update_updown_counter(1, "rpc-in-flight", alog.MetricSWCodePathAPIOrder.CALLS, unit=alog.MetricUnits.CALLS, description="Number of RPC requests currently being handled.", attributes=dict(attributes))
+        start_s = time.perf_counter()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            duration_s = time.perf_counter() - start_s
+            alog.update_updown_counter(-1, "rpc-in-flight", alog.MetricSWCodePathAPIOrder.CALLS, unit=alog.MetricUnits.CALLS, description="Number of RPC requests currently being handled.", attributes=dict(attributes))
+            alog.update_histogram(duration_s, "rpc-handler-duration", alog.MetricSWCodePathAPIOrder.LATENCY, unit=alog.MetricUnits.SECONDS, description="Time spent inside RPC handlers.", attributes=dict(attributes))
+    return wrapper
 
 class Service(rpyc.Service):
     # See https://rpyc.readthedocs.io/en/latest/docs/security.html#attribute-access
@@ -10,5 +35,75 @@ class Service(rpyc.Service):
         if name.startswith("__"):
             # disallow special and private attributes
             raise AttributeError("cannot access private/special names")
-        # allow all other attributes
-        return getattr(self, name)
+
+        # allow all other attributes, but instrument the exposed methods
+        attr = getattr(self, name)
+        if callable(attr) and getattr(attr, '__exposed__', False):
+            instrumented_methods = self.__dict__.setdefault('_instrumented_methods', {})
+            if name not in instrumented_methods:
+                instrumented_methods[name] = instrumented(attr, name)
+            return instrumented_methods[name]
+        return attr
+
+class _TimedQueue(queue.Queue):
+    """
+    The queue of connections that have a request ready for a worker.
+    Records how long each connection waits in it.
+    """
+    def _put(self, item):
+        super()._put((item, time.perf_counter()))
+
+    def _get(self):
+        item, enqueued_s = super()._get()
+        if item is not None:
+            alog.update_histogram(time.perf_counter() - enqueued_s, "rpc-queue-wait", alog.MetricSWCodePathAPIOrder.LATENCY, unit=alog.MetricUnits.SECONDS, description="Time a ready connection waits for a free RPC worker.")
+        return item
+
+class ArtieThreadPoolServer(ThreadPoolServer):
+    """
+    A `ThreadPoolServer` that:
+
+    - Refuses connections beyond `max_connections` (if given).
+    - Records how long ready connections wait for a worker.
+    - Wakes its polling thread whenever a connection is handed back to it,
+      so that a client's next request does not wait out the poll timeout.
+    """
+    def __init__(self, *args, max_connections=None, **kwargs):
+        self.max_connections = max_connections
+        super().__init__(*args, **kwargs)
+        self._active_connection_queue = _TimedQueue()
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self._wakeup_w, False)
+        self.poll_object.register(self._wakeup_r, "r")
+
+    def close(self):
+        super().close()
+        os.close(self._wakeup_r)
+        os.close(self._wakeup_w)
+
+    def _add_inactive_connection(self, fd):
+        super()._add_inactive_connection(fd)
+        try:
+            os.write(self._wakeup_w, b'\0')
+        except BlockingIOError:
+            # The pipe is full, so the polling thread is going to wake up anyway
+            pass
+
+    def _handle_poll_result(self, connlist):
+        if any(fd == self._wakeup_r for fd, _ in connlist):
+            try:
+                while os.read(self._wakeup_r, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+        super()._handle_poll_result([(fd, evt) for fd, evt in connlist if fd != self._wakeup_r])
+
+    def _accept_method(self, sock):
+        if self.max_connections is not None and len(self.fd_to_conn) >= self.max_connections:
+            alog.warning(f"Refusing RPC connection: already serving the maximum of {self.max_connections} connections.")
+            alog.update_counter(1, "rpc-refused-connections", alog.MetricSWCodePathAPIOrder.CALLS, unit=alog.MetricUnits.CALLS, description="Number of RPC connections refused because the server was at its connection limit.")
+            sock.close()
+            return
+        super()._accept_method(sock)
+        alog.update_counter(1, "rpc-accepted-connections", alog.MetricSWCodePathAPIOrder.CALLS, unit=alog.MetricUnits.CALLS, description="Number of RPC connections accepted.")
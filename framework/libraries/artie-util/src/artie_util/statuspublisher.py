@@ -0,0 +1,93 @@
+"""
+This module contains the StatusPublisher, which lets driver services push
+their submodules' status transitions to subscribers instead of having
+clients poll `status()`.
+"""
+from . import artie_logging as alog
+from rpyc.core import netref
+from typing import Callable, Dict, Tuple
+import itertools
+import queue
+import rpyc
+import threading
+
+# What a subscriber receives: a tuple of (submodule, status) pairs.
+# Tuples of strings are sent by value over RPyC, so the subscriber does not need to make
+# further round trips to read them (as it would with a dict).
+StatusChanges = Tuple[Tuple[str, str], ...]
+
+class StatusPublisher:
+    """
+    Keeps the latest status of each submodule and pushes every transition to the subscribers.
+
+    A subscriber is a callable that takes a `StatusChanges` tuple, usually an RPyC netref
+    to a callback on the client. A new subscriber first receives the status of every submodule,
+    then only the ones that change.
+
+    Callbacks are invoked from a background thread, in the order in which the statuses changed,
+    so publishing never blocks on the network.
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._statuses: Dict[str, str] = {}
+        self._subscribers: Dict[int, Callable[[StatusChanges], None]] = {}
+        self._subscription_ids = itertools.count()
+        self._deliveries = queue.Queue()
+        self._delivery_thread = threading.Thread(target=self._deliver_forever, name="status-publisher", daemon=True)
+        self._delivery_thread.start()
+
+    def _deliver_forever(self):
+        while True:
+            subscription_id, callback, changes = self._deliveries.get()
+            with self._lock:
+                if subscription_id not in self._subscribers:
+                    continue
+
+            try:
+                if isinstance(callback, netref.BaseNetref):
+                    # Don't wait for the client to process it
+                    rpyc.async_(callback)(changes)
+                else:
+                    callback(changes)
+            except Exception as e:
+                alog.warning(f"Dropping status subscriber {subscription_id}: {e}")
+                self.unsubscribe(subscription_id)
+
+    def publish(self, statuses: Dict[str, str]):
+        """
+        Record the given {submodule: status} values and notify subscribers
+        of the ones that differ from what we last published.
+        """
+        with self._lock:
+            changes = tuple((k, str(v)) for k, v in statuses.items() if self._statuses.get(k, None) != str(v))
+            if not changes:
+                return
+
+            self._statuses.update(changes)
+            for subscription_id, callback in self._subscribers.items():
+                self._deliveries.put((subscription_id, callback, changes))
+
+    def snapshot(self) -> Dict[str, str]:
+        """
+        Return a copy of the latest {submodule: status} values.
+        """
+        with self._lock:
+            return dict(self._statuses)
+
+    def subscribe(self, callback: Callable[[StatusChanges], None]) -> int:
+        """
+        Register `callback` and return its subscription ID. The callback is called with
+        the current status of every submodule, then with each subsequent change.
+        """
+        with self._lock:
+            subscription_id = next(self._subscription_ids)
+            self._subscribers[subscription_id] = callback
+            self._deliveries.put((subscription_id, callback, tuple(self._statuses.items())))
+        return subscription_id
+
+    def unsubscribe(self, subscription_id: int):
+        """
+        Stop notifying the given subscriber. Unknown IDs are ignored.
+        """
+        with self._lock:
+            self._subscribers.pop(subscription_id, None)
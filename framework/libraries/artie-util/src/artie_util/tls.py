@@ -0,0 +1,133 @@
+"""
+Shared TLS contexts for Artie's clients and servers.
+
+Building an `ssl.SSLContext` and doing a full handshake is expensive on the Pi,
+so we build one context per role (and per certificate on the server side) and reuse it
+for every connection. Reusing the server context means its session ticket keys outlive
+any one connection, and the client side remembers the last session it had with each
+(host, port), so reconnects resume that session instead of doing a full handshake.
+"""
+from rpyc.core.service import VoidService
+from rpyc.core.stream import SocketStream
+from rpyc.utils.authenticators import AuthenticationError
+from rpyc.utils.factory import connect_stream
+from typing import Dict, List, Tuple
+import functools
+import socket
+import ssl
+import threading
+
+# The most recent session we had with each (host, port)
+_sessions: Dict[Tuple[str, int], ssl.SSLSession] = {}
+_sessions_lock = threading.Lock()
+
+class _SessionSavingSSLSocket(ssl.SSLSocket):
+    """
+    Client-side SSLSocket that saves its session for resumption. Under TLS 1.3 the
+    server's session tickets arrive after the handshake, so we also save on shutdown/close.
+    """
+    def _save_session(self):
+        key = getattr(self, '_artie_session_key', None)
+        if key is None:
+            return
+        try:
+            session = self.session
+        except (OSError, ValueError):
+            session = None
+        if session is not None:
+            with _sessions_lock:
+                _sessions[key] = session
+
+    def do_handshake(self, *args, **kwargs):
+        super().do_handshake(*args, **kwargs)
+        self._save_session()
+
+    def shutdown(self, how):
+        self._save_session()
+        super().shutdown(how)
+
+    def close(self):
+        self._save_session()
+        super().close()
+
+@functools.cache
+def client_context() -> ssl.SSLContext:
+    """
+    Return the process-wide client SSLContext.
+
+    We do not verify the server's certificate: servers use self-signed certificates and
+    we rely on the Kubernetes trust boundary for authentication (see `util.create_rpc_server`).
+    """
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    context.sslsocket_class = _SessionSavingSSLSocket
+    return context
+
+@functools.cache
+def _server_context(keyfpath: str, certfpath: str, ciphers: str) -> ssl.SSLContext:
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.verify_mode = ssl.CERT_NONE
+    context.set_ciphers(ciphers)
+    context.load_cert_chain(certfile=certfpath, keyfile=keyfpath)
+    # Session tickets are on by default, but make sure nobody turned them off
+    context.options &= ~ssl.OP_NO_TICKET
+    return context
+
+def server_context(keyfpath: str, certfpath: str, ciphers: List[str]) -> ssl.SSLContext:
+    """
+    Return the process-wide server SSLContext for the given key and certificate.
+    """
+    return _server_context(str(keyfpath), str(certfpath), ':'.join(ciphers))
+
+def clear_cache():
+    """
+    Forget all cached contexts and sessions (e.g., after the certificate on disk has changed).
+    """
+    client_context.cache_clear()
+    _server_context.cache_clear()
+    with _sessions_lock:
+        _sessions.clear()
+
+def wrap_client_socket(sock: socket.socket, host: str, port: int) -> ssl.SSLSocket:
+    """
+    Wrap the connected `sock` in TLS using the shared client context, resuming
+    the last session we had with `host`:`port` if there is one.
+    """
+    key = (host, port)
+    with _sessions_lock:
+        session = _sessions.get(key, None)
+
+    ssock = client_context().wrap_socket(sock, server_hostname=host, session=session, do_handshake_on_connect=False)
+    ssock._artie_session_key = key
+    ssock.do_handshake()
+    return ssock
+
+def ssl_connect(host: str, port: int, ipv6=False, service=VoidService, config=None):
+    """
+    Drop-in replacement for `rpyc.utils.factory.ssl_connect` (with our default arguments)
+    that uses the shared client context and resumes TLS sessions.
+    """
+    family = socket.AF_INET6 if ipv6 else socket.AF_INET
+    sock = SocketStream._connect(host, port, family=family)
+    try:
+        ssock = wrap_client_socket(sock, host, port)
+    except BaseException:
+        sock.close()
+        raise
+    return connect_stream(SocketStream(ssock), service, {} if config is None else config)
+
+class CachedSSLAuthenticator:
+    """
+    Same as `rpyc.utils.authenticators.SSLAuthenticator`, but wraps every connection
+    with one shared server context instead of building a new one per connection.
+    """
+    def __init__(self, keyfpath: str, certfpath: str, ciphers: List[str]) -> None:
+        self.context = server_context(keyfpath, certfpath, ciphers)
+
+    def __call__(self, sock):
+        try:
+            sock2 = self.context.wrap_socket(sock, server_side=True)
+        except ssl.SSLError as e:
+            raise AuthenticationError(str(e))
+        return sock2, sock2.getpeercert()
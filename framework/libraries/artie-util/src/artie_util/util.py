@@ -1,12 +1,13 @@
 from . import artie_logging as alog
 from . import constants
-from rpyc.utils.server import ThreadPoolServer
-from rpyc.utils.authenticators import SSLAuthenticator
+from . import rpycserver
+from . import tls
 import getpass
 import os
 import platform
 import ssl
 import subprocess
+import time
 
 # Mock interface name
 MOCK_IFACE_NAME = "artie.util.util"
@@ -42,22 +43,29 @@ if platform.system() == "Linux":
 else:
     alog.warning("Detected that we are not on Linux. Certain functionality will be limited.")
 
-def create_rpc_server(server, keyfpath: str, certfpath: str, port: int, ipv6=False):
+def _env_int(key: constants.ArtieEnvVariables, default: int|None) -> int|None:
+    value = os.environ.get(key, None)
+    return default if value is None else int(value)
+
+def create_rpc_server(server, keyfpath: str, certfpath: str, port: int, ipv6=False, nworkers=None, backlog=None, max_connections=None, request_batch_size=None):
     """
     Create and return an RPC server using sane security defaults.
+
+    The concurrency limits default to the RPC_* environment variables if they are set:
+
+    - `nworkers`: Number of worker threads that handle requests (default 20).
+    - `backlog`: Size of the kernel's queue of not-yet-accepted connections (default 16).
+    - `max_connections`: Refuse connections beyond this many (default: no limit).
+    - `request_batch_size`: Maximum number of requests a worker serves from one connection
+      before moving on to the next ready connection (default 10).
     """
     # Authentication itself is handled by means of the Kubernetes trust boundary
     # i.e., we trust (and do no real authentication of) any pods that are able to connect to us.
     # We prevent unwanted connections at the Kubernetes layer, using a whitelist Network Policy.
     # Encryption however, is a requirement of any data traveling over the network, to prevent
     # packet sniffing. This Authenticator class handles setting up the appropriate encryption.
-    authenticator = SSLAuthenticator(
-        keyfile=keyfpath,
-        certfile=certfpath,
-        cert_reqs=ssl.CERT_NONE,
-        ciphers=':'.join(get_cipher_list()),
-        ssl_version=ssl.PROTOCOL_TLS_SERVER
-    )
+    # The authenticator shares one SSLContext between all connections, so that clients can resume their TLS sessions.
+    authenticator = tls.CachedSSLAuthenticator(keyfpath, certfpath, get_cipher_list())
 
     protocol = {
         # See: https://rpyc.readthedocs.io/en/latest/api/core_protocol.html#rpyc.core.protocol.DEFAULT_CONFIG
@@ -65,7 +73,13 @@ def create_rpc_server(server, keyfpath: str, certfpath: str, port: int, ipv6=Fal
         'allow_pickle': True,
     }
 
-    t = ThreadPoolServer(
+    nworkers = nworkers if nworkers is not None else _env_int(constants.ArtieEnvVariables.RPC_NWORKERS, 20)
+    backlog = backlog if backlog is not None else _env_int(constants.ArtieEnvVariables.RPC_ACCEPT_BACKLOG, 16)
+    max_connections = max_connections if max_connections is not None else _env_int(constants.ArtieEnvVariables.RPC_MAX_CONNECTIONS, None)
+    request_batch_size = request_batch_size if request_batch_size is not None else _env_int(constants.ArtieEnvVariables.RPC_REQUEST_BATCH_SIZE, 10)
+    alog.info(f"Creating RPC server with {nworkers} workers, accept backlog {backlog}, max connections {max_connections}, request batch size {request_batch_size}")
+
+    t = rpycserver.ArtieThreadPoolServer(
         server,
         hostname="0.0.0.0",
         ipv6=ipv6,
@@ -73,7 +87,11 @@ def create_rpc_server(server, keyfpath: str, certfpath: str, port: int, ipv6=Fal
         reuse_addr=False,
         authenticator=authenticator,
         registrar=None,  # Do not use a registrar - we make use of Kubernetes Services instead
-        protocol_config=protocol
+        protocol_config=protocol,
+        backlog=backlog,
+        max_connections=max_connections,
+        nbThreads=nworkers,
+        requestBatchSize=request_batch_size,
     )
     return t
 
@@ -82,6 +100,9 @@ def get_cipher_list():
     Returns a list of the available ciphers for servers.
     """
     ciphers = [
+        "ECDHE-ECDSA-AES256-GCM-SHA384",
+        "ECDHE-ECDSA-AES128-GCM-SHA256",
+        "ECDHE-ECDSA-CHACHA20-POLY1305",
         "ECDHE-RSA-AES256-GCM-SHA384",
         "ECDHE-RSA-AES128-GCM-SHA256",
         "ECDHE-RSA-CHACHA20-POLY1305",
@@ -103,7 +124,7 @@ def get_git_tag() -> str:
     """
     return os.environ.get(constants.ArtieEnvVariables.ARTIE_GIT_TAG, 'unversioned')
 
-def generate_self_signed_cert(certfpath, keyfpath, days=30, force=False):
+def generate_self_signed_cert(certfpath, keyfpath, days=30, force=False, key_type="ecdsa"):
     """
     Generate a self-signed certificate and place it at `certfpath`. The private
     key will be placed at `keyfpath`. The certificate will be valid for the given number
@@ -111,6 +132,9 @@ def generate_self_signed_cert(certfpath, keyfpath, days=30, force=False):
     If `force` is given, we overwrite a certifacte/key already found at
     the given path(s).
 
+    `key_type` is either "ecdsa" (ECDSA P-256, the default) or "rsa" (RSA-4096). ECDSA keys are
+    much cheaper to generate and make for much cheaper TLS handshakes.
+
     Note that we have no real way of encrypting the private key, so it is stored in plaintext!
     """
     if not force and os.path.isfile(certfpath) and os.path.isfile(keyfpath):
@@ -118,11 +142,72 @@ def generate_self_signed_cert(certfpath, keyfpath, days=30, force=False):
         alog.info("Certificate and key already found and `force` is False. Not generating new cert.")
         return
 
+    match key_type:
+        case "rsa":
+            newkey = "-newkey rsa:4096"
+        case "ecdsa":
+            newkey = "-newkey ec -pkeyopt ec_paramgen_curve:prime256v1"
+        case _:
+            raise ValueError(f"Unsupported key type '{key_type}'. Use 'rsa' or 'ecdsa'.")
+
     timelimit = "36500" if days is None else str(days)
-    cmd = f"openssl req -x509 -newkey rsa:4096 -sha256 -days {timelimit} -nodes -keyout {keyfpath} -out {certfpath}"
+    cmd = f"openssl req -x509 {newkey} -sha256 -days {timelimit} -nodes -keyout {keyfpath} -out {certfpath}"
     sub = f"-subj /C=US/ST=Washington/L=Seattle/O=Artie/OU=Artie/CN=Artie"
     subprocess.run(f"{cmd} {sub}".split(), stdout=subprocess.DEVNULL).check_returncode()
 
+def _cert_is_usable(certfpath, keyfpath, min_valid_s=86400) -> bool:
+    """
+    Return True if the certificate and key at the given paths exist, belong together,
+    and the certificate is valid for at least another `min_valid_s` seconds.
+    """
+    if not os.path.isfile(certfpath) or not os.path.isfile(keyfpath):
+        return False
+
+    # Loading the chain fails if the key does not match the certificate (or either is garbage)
+    try:
+        ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER).load_cert_chain(certfile=certfpath, keyfile=keyfpath)
+    except (ssl.SSLError, OSError):
+        return False
+
+    # The ssl module has no public way to read a certificate's expiry, so ask openssl (which made it)
+    try:
+        result = subprocess.run(["openssl", "x509", "-checkend", str(min_valid_s), "-noout", "-in", certfpath], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except OSError:
+        return False
+    return result.returncode == 0
+
+def provision_cert(certfpath, keyfpath, days=None, key_type="ecdsa"):
+    """
+    Make sure there is a certificate and private key to serve with, and return
+    a tuple of the form (certfpath, keyfpath) with their locations. In order of preference:
+
+    1. If the ARTIE_TLS_SECRET_DIR env variable points at a mounted Kubernetes TLS secret
+       (a directory with 'tls.crt' and 'tls.key'), we use that certificate and key.
+    2. If there is already a usable certificate and key at `certfpath` and `keyfpath`
+       (e.g., persisted from a previous start), we reuse them.
+    3. Otherwise, we generate a new self-signed certificate (see `generate_self_signed_cert`)
+       at `certfpath` and `keyfpath`.
+    """
+    secret_dir = os.environ.get(constants.ArtieEnvVariables.ARTIE_TLS_SECRET_DIR, None)
+    if secret_dir:
+        secret_certfpath = os.path.join(secret_dir, "tls.crt")
+        secret_keyfpath = os.path.join(secret_dir, "tls.key")
+        if _cert_is_usable(secret_certfpath, secret_keyfpath, min_valid_s=0):
+            alog.info(f"Using the certificate mounted at {secret_dir}.")
+            return secret_certfpath, secret_keyfpath
+        alog.warning(f"{constants.ArtieEnvVariables.ARTIE_TLS_SECRET_DIR} is set to {secret_dir}, but there is no usable tls.crt/tls.key there. Falling back to a self-signed certificate.")
+
+    if _cert_is_usable(certfpath, keyfpath):
+        alog.info(f"Reusing the certificate at {certfpath}.")
+        return certfpath, keyfpath
+
+    alog.info(f"Generating a new self-signed certificate at {certfpath}.")
+    for dpath in set([os.path.dirname(certfpath), os.path.dirname(keyfpath)]):
+        if dpath:
+            os.makedirs(dpath, exist_ok=True)
+    generate_self_signed_cert(certfpath, keyfpath, days=days, force=True, key_type=key_type)
+    return certfpath, keyfpath
+
 def in_test_mode() -> bool:
     """
     Returns True if we are in a testing mode.
@@ -181,3 +266,18 @@ def run_cmd(cmd: str, group=None):
             return subprocess.run(cmd.split(), input=_get_password(), capture_output=True, encoding='utf-8')
     else:
         return subprocess.run(cmd.split(), capture_output=True, encoding='utf-8')
+
+def poll_until(predicate, timeout_s: float, interval_s=0.01) -> bool:
+    """
+    Call `predicate()` every `interval_s` seconds until it returns True
+    or `timeout_s` seconds have elapsed. Return the last result.
+
+    Use this instead of sleeping for a fixed, worst-case amount of time
+    while waiting for hardware to come up.
+    """
+    deadline_s = time.monotonic() + timeout_s
+    while not predicate():
+        if time.monotonic() >= deadline_s:
+            return False
+        time.sleep(interval_s)
+    return True
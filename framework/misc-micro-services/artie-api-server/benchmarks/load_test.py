@@ -0,0 +1,122 @@
+"""
+Load test the API server against stubbed drivers (see stub_app.py), reporting
+requests per second and latency percentiles under concurrency, for:
+
+- The Flask development server with a new driver connection per request (how the server used to run).
+- Gunicorn (src/gunicorn.conf.py) with a new driver connection per request.
+- Gunicorn with pooled driver connections (how the server runs now).
+
+The response cache is turned off (unless you pass --cache-ttl-s), so that every request reaches a driver.
+
+Needs flask and gunicorn. Run it from this folder:
+
+    python benchmarks/load_test.py --concurrency 32 --seconds 10
+"""
+import argparse
+import http.client
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(HERE, "..", "src")
+
+def _listening(port: int) -> bool:
+    try:
+        socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+        return True
+    except OSError:
+        return False
+
+def _start_server(kind: str, port: int, pooled: bool, workers: int, threads: int, cache_ttl_s: float) -> subprocess.Popen:
+    if _listening(port):
+        raise RuntimeError(f"Something is already listening on port {port}")
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([HERE, SRC]), PORT=str(port), API_SERVER_WORKERS=str(workers), API_SERVER_THREADS=str(threads), API_SERVER_CACHE_TTL_S=str(cache_ttl_s), LOGLEVEL="warning")
+    env.pop('CERT_FPATH', None)
+    env.pop('KEY_FPATH', None)
+    if not pooled:
+        env['STUB_NO_POOL'] = "1"
+
+    if kind == "flask":
+        cmd = [sys.executable, "-m", "flask", "--app", "stub_app", "run", "--port", str(port), "--with-threads"]
+    else:
+        cmd = [sys.executable, "-m", "gunicorn", "--config", os.path.join(SRC, "gunicorn.conf.py"), "--chdir", SRC, "stub_app:app"]
+    # Its own process group, so that we can stop the server along with anything it forked
+    proc = subprocess.Popen(cmd, env=env, cwd=SRC, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if _listening(port):
+            return proc
+        time.sleep(0.1)
+    _stop_server(proc, port)
+    raise TimeoutError(f"{kind} server did not come up on port {port}")
+
+def _stop_server(proc: subprocess.Popen, port: int):
+    # Nothing to shut down gracefully, and gunicorn takes its time about it
+    os.killpg(proc.pid, signal.SIGKILL)
+    proc.wait()
+    while _listening(port):
+        time.sleep(0.1)
+
+def _client(port: int, path: str, stop_at: float, latencies: list, errors: list):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    while time.monotonic() < stop_at:
+        ts = time.perf_counter()
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - ts)
+    connection.close()
+
+def _run(name: str, port: int, path: str, concurrency: int, seconds: float):
+    latencies, errors = [], []
+    stop_at = time.monotonic() + seconds
+    clients = [threading.Thread(target=_client, args=(port, path, stop_at, latencies, errors)) for _ in range(concurrency)]
+    for t in clients:
+        t.start()
+    for t in clients:
+        t.join()
+
+    if len(latencies) < 2:
+        print(f"{name:>32}: no successful requests ({len(errors)} errors)")
+        return
+    q = statistics.quantiles(latencies, n=100)
+    print(f"{name:>32}: {len(latencies) / seconds:8.1f} req/s | p50 {1e3 * q[49]:7.1f} ms | p99 {1e3 * q[98]:7.1f} ms | errors {len(errors)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=32, help="Number of concurrent clients (each with a keep-alive connection).")
+    parser.add_argument("--seconds", type=float, default=10.0, help="How long to run each configuration.")
+    parser.add_argument("--workers", type=int, default=2, help="Gunicorn worker processes.")
+    parser.add_argument("--threads", type=int, default=16, help="Gunicorn threads per worker (workers x threads should cover the concurrency).")
+    parser.add_argument("--port", type=int, default=18782, help="Port to serve on.")
+    parser.add_argument("--path", type=str, default="/mouth/lcd?artie-id=load-test", help="The route to request.")
+    parser.add_argument("--cache-ttl-s", type=float, default=0.0, help="API_SERVER_CACHE_TTL_S for the server (0 turns the response cache off).")
+    args = parser.parse_args()
+
+    configurations = [
+        ("flask dev server, no pool", "flask", False),
+        ("gunicorn, no pool", "gunicorn", False),
+        ("gunicorn, pooled", "gunicorn", True),
+    ]
+    for name, kind, pooled in configurations:
+        proc = _start_server(kind, args.port, pooled, args.workers, args.threads, args.cache_ttl_s)
+        try:
+            _run(name, args.port, args.path, args.concurrency, args.seconds)
+        finally:
+            _stop_server(proc, args.port)
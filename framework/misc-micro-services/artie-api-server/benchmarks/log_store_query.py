@@ -0,0 +1,127 @@
+"""
+Measure log query latency against a large log history:
+
+- A full scan of the log files (how `/logs/query` used to work: parse every line, filter, sort).
+- Time-bounded reads of the log files (src/telemetry/log_files.py), which skip files outside
+  the window and binary search the rest for its start.
+- The SQLite log store (src/telemetry/log_store.py): the first query (answered from the files
+  while the index catches up in the background), the one-time ingestion, an incremental
+  ingestion of new lines, and several indexed queries.
+
+Writes a synthetic log history into a temporary directory. Run it from this folder:
+
+    python benchmarks/log_store_query.py --lines 1000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+
+LEVELS = ("DEBUG", "INFO", "INFO", "INFO", "WARNING", "ERROR")
+SERVICES = [f"service-{i}" for i in range(12)]
+WORDS = "motor servo display heartbeat connection timeout firmware reset status sensor frame buffer".split()
+
+def _write_logs(dpath: str, nlines: int, nfiles: int, start_ts: float, end_ts: float):
+    rng = random.Random(0)
+    step_s = (end_ts - start_ts) / nlines
+    files = [open(os.path.join(dpath, f"artie-{i}.log"), 'w') for i in range(nfiles)]
+    try:
+        for i in range(nlines):
+            ts = start_ts + i * step_s
+            entry = {
+                "level": rng.choice(LEVELS),
+                "message": " ".join(rng.choice(WORDS) for _ in range(6)) + (" needle-in-haystack" if i % 100_000 == 0 else ""),
+                "processname": "MainProcess",
+                "threadname": rng.choice(("MainThread", "Thread-1", "Thread-2")),
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)),
+                "servicename": rng.choice(SERVICES),
+                "artieid": "benchmark",
+            }
+            files[i % nfiles].write(json.dumps(entry) + "\n")
+    finally:
+        for f in files:
+            f.close()
+
+def _scan(dpath: str, level=None, service=None, message_contains=None, limit=1000):
+    """The old way: parse every line of every file, filter, then sort."""
+    from telemetry import log_files
+    logs = []
+    for fname in sorted(os.listdir(dpath)):
+        if not fname.endswith(".log"):
+            continue
+        with open(os.path.join(dpath, fname)) as f:
+            for line in f:
+                entry = json.loads(line)
+                log_files.parse_timestamp(entry.get('timestamp'))
+                if level and entry.get('level') != level:
+                    continue
+                if service and entry.get('servicename') != service:
+                    continue
+                if message_contains and message_contains not in entry.get('message', ''):
+                    continue
+                logs.append(entry)
+    logs.sort(key=lambda e: e.get('timestamp', ''))
+    return logs[:limit]
+
+def _time(name: str, fn, repeats: int):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    elapsed_s = (time.perf_counter() - start) / repeats
+    n = len(result) if isinstance(result, list) else result
+    print(f"{name:>48}: {1e3 * elapsed_s:9.2f} ms ({n} results)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=1_000_000, help="Lines of log history.")
+    parser.add_argument("--files", type=int, default=8, help="Number of log files to spread them over.")
+    parser.add_argument("--hours", type=float, default=24.0, help="How many hours the history covers (ending now).")
+    parser.add_argument("--repeats", type=int, default=5, help="Times to run each query.")
+    parser.add_argument("--skip-scan", action='store_true', help="Do not time the full scan (it is slow).")
+    args = parser.parse_args()
+
+    from telemetry import log_files
+    from telemetry import log_store
+    with tempfile.TemporaryDirectory() as dpath:
+        now = time.time()
+        _write_logs(dpath, args.lines, args.files, now - 3600 * args.hours, now)
+        nbytes = sum(os.path.getsize(os.path.join(dpath, f)) for f in os.listdir(dpath))
+        print(f"{args.lines} lines ({nbytes / 2**20:.0f} MiB) in {args.files} files")
+
+        if not args.skip_scan:
+            _time("full scan: level=ERROR, limit 100", lambda: _scan(dpath, level="ERROR", limit=100), repeats=1)
+
+        pattern = os.path.join(dpath, "*.log")
+        _time("files: last 60 s", lambda: log_files.scan(pattern, start_ts=time.time() - 60), args.repeats)
+        _time("files: service, 1 h window, limit 1000", lambda: log_files.scan(pattern, start_ts=now - 7200, end_ts=now - 3600, matches=lambda e: e.get('servicename') == "service-3", limit=1000), args.repeats)
+
+        store = log_store.LogStore(os.path.join(dpath, "index", "logs.sqlite"), pattern)
+        start = time.perf_counter()
+        n = len(store.query(start_ts=time.time() - 60))
+        print(f"{'first query: last 60 s':>48}: {1e3 * (time.perf_counter() - start):9.2f} ms ({n} results)")
+        if store._catch_up_thread is not None:
+            store._catch_up_thread.join()
+        print(f"{'initial ingestion':>48}: {time.perf_counter() - start:9.2f} s")
+
+        with open(os.path.join(dpath, "artie-0.log"), 'a') as f:
+            for i in range(1000):
+                f.write(json.dumps({"level": "INFO", "message": f"new line {i}", "servicename": "service-0", "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")}) + "\n")
+        start = time.perf_counter()
+        store.ingest()
+        print(f"{'ingest 1000 new lines':>48}: {1e3 * (time.perf_counter() - start):9.2f} ms")
+        _time("ingest with nothing new", store.ingest, args.repeats)
+
+        _time("last 60 s", lambda: store.query(start_ts=time.time() - 60), args.repeats)
+        _time("level=ERROR, limit 100", lambda: store.query(level="ERROR", limit=100), args.repeats)
+        _time("service, 1 h window, limit 1000", lambda: store.query(start_ts=now - 7200, end_ts=now - 3600, service="service-3", limit=1000), args.repeats)
+        _time("message contains rare term", lambda: store.query(message_contains="needle-in-haystack", limit=1000), args.repeats)
+        _time("message contains common term, limit 100", lambda: store.query(message_contains="firmware", limit=100), args.repeats)
+        _time("level + service + message, 6 h window, limit 100", lambda: store.query(start_ts=now - 6 * 3600, level="WARNING", service="service-7", message_contains="timeout", limit=100), args.repeats)
+        _time("list services", lambda: store.distinct('service'), args.repeats)
@@ -0,0 +1,74 @@
+"""
+Compare the cost of watching live logs, for a growing log history:
+
+- Polling `/logs/live` (how the Workbench used to do it every 5 seconds), which re-reads
+  and parses every log file on every call.
+- One poll of the `/logs/stream` tailer (src/telemetry/log_tail.py), which only reads what
+  was appended since the last poll.
+
+Writes a synthetic log history into a temporary directory. Run it from this folder:
+
+    python benchmarks/log_tail_cost.py --lines 100000 --new-lines 50
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+
+def _entry(i: int) -> str:
+    return json.dumps({
+        "level": ("DEBUG", "INFO", "WARNING", "ERROR")[i % 4],
+        "message": f"Log message number {i}",
+        "processname": "MainProcess",
+        "threadname": "MainThread",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "servicename": f"service-{i % 8}",
+        "artieid": "benchmark",
+    })
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=100_000, help="Lines of log history.")
+    parser.add_argument("--new-lines", type=int, default=50, help="Lines appended between polls.")
+    parser.add_argument("--repeats", type=int, default=5, help="Polls to average over.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dpath:
+        fpath = os.path.join(dpath, "artie.log")
+        with open(fpath, 'w') as f:
+            f.writelines(_entry(i) + "\n" for i in range(args.lines))
+
+        os.environ['LOG_FILE_PATH'] = dpath
+        import flask
+        from telemetry import log_tail
+        from telemetry import logs_api
+        app = flask.Flask(__name__)
+        app.register_blueprint(logs_api.logs_api)
+
+        tailer = log_tail.LogTailer(os.path.join(dpath, "*.log"), poll_interval_s=3600)
+        subscription = tailer.subscribe(log_tail.Subscription())
+
+        live_s, tail_s = 0.0, 0.0
+        for r in range(args.repeats):
+            with open(fpath, 'a') as f:
+                f.writelines(_entry(i) + "\n" for i in range(args.new_lines))
+
+            with app.test_request_context("/logs/live?seconds=60"):
+                start = time.perf_counter()
+                logs_api.get_live_logs()
+                live_s += time.perf_counter() - start
+
+            start = time.perf_counter()
+            with tailer._lock:
+                tailer._poll(from_start=True)
+            tail_s += time.perf_counter() - start
+            assert subscription.queue.qsize() == args.new_lines * (r + 1)
+
+    print(f"{args.lines} lines of history, {args.new_lines} new lines per poll:")
+    print(f"{'poll /logs/live':>24}: {1e3 * live_s / args.repeats:9.2f} ms")
+    print(f"{'tail for /logs/stream':>24}: {1e3 * tail_s / args.repeats:9.2f} ms")
@@ -0,0 +1,52 @@
+"""
+The API server app with its drivers replaced by stubs, for load testing (see load_test.py).
+
+Each stub connection takes STUB_CONNECT_MS to open (standing in for the DNS lookup,
+TCP connection, and TLS handshake to a real driver) and STUB_CALL_MS per call.
+If STUB_NO_POOL is set, connections are not kept for reuse, which is how the server
+used to work (a new connection for every request).
+"""
+from artie_service_client import client as asc
+import os
+import time
+
+CONNECT_S = float(os.environ.get('STUB_CONNECT_MS', '20')) / 1000.0
+CALL_S = float(os.environ.get('STUB_CALL_MS', '2')) / 1000.0
+
+_RETURN_VALUES = {
+    "led_get": "heartbeat",
+    "lcd_get": "smile",
+    "status": {"FW": "working", "LED": "working", "LCD": "working"},
+}
+
+class _StubRPCConnection:
+    closed = False
+
+    def poll(self, timeout=0):
+        # The pool checks idle connections with this; a stub driver never goes away or sends anything
+        return False
+
+    def close(self):
+        self.closed = True
+
+class StubServiceConnection:
+    def __init__(self, service: asc.Service, n_retries=3, artie_id=None, timeout_s=None, ipv6=False) -> None:
+        time.sleep(CONNECT_S)
+        self.connection = _StubRPCConnection()
+
+    def __getattr__(self, attr):
+        def stub(*args, **kwargs):
+            time.sleep(CALL_S)
+            return _RETURN_VALUES.get(attr, True)
+        return stub
+
+class _NoStatusSubscription:
+    def __init__(self, *args, **kwargs) -> None:
+        raise ConnectionError("Status subscriptions are not stubbed")
+
+asc.ServiceConnection = StubServiceConnection
+asc.StatusSubscription = _NoStatusSubscription
+if os.environ.get('STUB_NO_POOL'):
+    asc.pool.max_idle_per_service = 0
+
+from main import app
@@ -1,5 +1,6 @@
 from artie_service_client import client as asc
 from artie_util import artie_logging as alog
+from . import status_table
 from typing import List
 from typing import Tuple, Dict
 import enum
@@ -14,10 +15,10 @@ def display(display_value: List[str], which: str, artie_id: str) -> Tuple[int|No
     Returns a tuple of the form (error code|None, errmsg|None).
     """
     try:
-        connection = asc.ServiceConnection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id)
-        worked = connection.lcd_draw(which, display_value)
-        if not worked:
-            return 500, f"Error trying to display something on {which} eyebrows LCD: LCD not working."
+        with asc.pooled_connection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id) as connection:
+            worked = connection.lcd_draw(which, display_value)
+            if not worked:
+                return 500, f"Error trying to display something on {which} eyebrows LCD: LCD not working."
     except TimeoutError as e:
         return 504, f"Timed out trying to draw on {which} eyebrow LCD: {e}"
     except Exception as e:
@@ -29,15 +30,15 @@ def get_display(which: str, artie_id: str) -> Tuple[None|int, List[str]|str]:
     Returns a tuple of the form (None, LCD value) or (err code, errmsg).
     """
     try:
-        connection = asc.ServiceConnection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id)
-        val = connection.lcd_get(which)
-        if issubclass(val, str) and val in ("clear", "test"):
-            return None, val
-        elif issubclass(val, str) and val == "error":
-            return 500, f"Error trying to get the {which} LCD screen value: LCD not working."
-        else:
-            val = [v for v in val]
-            return None, val
+        with asc.pooled_connection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id) as connection:
+            val = connection.lcd_get(which)
+            if issubclass(val, str) and val in ("clear", "test"):
+                return None, val
+            elif issubclass(val, str) and val == "error":
+                return 500, f"Error trying to get the {which} LCD screen value: LCD not working."
+            else:
+                val = [v for v in val]
+                return None, val
     except TimeoutError as e:
         return 504, f"Timed out trying to get the {which} eyebrow LCD display: {e}"
     except Exception as e:
@@ -48,10 +49,10 @@ def test(which: str, artie_id: str) -> Tuple[int|None, str|None]:
     Returns a tuple of the form (error code|None, errmsg|None).
     """
     try:
-        connection = asc.ServiceConnection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id)
-        worked = connection.lcd_test(which)
-        if not worked:
-            return 500, f"Error trying to test {which} eyebrows LCD: LCD not working."
+        with asc.pooled_connection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id) as connection:
+            worked = connection.lcd_test(which)
+            if not worked:
+                return 500, f"Error trying to test {which} eyebrows LCD: LCD not working."
     except TimeoutError as e:
         return 504, f"Timed out trying to test the {which} eyebrow LCD display: {e}"
     except Exception as e:
@@ -63,10 +64,10 @@ def clear(which: str, artie_id: str) -> Tuple[int|None, str|None]:
     Returns a tuple of the form (error code|None, errmsg|None).
     """
     try:
-        connection = asc.ServiceConnection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id)
-        worked = connection.lcd_off(which)
-        if not worked:
-            return 500, f"Error trying to clear {which} eyebrows LCD: LCD not working."
+        with asc.pooled_connection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id) as connection:
+            worked = connection.lcd_off(which)
+            if not worked:
+                return 500, f"Error trying to clear {which} eyebrows LCD: LCD not working."
     except TimeoutError as e:
         return 504, f"Timed out trying to clear the {which} eyebrow LCD display: {e}"
     except Exception as e:
@@ -80,18 +81,18 @@ def led(which: str, state: LEDStates, artie_id: str) -> Tuple[int|None, str|None
     """
     try:
         worked = True
-        connection = asc.ServiceConnection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id)
-        match state:
-            case LEDStates.ON:
-                worked = connection.led_on(which)
-            case LEDStates.OFF:
-                worked = connection.led_off(which)
-            case LEDStates.HEARTBEAT:
-                worked = connection.led_heartbeat(which)
-            case _:
-                return 400, f"Invalid led state: {state}"
-        if not worked:
-            return 500, f"Error trying to set {which} eyebrows LED: LED not working."
+        with asc.pooled_connection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id) as connection:
+            match state:
+                case LEDStates.ON:
+                    worked = connection.led_on(which)
+                case LEDStates.OFF:
+                    worked = connection.led_off(which)
+                case LEDStates.HEARTBEAT:
+                    worked = connection.led_heartbeat(which)
+                case _:
+                    return 400, f"Invalid led state: {state}"
+            if not worked:
+                return 500, f"Error trying to set {which} eyebrows LED: LED not working."
     except TimeoutError as e:
         return 504, f"Timed out trying to set the {which} eyebrow LED: {e}"
     except Exception as e:
@@ -103,24 +104,24 @@ def get_led(which: str, artie_id: str) -> Tuple[None|int, LEDStates|str]:
     Returns a tuple of the form (None, LED value) or (err code, errmsg).
     """
     try:
-        connection = asc.ServiceConnection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id)
-        val = LEDStates(connection.led_get(which))
-        return None, val
+        with asc.pooled_connection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id) as connection:
+            val = LEDStates(connection.led_get(which))
+            return None, val
     except TimeoutError as e:
         return 504, f"Timed out trying to get the {which} eyebrow LED state: {e}"
     except Exception as e:
         return 500, f"Error trying to get the {which} eyebrow LED state: {e}"
 
-def reload_firmware(artie_id: str) -> Tuple[int|None, str|None]:
+def reload_firmware(artie_id: str, force=False) -> Tuple[int|None, str|None]:
     """
     Reloads the eyebrow MCU firmware (for both MCUs) and returns a tuple of the form
     (errorcode|None, errmsg|None)
     """
     try:
-        connection = asc.ServiceConnection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id)
-        worked = connection.firmware_load()
-        if not worked:
-            return 500, f"Error trying to reload FW."
+        with asc.pooled_connection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id) as connection:
+            worked = connection.firmware_load(force=force)
+            if not worked:
+                return 500, f"Error trying to reload FW."
     except TimeoutError as e:
         return 504, f"Timed out trying to reload the eyebrow FW: {e}"
     except Exception as e:
@@ -133,10 +134,10 @@ def set_servo(which: str, degrees: float, artie_id: str) -> Tuple[int|None, str|
     (errorcode|None, errmsg|degrees)
     """
     try:
-        connection = asc.ServiceConnection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id)
-        worked = connection.servo_go(which, degrees)
-        if not worked:
-            return 500, f"Error trying to set {which} servo: Servo not working."
+        with asc.pooled_connection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id) as connection:
+            worked = connection.servo_go(which, degrees)
+            if not worked:
+                return 500, f"Error trying to set {which} servo: Servo not working."
     except TimeoutError as e:
         return 504, f"Timed out trying to set the {which} eyebrow servo to {degrees} degrees: {e}"
     except Exception as e:
@@ -149,12 +150,12 @@ def get_servo(which: str, artie_id: str) -> Tuple[int|None, str|float]:
     (errcode|None, errmsg|degrees)
     """
     try:
-        connection = asc.ServiceConnection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id)
-        val = float(connection.servo_get(which))
-        if val < 0.0:
-            return 500, f"Error trying to get {which} servo value."
-        else:
-            return None, val
+        with asc.pooled_connection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id) as connection:
+            val = float(connection.servo_get(which))
+            if val < 0.0:
+                return 500, f"Error trying to get {which} servo value."
+            else:
+                return None, val
     except TimeoutError as e:
         return 504, f"Timed out trying to get the {which} eyebrow servo position: {e}"
     except Exception as e:
@@ -165,11 +166,16 @@ def get_status(artie_id: str) -> Tuple[None|int, str|Dict[str, str]]:
     Gets the status (a Dict of the form {submodule: status}). Returns a tuple of the form
     (None|errorcode, status|errmsg)
     """
-    try:
-        connection = asc.ServiceConnection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id)
-        d = connection.status()
-        status = {k: d[k] for k in d}
+    # Served from the table that the service keeps current for us, if we are subscribed to it
+    status = status_table.get_status(asc.Service.EYEBROWS_SERVICE, artie_id)
+    if status is not None:
         return None, status
+
+    try:
+        with asc.pooled_connection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id) as connection:
+            d = connection.status()
+            status = {k: d[k] for k in d}
+            return None, status
     except TimeoutError as e:
         return 504, f"Timed out trying to get the eyebrow status: {e}"
     except Exception as e:
@@ -181,8 +187,8 @@ def self_test(artie_id: str) -> Tuple[None|int, None|str]:
     (None|errorcode, None|errmsg)
     """
     try:
-        connection = asc.ServiceConnection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id)
-        connection.self_check()
+        with asc.pooled_connection(asc.Service.EYEBROWS_SERVICE, artie_id=artie_id) as connection:
+            connection.self_check()
     except TimeoutError as e:
         return 504, f"Timed out trying to do the eyebrows self test: {e}"
     except Exception as e:
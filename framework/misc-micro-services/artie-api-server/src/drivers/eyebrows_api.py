@@ -2,6 +2,8 @@
 Logic for handling mouth API.
 """
 from . import eyebrows
+from . import response_cache
+from artie_service_client import client as asc
 from flask import request as r
 from artie_util import artie_logging as alog
 import flask
@@ -10,6 +12,7 @@ eyebrows_api = flask.Blueprint('eyebrows_api', __name__, url_prefix="/eyebrows")
 
 @eyebrows_api.route("/lcd/<which>", methods=["POST"])
 @alog.function_counter("set_eyebrows_display", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.invalidates(asc.Service.EYEBROWS_SERVICE)
 def set_eyebrows_display(which: str):
     """
     Change the eyebrow display to show the given state.
@@ -93,6 +96,7 @@ def set_eyebrows_display(which: str):
 
 @eyebrows_api.route("/lcd/<which>", methods=["GET"])
 @alog.function_counter("get_eyebrows_display", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.cached(asc.Service.EYEBROWS_SERVICE)
 def get_eyebrows_display(which: str):
     """
     * *GET*: `/eyebrows/lcd/<which>` where `<which>` is `left` or `right`.
@@ -140,6 +144,7 @@ def get_eyebrows_display(which: str):
 
 @eyebrows_api.route("/lcd/<which>/test", methods=["POST"])
 @alog.function_counter("test_eyebrows_display", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.invalidates(asc.Service.EYEBROWS_SERVICE)
 def test_eyebrows_display(which: str):
     """
     Draw a test image on the eyebrow LCD.
@@ -180,6 +185,7 @@ def test_eyebrows_display(which: str):
 
 @eyebrows_api.route("/lcd/<which>/off", methods=["POST"])
 @alog.function_counter("clear_eyebrows_display", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.invalidates(asc.Service.EYEBROWS_SERVICE)
 def clear_eyebrows_display(which: str):
     """
     Erase the contents on an eyebrow LCD.
@@ -220,6 +226,7 @@ def clear_eyebrows_display(which: str):
 
 @eyebrows_api.route("/led/<which>", methods=["POST"])
 @alog.function_counter("set_eyebrows_led", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.invalidates(asc.Service.EYEBROWS_SERVICE)
 def set_eyebrows_led(which: str):
     """
     * *POST*: `/eyebrows/led/<which>` where `<which>` is `left` or `right`.
@@ -285,6 +292,7 @@ def set_eyebrows_led(which: str):
 
 @eyebrows_api.route("/led/<which>", methods=["GET"])
 @alog.function_counter("get_eyebrows_led", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.cached(asc.Service.EYEBROWS_SERVICE)
 def get_eyebrows_led(which: str):
     """
     * *GET*: `/eyebrows/led/<which>` where `<which>` is `left` or `right`.
@@ -332,6 +340,7 @@ def get_eyebrows_led(which: str):
 
 @eyebrows_api.route("/servo/<which>", methods=["POST"])
 @alog.function_counter("set_eyebrows_servo", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.invalidates(asc.Service.EYEBROWS_SERVICE)
 def set_eyebrows_servo(which: str):
     """
     * *POST*: `/eyebrows/servo/<which>` where `<which>` is `left` or `right`.
@@ -400,6 +409,7 @@ def set_eyebrows_servo(which: str):
 
 @eyebrows_api.route("/servo/<which>", methods=["GET"])
 @alog.function_counter("get_eyebrows_servo", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.cached(asc.Service.EYEBROWS_SERVICE)
 def get_eyebrows_servo(which: str):
     """
     Note: there is no way to get a *true* servo position for the eyeballs
@@ -455,6 +465,7 @@ def get_eyebrows_servo(which: str):
 
 @eyebrows_api.route("/fw", methods=["POST"])
 @alog.function_counter("reload_eyebrows_firmware", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.invalidates(asc.Service.EYEBROWS_SERVICE)
 def reload_eyebrows_firmware():
     """
     Reload both eyebrow MCU firmwares (you cannot target them individually).
@@ -462,6 +473,7 @@ def reload_eyebrows_firmware():
     * *POST*: `/eyebrows/fw`
         * *Parameters*:
             * `artie-id`: The Artie ID.
+            * `force`: (Optional) If `true`, load the FW even if the MCU already has it.
         * *Payload*: None
     """
     # Double check params
@@ -472,7 +484,8 @@ def reload_eyebrows_firmware():
         }
         return errbody, 400
 
-    err, errmsg = eyebrows.reload_firmware(artie_id=r.args['artie-id'])
+    force = r.args.get('force', 'false').lower() in ('true', '1')
+    err, errmsg = eyebrows.reload_firmware(artie_id=r.args['artie-id'], force=force)
     if err:
         errbody = {
             "artie-id": r.args['artie-id'],
@@ -486,6 +499,7 @@ def reload_eyebrows_firmware():
 
 @eyebrows_api.route("/status", methods=["GET"])
 @alog.function_counter("get_eyebrows_status", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.cached(asc.Service.EYEBROWS_SERVICE)
 def get_eyebrows_status():
     """
     Get the eyebrows' submodules' statuses.
@@ -536,6 +550,7 @@ def get_eyebrows_status():
 
 @eyebrows_api.route("/self-test", methods=["POST"])
 @alog.function_counter("eyebrows_self_test", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.invalidates(asc.Service.EYEBROWS_SERVICE)
 def eyebrows_self_test():
     """
     Initiate a self-test.
@@ -0,0 +1,152 @@
+"""
+Logic for handling the face API, which sets several face actuators
+(mouth, eyebrow LCDs, LEDs, and eye servos) in one request.
+"""
+from . import eyebrows
+from . import mouth
+from . import response_cache
+from artie_service_client import client as asc
+from concurrent import futures
+from flask import request as r
+from artie_util import artie_logging as alog
+from typing import Callable, Dict, List, Tuple
+import flask
+
+face_api = flask.Blueprint('face_api', __name__, url_prefix="/face")
+
+# Runs the driver calls for a pose. Shared by all requests, so a burst of poses cannot start an unbounded number of threads.
+_executor = futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="face-pose")
+
+def _parse_pose(pose, artie_id: str) -> Tuple[Dict[str, Callable], List[str]]:
+    """
+    Validate the whole pose document and return ({actuator: call}, errors),
+    where each call takes no arguments and returns (error code|None, errmsg|None).
+    """
+    calls = {}
+    errors = []
+    if not isinstance(pose, dict):
+        return calls, ["Request body must be a JSON object."]
+
+    for key in pose:
+        if key not in ('mouth', 'eyebrows'):
+            errors.append(f"Unknown section '{key}'. Need 'mouth' and/or 'eyebrows'.")
+
+    mouth_pose = pose.get('mouth', {})
+    if not isinstance(mouth_pose, dict):
+        errors.append("'mouth' must be an object.")
+        mouth_pose = {}
+    for key, value in mouth_pose.items():
+        match key:
+            case 'display' if value in [v.value for v in mouth.MouthValues]:
+                calls['mouth-lcd'] = lambda value=value: mouth.display(value, artie_id=artie_id)
+            case 'led' if value in [s.value for s in mouth.LEDStates]:
+                calls['mouth-led'] = lambda value=value: mouth.led(value, artie_id=artie_id)
+            case 'display' | 'led':
+                errors.append(f"Invalid mouth {key} value: {value}.")
+            case _:
+                errors.append(f"Unknown mouth actuator '{key}'. Need 'display' and/or 'led'.")
+
+    eyebrows_pose = pose.get('eyebrows', {})
+    if not isinstance(eyebrows_pose, dict):
+        errors.append("'eyebrows' must be an object.")
+        eyebrows_pose = {}
+    for which, side_pose in eyebrows_pose.items():
+        if which not in ('left', 'right'):
+            errors.append(f"Unknown eyebrow side '{which}'. Need either 'left' or 'right'.")
+            continue
+        elif not isinstance(side_pose, dict):
+            errors.append(f"'eyebrows.{which}' must be an object.")
+            continue
+
+        for key, value in side_pose.items():
+            match key:
+                case 'vertices':
+                    if not isinstance(value, list) or len(value) != 3 or any(v not in ("H", "M", "L") for v in value):
+                        errors.append(f"'eyebrows.{which}.vertices' should be a list of exactly three strings, each of which should be one of 'H', 'L', or 'M'.")
+                    else:
+                        calls[f'eyebrows-{which}-lcd'] = lambda which=which, value=value: eyebrows.display(value, which, artie_id=artie_id)
+                case 'led':
+                    if value not in [s.value for s in eyebrows.LEDStates]:
+                        errors.append(f"Invalid 'eyebrows.{which}.led' value: {value}.")
+                    else:
+                        calls[f'eyebrows-{which}-led'] = lambda which=which, value=value: eyebrows.led(which, value, artie_id=artie_id)
+                case 'servo':
+                    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0.0 or value > 180.0:
+                        errors.append(f"'eyebrows.{which}.servo' must be a number of degrees in the range [0, 180].")
+                    else:
+                        calls[f'eyebrows-{which}-servo'] = lambda which=which, value=value: eyebrows.set_servo(which, float(value), artie_id=artie_id)
+                case _:
+                    errors.append(f"Unknown eyebrow actuator '{key}'. Need 'vertices', 'led', and/or 'servo'.")
+
+    if not calls and not errors:
+        errors.append("Pose does not set any actuators.")
+    return calls, errors
+
+def _run(call: Callable) -> Tuple[int|None, str|None]:
+    try:
+        return call()
+    except Exception as e:
+        return 500, f"{e}"
+
+@face_api.route("/pose", methods=["POST"])
+@alog.function_counter("set_face_pose", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.invalidates(asc.Service.MOUTH_SERVICE, asc.Service.EYEBROWS_SERVICE)
+def set_face_pose():
+    """
+    Set any number of face actuators at once. The whole pose is validated before
+    anything is sent to the drivers, then the actuators are all set concurrently.
+
+    * *POST*: `/face/pose`
+        * *Parameters*:
+            * `artie-id`: The Artie ID.
+        * *Payload (JSON)*: Every section and actuator is optional, but at least one is needed.
+            ```json
+            {
+                "mouth": {"display": "smile", "led": "on"},
+                "eyebrows": {
+                    "left": {"vertices": ["H", "M", "L"], "led": "heartbeat", "servo": 90.0},
+                    "right": {"vertices": ["L", "M", "H"], "led": "heartbeat", "servo": 90.0}
+                }
+            }
+            ```
+    * *Response 200* (everything worked) or *Response 207* (something did not):
+        * *Payload (JSON)*:
+            ```json
+            {
+                "artie-id": "The Artie ID.",
+                "results": {
+                    "mouth-lcd": {"status": 200},
+                    "eyebrows-left-servo": {"status": 504, "error": "Timed out ..."}
+                }
+            }
+            ```
+    """
+    # Double check params
+    if 'artie-id' not in r.args:
+        errbody = {
+            "artie-id": "Unknown",
+            "error": "Missing artie-id parameter."
+        }
+        return errbody, 400
+
+    calls, errors = _parse_pose(r.get_json(silent=True), artie_id=r.args['artie-id'])
+    if errors:
+        errbody = {
+            "artie-id": r.args['artie-id'],
+            "error": " ".join(errors)
+        }
+        return errbody, 400
+
+    fs = {actuator: _executor.submit(_run, call) for actuator, call in calls.items()}
+    results = {}
+    for actuator, f in fs.items():
+        err, errmsg = f.result()
+        results[actuator] = {"status": err, "error": f"{errmsg}"} if err else {"status": 200}
+
+    body = {
+        "artie-id": r.args['artie-id'],
+        "results": results
+    }
+    if any(result['status'] != 200 for result in results.values()):
+        return body, 207
+    return body
@@ -1,5 +1,6 @@
 from artie_service_client import client as asc
 from artie_util import artie_logging as alog
+from . import status_table
 from typing import Tuple, Dict
 import enum
 
@@ -23,13 +24,13 @@ def display(display_value: MouthValues, artie_id: str) -> Tuple[int|None, str|No
     Returns a tuple of the form (error code|None, errmsg|None).
     """
     try:
-        connection = asc.ServiceConnection(asc.Service.MOUTH_SERVICE, artie_id=artie_id)
-        if display_value == MouthValues.TALKING:
-            worked = connection.lcd_talk()
-        else:
-            worked = connection.lcd_draw(display_value)
-        if not worked:
-            return 500, f"Error trying to display something on the LCD. The LCD is not working."
+        with asc.pooled_connection(asc.Service.MOUTH_SERVICE, artie_id=artie_id) as connection:
+            if display_value == MouthValues.TALKING:
+                worked = connection.lcd_talk()
+            else:
+                worked = connection.lcd_draw(display_value)
+            if not worked:
+                return 500, f"Error trying to display something on the LCD. The LCD is not working."
     except TimeoutError as e:
         return 504, f"Timed out trying to draw on mouth LCD: {e}"
     except Exception as e:
@@ -41,9 +42,9 @@ def get_display(artie_id: str) -> Tuple[None|int, MouthValues|str]:
     Returns a tuple of the form (None, LCD value) or (err code, errmsg).
     """
     try:
-        connection = asc.ServiceConnection(asc.Service.MOUTH_SERVICE, artie_id=artie_id)
-        val = str(connection.lcd_get())
-        return None, val
+        with asc.pooled_connection(asc.Service.MOUTH_SERVICE, artie_id=artie_id) as connection:
+            val = str(connection.lcd_get())
+            return None, val
     except TimeoutError as e:
         return 504, f"Timed out trying to get the mouth LCD display: {e}"
     except Exception as e:
@@ -54,10 +55,10 @@ def test(artie_id: str) -> Tuple[int|None, str|None]:
     Returns a tuple of the form (error code|None, errmsg|None).
     """
     try:
-        connection = asc.ServiceConnection(asc.Service.MOUTH_SERVICE, artie_id=artie_id)
-        worked = connection.lcd_test()
-        if not worked:
-            return 500, f"Error trying to test the mouth LCD display. The display is not working."
+        with asc.pooled_connection(asc.Service.MOUTH_SERVICE, artie_id=artie_id) as connection:
+            worked = connection.lcd_test()
+            if not worked:
+                return 500, f"Error trying to test the mouth LCD display. The display is not working."
     except TimeoutError as e:
         return 504, f"Timed out trying to test the mouth LCD display: {e}"
     except Exception as e:
@@ -69,10 +70,10 @@ def clear(artie_id: str) -> Tuple[int|None, str|None]:
     Returns a tuple of the form (error code|None, errmsg|None).
     """
     try:
-        connection = asc.ServiceConnection(asc.Service.MOUTH_SERVICE, artie_id=artie_id)
-        worked = connection.lcd_off()
-        if not worked:
-            return 500, f"Error trying to clear the mouth LCD display. The display is not working."
+        with asc.pooled_connection(asc.Service.MOUTH_SERVICE, artie_id=artie_id) as connection:
+            worked = connection.lcd_off()
+            if not worked:
+                return 500, f"Error trying to clear the mouth LCD display. The display is not working."
     except TimeoutError as e:
         return 504, f"Timed out trying to clear the mouth LCD display: {e}"
     except Exception as e:
@@ -86,18 +87,18 @@ def led(state: LEDStates, artie_id: str) -> Tuple[int|None, str|None]:
     """
     try:
         worked = True
-        connection = asc.ServiceConnection(asc.Service.MOUTH_SERVICE, artie_id=artie_id)
-        match state:
-            case LEDStates.ON:
-                worked = connection.led_on()
-            case LEDStates.OFF:
-                worked = connection.led_off()
-            case LEDStates.HEARTBEAT:
-                worked = connection.led_heartbeat()
-            case _:
-                return 400, f"Invalid led state: {state}"
-        if not worked:
-            return 500, f"Error trying to set the mouth LED. The LED is not working."
+        with asc.pooled_connection(asc.Service.MOUTH_SERVICE, artie_id=artie_id) as connection:
+            match state:
+                case LEDStates.ON:
+                    worked = connection.led_on()
+                case LEDStates.OFF:
+                    worked = connection.led_off()
+                case LEDStates.HEARTBEAT:
+                    worked = connection.led_heartbeat()
+                case _:
+                    return 400, f"Invalid led state: {state}"
+            if not worked:
+                return 500, f"Error trying to set the mouth LED. The LED is not working."
     except TimeoutError as e:
         return 504, f"Timed out trying to set the mouth LED: {e}"
     except Exception as e:
@@ -109,24 +110,24 @@ def get_led(artie_id: str) -> Tuple[None|int, LEDStates|str]:
     Returns a tuple of the form (None, LED value) or (err code, errmsg).
     """
     try:
-        connection = asc.ServiceConnection(asc.Service.MOUTH_SERVICE, artie_id=artie_id)
-        val = LEDStates(connection.led_get())
-        return None, val
+        with asc.pooled_connection(asc.Service.MOUTH_SERVICE, artie_id=artie_id) as connection:
+            val = LEDStates(connection.led_get())
+            return None, val
     except TimeoutError as e:
         return 504, f"Timed out trying to get the mouth LED state: {e}"
     except Exception as e:
         return 500, f"Error trying to get the mouth LED state: {e}"
 
-def reload_firmware(artie_id: str) -> Tuple[int|None, str|None]:
+def reload_firmware(artie_id: str, force=False) -> Tuple[int|None, str|None]:
     """
     Reloads the mouth MCU's firmware and returns a tuple of the form
     (errorcode|None, errmsg|None)
     """
     try:
-        connection = asc.ServiceConnection(asc.Service.MOUTH_SERVICE, artie_id=artie_id)
-        worked = connection.firmware_load()
-        if not worked:
-            return 500, f"Error trying to reload the mouth FW. The FW subsystem is not working."
+        with asc.pooled_connection(asc.Service.MOUTH_SERVICE, artie_id=artie_id) as connection:
+            worked = connection.firmware_load(force=force)
+            if not worked:
+                return 500, f"Error trying to reload the mouth FW. The FW subsystem is not working."
     except TimeoutError as e:
         return 504, f"Timed out trying to reload the mouth FW: {e}"
     except Exception as e:
@@ -138,11 +139,16 @@ def get_status(artie_id: str) -> Tuple[None|int, str|Dict[str, str]]:
     Gets the status (a Dict of the form {submodule: status}). Returns a tuple of the form
     (None|errorcode, status|errmsg)
     """
-    try:
-        connection = asc.ServiceConnection(asc.Service.MOUTH_SERVICE, artie_id=artie_id)
-        status = connection.status()
-        status = {k: status[k] for k in status}
+    # Served from the table that the service keeps current for us, if we are subscribed to it
+    status = status_table.get_status(asc.Service.MOUTH_SERVICE, artie_id)
+    if status is not None:
         return None, status
+
+    try:
+        with asc.pooled_connection(asc.Service.MOUTH_SERVICE, artie_id=artie_id) as connection:
+            status = connection.status()
+            status = {k: status[k] for k in status}
+            return None, status
     except TimeoutError as e:
         return 504, f"Timed out trying to get the mouth status: {e}"
     except Exception as e:
@@ -154,8 +160,8 @@ def self_test(artie_id: str) -> Tuple[None|int, None|str]:
     (None|errorcode, None|errmsg)
     """
     try:
-        connection = asc.ServiceConnection(asc.Service.MOUTH_SERVICE, artie_id=artie_id)
-        connection.self_check()
+        with asc.pooled_connection(asc.Service.MOUTH_SERVICE, artie_id=artie_id) as connection:
+            connection.self_check()
     except TimeoutError as e:
         return 504, f"Timed out trying to do the mouth self test: {e}"
     except Exception as e:
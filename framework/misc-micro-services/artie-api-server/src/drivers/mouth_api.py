@@ -2,6 +2,8 @@
 Logic for handling mouth API.
 """
 from . import mouth
+from . import response_cache
+from artie_service_client import client as asc
 from flask import request as r
 from artie_util import artie_logging as alog
 import flask
@@ -10,6 +12,7 @@ mouth_api = flask.Blueprint('mouth_api', __name__, url_prefix="/mouth")
 
 @mouth_api.route("/lcd", methods=["POST"])
 @alog.function_counter("set_mouth_display", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.invalidates(asc.Service.MOUTH_SERVICE)
 def set_mouth_display():
     """
     Change the mouth display to show the given state.
@@ -78,6 +81,7 @@ def set_mouth_display():
 
 @mouth_api.route("/lcd", methods=["GET"])
 @alog.function_counter("get_mouth_display", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.cached(asc.Service.MOUTH_SERVICE)
 def get_mouth_display():
     """
     Get the mouth display state, as far as we know.
@@ -117,6 +121,7 @@ def get_mouth_display():
 
 @mouth_api.route("/lcd/test", methods=["POST"])
 @alog.function_counter("test_mouth_display", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.invalidates(asc.Service.MOUTH_SERVICE)
 def test_mouth_display():
     """
     Draw a test image on the mouth LCD.
@@ -148,6 +153,7 @@ def test_mouth_display():
 
 @mouth_api.route("/lcd/off", methods=["POST"])
 @alog.function_counter("clear_mouth_display", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.invalidates(asc.Service.MOUTH_SERVICE)
 def clear_mouth_display():
     """
     Erase the contents on the mouth LCD.
@@ -180,6 +186,7 @@ def clear_mouth_display():
 
 @mouth_api.route("/led", methods=["POST"])
 @alog.function_counter("set_mouth_led", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.invalidates(asc.Service.MOUTH_SERVICE)
 def set_mouth_led():
     """
     * *POST*: `/mouth/led`
@@ -236,6 +243,7 @@ def set_mouth_led():
 
 @mouth_api.route("/led", methods=["GET"])
 @alog.function_counter("get_mouth_led", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.cached(asc.Service.MOUTH_SERVICE)
 def get_mouth_led():
     """
     * *GET*: `/mouth/led`
@@ -274,6 +282,7 @@ def get_mouth_led():
 
 @mouth_api.route("/fw", methods=["POST"])
 @alog.function_counter("reload_mouth_firmware", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.invalidates(asc.Service.MOUTH_SERVICE)
 def reload_mouth_firmware():
     """
     Reload MCU firmware.
@@ -281,6 +290,7 @@ def reload_mouth_firmware():
     * *POST*: `/mouth/fw`
         * *Parameters*:
             * `artie-id`: The Artie ID.
+            * `force`: (Optional) If `true`, load the FW even if the MCU already has it.
         * *Payload*: None
 
     """
@@ -292,7 +302,8 @@ def reload_mouth_firmware():
         }
         return errbody, 400
 
-    err, errmsg = mouth.reload_firmware(artie_id=r.args['artie-id'])
+    force = r.args.get('force', 'false').lower() in ('true', '1')
+    err, errmsg = mouth.reload_firmware(artie_id=r.args['artie-id'], force=force)
     if err:
         errbody = {
             "artie-id": r.args['artie-id'],
@@ -306,6 +317,7 @@ def reload_mouth_firmware():
 
 @mouth_api.route("/status", methods=["GET"])
 @alog.function_counter("get_mouth_status", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.cached(asc.Service.MOUTH_SERVICE)
 def get_mouth_status():
     """
     Get the mouth submodules' statuses.
@@ -352,6 +364,7 @@ def get_mouth_status():
 
 @mouth_api.route("/self-test", methods=["POST"])
 @alog.function_counter("mouth_self_test", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.invalidates(asc.Service.MOUTH_SERVICE)
 def mouth_self_test():
     """
     Initiate a self-test.
@@ -1,6 +1,7 @@
 from artie_service_client import client as asc
 from artie_util import boardconfig_controller as board
 from artie_util import artie_logging as alog
+from . import status_table
 from typing import Dict, Tuple
 import enum
 
@@ -22,12 +23,8 @@ def reset_mcu(mcu: MCU_IDS, artie_id: str) -> bool:
         case MCU_IDS.ALL:
             return asc.reset(board.MCU_RESET_BROADCAST, artie_id=artie_id)
         case MCU_IDS.ALL_HEAD:
-            worked = True
-            worked &= asc.reset(board.MCU_RESET_ADDR_RL_EYEBROWS, artie_id=artie_id)
-            worked &= asc.reset(board.MCU_RESET_ADDR_MOUTH, artie_id=artie_id)
-            worked &= asc.reset(board.MCU_RESET_ADDR_HEAD_SENSORS, artie_id=artie_id)
-            worked &= asc.reset(board.MCU_RESET_ADDR_PUMP_CTL, artie_id=artie_id)
-            return worked
+            head_mcus = (board.MCU_RESET_ADDR_RL_EYEBROWS, board.MCU_RESET_ADDR_MOUTH, board.MCU_RESET_ADDR_HEAD_SENSORS, board.MCU_RESET_ADDR_PUMP_CTL)
+            return asc.reset_group(head_mcus, artie_id=artie_id)
         case MCU_IDS.EYEBROWS:
             return asc.reset(board.MCU_RESET_ADDR_RL_EYEBROWS, artie_id=artie_id)
         case MCU_IDS.MOUTH:
@@ -44,11 +41,16 @@ def get_status(artie_id: str) -> Tuple[None|int, str|Dict[str, str]]:
     Gets the status (a Dict of the form {submodule: status}). Returns a tuple of the form
     (None|errorcode, status|errmsg)
     """
-    try:
-        connection = asc.ServiceConnection(asc.Service.RESET_SERVICE, artie_id=artie_id)
-        status = connection.status()
-        status = {k: status[k] for k in status}
+    # Served from the table that the service keeps current for us, if we are subscribed to it
+    status = status_table.get_status(asc.Service.RESET_SERVICE, artie_id)
+    if status is not None:
         return None, status
+
+    try:
+        with asc.pooled_connection(asc.Service.RESET_SERVICE, artie_id=artie_id) as connection:
+            status = connection.status()
+            status = {k: status[k] for k in status}
+            return None, status
     except TimeoutError as e:
         return 504, f"Timed out trying to get the reset status: {e}"
     except Exception as e:
@@ -60,8 +62,8 @@ def self_test(artie_id: str) -> Tuple[None|int, None|str]:
     (None|errorcode, None|errmsg)
     """
     try:
-        connection = asc.ServiceConnection(asc.Service.RESET_SERVICE, artie_id=artie_id)
-        connection.self_check()
+        with asc.pooled_connection(asc.Service.RESET_SERVICE, artie_id=artie_id) as connection:
+            connection.self_check()
     except TimeoutError as e:
         return 504, f"Timed out trying to do the reset self test: {e}"
     except Exception as e:
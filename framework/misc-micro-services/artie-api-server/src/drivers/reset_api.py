@@ -2,6 +2,8 @@
 Logic for handling reset API.
 """
 from . import reset
+from . import response_cache
+from artie_service_client import client as asc
 from flask import request as r
 from artie_util import artie_logging as alog
 import flask
@@ -11,6 +13,7 @@ reset_api = flask.Blueprint('reset_api', __name__, url_prefix="/reset")
 
 @reset_api.route("/mcu", methods=["POST"])
 @alog.function_counter("reset_mcu", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.invalidates()
 def reset_mcu():
     """
     Reset the given MCU. Please note that resetting an MCU may degrade Artie's abilities
@@ -76,6 +79,7 @@ def reset_mcu():
 
 @reset_api.route("/sbc", methods=["POST"])
 @alog.function_counter("reset_sbc", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.invalidates()
 def reset_sbc():
     """
     Reset the given SBC. Please note that SBCs may take several minutes to completely reboot,
@@ -95,6 +99,7 @@ def reset_sbc():
 
 @reset_api.route("/status")
 @alog.function_counter("get_reset_status", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.cached(asc.Service.RESET_SERVICE)
 def get_reset_status():
     """
     Get the reset service's submodules' statuses.
@@ -139,6 +144,7 @@ def get_reset_status():
 
 @reset_api.route("/self-test")
 @alog.function_counter("reset_self_test", alog.MetricSWCodePathAPIOrder.CALLS)
+@response_cache.invalidates(asc.Service.RESET_SERVICE)
 def reset_self_test():
     """
     Initiate a self-test.
@@ -0,0 +1,146 @@
+"""
+Short-lived cache of the responses to read-only driver routes.
+
+The drivers answer most GET requests from their in-memory state, so a dashboard
+polling every actuator does not need a fresh RPC for each request. We keep each
+successful response for a short time, keyed by (Artie ID, service, route, parameters),
+and drop a service's entries whenever a write for that Artie goes through this server.
+
+Clients can opt out of the cache with `Cache-Control: no-cache` (or `max-age=0`),
+and can revalidate with `If-None-Match`, since every response carries an `ETag`.
+
+Note that each gunicorn worker has its own cache, and only sees its own writes,
+so a read from another worker can be up to one TTL stale.
+"""
+from artie_service_client import client as asc
+from artie_util import artie_logging as alog
+from collections import OrderedDict
+from flask import request as r
+from typing import Dict, Tuple
+import flask
+import functools
+import os
+import threading
+import time
+
+# How long to keep a response, in seconds (0 disables the cache)
+TTL_S = float(os.environ.get('API_SERVER_CACHE_TTL_S', '2.0'))
+
+# Most entries we keep before evicting the least recently used
+MAX_ENTRIES = 1024
+
+class _Entry:
+    def __init__(self, data: bytes, mimetype: str, etag: str, created_at: float):
+        self.data = data
+        self.mimetype = mimetype
+        self.etag = etag
+        self.created_at = created_at
+
+# {(artie_id, service, path, params): entry}
+_entries: OrderedDict = OrderedDict()
+
+# {(artie_id, service): generation}, bumped on every invalidation, so that a read that
+# started before a write does not store what it read after the write
+_generations: Dict[Tuple[str, asc.Service], int] = {}
+
+# Protects the two dicts above
+_lock = threading.Lock()
+
+def _key(service: asc.Service) -> Tuple:
+    params = tuple(sorted(r.args.items(multi=True)))
+    return (r.args.get('artie-id'), service, r.path, params)
+
+def _lookup(key: Tuple, max_age_s: float) -> _Entry|None:
+    with _lock:
+        entry = _entries.get(key, None)
+        if entry is None:
+            return None
+        age_s = time.monotonic() - entry.created_at
+        if age_s >= TTL_S:
+            del _entries[key]
+            return None
+        elif age_s > max_age_s:
+            return None
+        _entries.move_to_end(key)
+        return entry
+
+def _store(key: Tuple, generation: int, entry: _Entry):
+    artie_id, service, _, _ = key
+    with _lock:
+        if _generations.get((artie_id, service), 0) != generation:
+            return
+        _entries[key] = entry
+        _entries.move_to_end(key)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+def _respond(entry: _Entry, hit: bool) -> flask.Response:
+    age_s = time.monotonic() - entry.created_at
+    response = flask.Response(entry.data, mimetype=entry.mimetype)
+    response.set_etag(entry.etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = max(0, int(TTL_S - age_s))
+    response.headers['Age'] = str(int(age_s))
+    response.headers['X-Cache'] = "HIT" if hit else "MISS"
+    return response.make_conditional(r)
+
+def invalidate(artie_id: str, *services: asc.Service):
+    """
+    Drop every cached response for the given services (all services if none are given) on the given Artie.
+    """
+    services = services if services else tuple(asc.Service)
+    with _lock:
+        for service in services:
+            _generations[(artie_id, service)] = _generations.get((artie_id, service), 0) + 1
+        for key in [k for k in _entries if k[0] == artie_id and k[1] in services]:
+            del _entries[key]
+
+def cached(service: asc.Service):
+    """
+    Decorator for a GET view that reads state from the given service.
+    Only successful responses are cached.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if TTL_S <= 0 or 'artie-id' not in r.args:
+                return view(*args, **kwargs)
+
+            cc = r.cache_control
+            max_age_s = 0 if cc.no_cache or cc.no_store else (cc.max_age if cc.max_age is not None else TTL_S)
+            key = _key(service)
+            if (entry := _lookup(key, max_age_s)) is not None:
+                alog.update_counter(1, "response-cache-hits", alog.MetricSWCodePathAPIOrder.CALLS, unit=alog.MetricUnits.CALLS, description="Number of API requests served from the response cache.", attributes={"service": service.value})
+                return _respond(entry, hit=True)
+
+            alog.update_counter(1, "response-cache-misses", alog.MetricSWCodePathAPIOrder.CALLS, unit=alog.MetricUnits.CALLS, description="Number of cacheable API requests that had to go to the driver.", attributes={"service": service.value})
+            with _lock:
+                generation = _generations.get((key[0], service), 0)
+            response = flask.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+            response.add_etag()
+            entry = _Entry(response.get_data(), response.mimetype, response.get_etag()[0], time.monotonic())
+            if not cc.no_store:
+                _store(key, generation, entry)
+            return _respond(entry, hit=False)
+        return wrapper
+    return decorator
+
+def invalidates(*services: asc.Service):
+    """
+    Decorator for a view that changes the state of the given services (all services if none are given)
+    on the Artie in its `artie-id` parameter. The cache is invalidated whether or not the write worked,
+    since a failed write may still have changed something.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                return view(*args, **kwargs)
+            finally:
+                if 'artie-id' in r.args:
+                    invalidate(r.args['artie-id'], *services)
+        return wrapper
+    return decorator
@@ -0,0 +1,88 @@
+"""
+In-memory table of the drivers' submodule statuses.
+
+The first time a driver's status is requested (for a given Artie), we subscribe to
+that driver's status updates. From then on, the driver pushes every status change
+to us and status reads are served straight from this table, without touching the driver.
+"""
+from artie_service_client import client as asc
+from artie_util import artie_logging as alog
+from typing import Dict, Tuple
+import os
+import threading
+
+# How long a subscription attempt waits for the driver to come online
+SUBSCRIBE_TIMEOUT_S = float(os.environ.get('API_SERVER_STATUS_SUBSCRIBE_TIMEOUT_S', '5.0'))
+
+# {(artie_id, service): {submodule: status}}, only once the subscription's first (full) snapshot has arrived
+_statuses: Dict[Tuple[str, asc.Service], Dict[str, str]] = {}
+
+# {(artie_id, service): subscription}
+_subscriptions: Dict[Tuple[str, asc.Service], asc.StatusSubscription] = {}
+
+# {(artie_id, service): token of the subscription whose updates go into the table}, so late updates from an old one are ignored
+_current: Dict[Tuple[str, asc.Service], object] = {}
+
+# {(artie_id, service): lock held while subscribing}, so that a burst of requests makes only one
+# subscription, and a slow driver holds up only requests for itself
+_subscribe_locks: Dict[Tuple[str, asc.Service], threading.Lock] = {}
+
+# Protects the four dicts above
+_lock = threading.Lock()
+
+def _on_status_changes(key: Tuple[str, asc.Service], token: object, changes):
+    with _lock:
+        if _current.get(key) is not token:
+            return
+        # The first call is the full snapshot, the rest are changes to it
+        table = _statuses.setdefault(key, {})
+        for submodule, status in changes:
+            table[str(submodule)] = str(status)
+
+def _subscribe(key: Tuple[str, asc.Service]):
+    artie_id, service = key
+    with _lock:
+        subscribe_lock = _subscribe_locks.setdefault(key, threading.Lock())
+
+    # Someone else is already subscribing; the caller asks the driver directly in the meantime
+    if not subscribe_lock.acquire(blocking=False):
+        return
+
+    try:
+        with _lock:
+            subscription = _subscriptions.get(key, None)
+        if subscription is not None and not subscription.closed:
+            return
+
+        # Forget the old table before subscribing: the new subscription's snapshot can arrive
+        # before its constructor returns, and must not be thrown away
+        token = object()
+        with _lock:
+            _statuses.pop(key, None)
+            _current[key] = token
+
+        try:
+            subscription = asc.StatusSubscription(service, lambda changes: _on_status_changes(key, token, changes), artie_id=artie_id, timeout_s=SUBSCRIBE_TIMEOUT_S)
+        except Exception as e:
+            alog.warning(f"Could not subscribe to {service} status updates for {artie_id}: {e}")
+            return
+
+        with _lock:
+            _subscriptions[key] = subscription
+    finally:
+        subscribe_lock.release()
+
+def get_status(service: asc.Service, artie_id: str) -> Dict[str, str]|None:
+    """
+    Return a copy of the given service's {submodule: status} table, or `None` if
+    we do not have a live subscription to that service with its full snapshot yet (in which case
+    we try to make one if need be, and the caller should ask the service directly this time).
+    """
+    key = (artie_id, service)
+    with _lock:
+        subscription = _subscriptions.get(key, None)
+        if subscription is not None and not subscription.closed and key in _statuses:
+            return dict(_statuses[key])
+
+    _subscribe(key)
+    return None
@@ -0,0 +1,30 @@
+"""
+Gunicorn configuration for serving the API server in production (see run.sh).
+
+Each worker process has its own pool of driver connections and its own
+Prometheus session, which all of that worker's request threads share.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8782')}"
+
+# Requests spend most of their time waiting on drivers and Prometheus, so threads go a long way
+worker_class = "gthread"
+workers = int(os.environ.get('API_SERVER_WORKERS', min(4, multiprocessing.cpu_count())))
+threads = int(os.environ.get('API_SERVER_THREADS', '8'))
+
+# Load the app in each worker (not in the master before forking), so that logging, metrics,
+# and connections are set up per worker
+preload_app = False
+
+# Some requests (e.g., a FW load) legitimately take a while
+timeout = 60
+keepalive = 5
+
+# Serve TLS with the certificate run.sh found for us (plain HTTP if there is none, e.g., for load testing)
+certfile = os.environ.get('CERT_FPATH') or None
+keyfile = os.environ.get('KEY_FPATH') or None
+
+loglevel = os.environ.get('LOGLEVEL', 'info')
+errorlog = "-"
@@ -2,17 +2,17 @@
 # Check for --help arg
 if [[ "$1" == "-h" || "$1" == "--help" ]]; then
     python main.py --help
-    flask --app main run --help
+    gunicorn --help
     exit 0
 fi
 
-# Generate the certs
-openssl req -x509 -newkey rsa:4096 -sha256 -days 36500 -nodes -keyout /pkey.pem -out /cert.pem -subj /C=US/ST=Washington/L=Seattle/O=CompanyName/OU=Org/CN=www.example.com
+# Get the certs: the mounted secret, the ones persisted from a previous start, or freshly generated ones
+read CERT_FPATH KEY_FPATH <<< $(python -c 'from artie_util import util; print(*util.provision_cert("/etc/artie-certs/cert.pem", "/etc/artie-certs/pkey.pem", days=None))' | tail -n 1)
+export CERT_FPATH KEY_FPATH
 
-# Put the certs somewhere
-mkdir -p /etc/certs
-cp /cert.pem /etc/certs/cert.pem
-cp /pkey.pem /etc/certs/pkey.pem
-
-# Run flask
-flask --app main run --host=0.0.0.0 --port=${PORT} --cert="/etc/certs/cert.pem" --key="/etc/certs/pkey.pem"
+# Run the Flask development server in development mode, and gunicorn (see gunicorn.conf.py) otherwise
+if [[ "${ARTIE_RUN_MODE}" == "development" ]]; then
+    flask --app main run --host=0.0.0.0 --port=${PORT} --cert="${CERT_FPATH}" --key="${KEY_FPATH}"
+else
+    exec gunicorn --config gunicorn.conf.py main:app
+fi
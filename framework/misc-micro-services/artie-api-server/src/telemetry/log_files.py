@@ -0,0 +1,174 @@
+"""
+Time-bounded reads straight from the log files that Fluent Bit writes, without an index.
+
+Log files are append-only and (roughly) in time order, so to find the entries in a time
+window we skip every file whose time range (the timestamps of its first and last entries)
+is outside the window, and binary search the byte offsets of the rest for the start of
+the window. Asking for the last minute of logs then reads only the tail of the newest files.
+
+The log store (log_store.py) answers queries this way while its index is catching up.
+"""
+from . import log_tail
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, List, Tuple
+import glob
+import os
+
+# Entries are only roughly in time order (several processes can log into the same file),
+# so we start reading this many seconds before a window starts, and stop this many after it ends
+TIME_SLACK_S = float(os.environ.get('LOG_TIME_SLACK_S', '5.0'))
+
+# Binary search down to this many bytes, then read linearly
+SEARCH_MIN_BYTES = 16 * 1024
+
+# How far back from the end of a file we look for its last entry
+_TAIL_BYTES = 64 * 1024
+
+# Most lines we read at a binary search probe, looking for one with a timestamp
+_PROBE_MAX_LINES = 32
+
+# {fpath: (inode, timestamp of its first entry)}
+_first_ts: Dict[str, Tuple[int, float]] = {}
+
+def parse_timestamp(timestamp: str|None) -> float|None:
+    """
+    Parse a log timestamp (ISO 8601, or Python logging's asctime) into seconds since the epoch.
+    Timestamps without a time zone are taken to be local time. Returns `None` if it cannot be parsed.
+    """
+    if not timestamp:
+        return None
+    try:
+        return datetime.fromisoformat(str(timestamp).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+def entry_timestamp(entry: dict) -> float|None:
+    """
+    The timestamp of a log entry in seconds since the epoch, or `None` if it does not have a usable one.
+    """
+    return parse_timestamp(entry.get('timestamp', entry.get('date')))
+
+def _line_timestamp(line: bytes) -> float|None:
+    entry = log_tail.parse_line(line.decode(errors='replace'))
+    return None if entry is None else entry_timestamp(entry)
+
+def time_range(fpath: str) -> Tuple[float, float]|None:
+    """
+    The timestamps of the first and last entries in a log file, or `None` if we cannot tell.
+    The first one is remembered for as long as the file is not replaced.
+    """
+    try:
+        with open(fpath, 'rb') as f:
+            st = os.fstat(f.fileno())
+            cached = _first_ts.get(fpath)
+            if cached is not None and cached[0] == st.st_ino:
+                first = cached[1]
+            else:
+                first = _probe(f, 0, st.st_size)
+                if first is None:
+                    return None
+                _first_ts[fpath] = (st.st_ino, first)
+
+            tail_start = max(0, st.st_size - _TAIL_BYTES)
+            f.seek(tail_start)
+            lines = f.read().split(b"\n")
+    except OSError:
+        return None
+
+    # The last piece is either empty or a line that is still being written,
+    # and unless we read from the start, the first one may be cut off
+    for line in reversed(lines[:-1] if tail_start == 0 else lines[1:-1]):
+        last = _line_timestamp(line)
+        if last is not None:
+            return first, last
+    return None
+
+def _probe(f: BinaryIO, pos: int, end: int) -> float|None:
+    """
+    The timestamp of the first entry that starts after `pos` (or at 0) and before `end`, if there is one nearby.
+    """
+    f.seek(pos)
+    if pos > 0:
+        f.readline()
+    for _ in range(_PROBE_MAX_LINES):
+        if f.tell() >= end:
+            return None
+        line = f.readline()
+        if not line.endswith(b"\n"):
+            return None
+        ts = _line_timestamp(line)
+        if ts is not None:
+            return ts
+    return None
+
+def seek_time(f: BinaryIO, size: int, ts: float) -> int:
+    """
+    Binary search the first `size` bytes of a log file for where entries reach `ts`, and return the
+    offset of a line that starts at or before the first entry at or after `ts`.
+    """
+    lo, hi = 0, size
+    while hi - lo > SEARCH_MIN_BYTES:
+        mid = (lo + hi) // 2
+        probe = _probe(f, mid, hi)
+        if probe is not None and probe < ts:
+            lo = mid
+        else:
+            hi = mid
+
+    if lo == 0:
+        return 0
+    f.seek(lo)
+    f.readline()
+    return f.tell()
+
+def _scan_file(fpath: str, start_ts: float|None, end_ts: float|None, matches: Callable[[dict], bool]|None, limit: int|None) -> List[Tuple[float, dict]]:
+    try:
+        f = open(fpath, 'rb')
+    except OSError:
+        return []
+
+    results = []
+    last_ts = 0.0
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        f.seek(seek_time(f, size, start_ts - TIME_SLACK_S) if start_ts is not None else 0)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            entry = log_tail.parse_line(line.decode(errors='replace'))
+            if entry is None:
+                continue
+
+            # Entries without a timestamp are in every window, and sort after the one before them
+            ts = entry_timestamp(entry)
+            if ts is not None:
+                if end_ts is not None and ts > end_ts + TIME_SLACK_S:
+                    break
+                if (start_ts is not None and ts < start_ts) or (end_ts is not None and ts > end_ts):
+                    continue
+                last_ts = ts
+
+            if matches is None or matches(entry):
+                results.append((last_ts, entry))
+                if limit is not None and len(results) >= limit:
+                    break
+    return results
+
+def scan(pattern: str, start_ts: float|None = None, end_ts: float|None = None, matches: Callable[[dict], bool]|None = None, limit: int|None = None) -> List[dict]:
+    """
+    Return up to `limit` entries (all if `None`) from the files matching `pattern` that are between
+    `start_ts` and `end_ts` (either can be `None`) and for which `matches` is true, oldest first.
+    """
+    results = []
+    for fpath in sorted(glob.glob(pattern)):
+        span = time_range(fpath)
+        if span is not None:
+            first, last = span
+            if start_ts is not None and last < start_ts - TIME_SLACK_S:
+                continue
+            if end_ts is not None and first > end_ts + TIME_SLACK_S:
+                continue
+        results.extend(_scan_file(fpath, start_ts, end_ts, matches, limit))
+
+    results.sort(key=lambda result: result[0])
+    return [entry for _, entry in results[:limit]]
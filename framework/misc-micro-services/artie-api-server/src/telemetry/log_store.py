@@ -0,0 +1,391 @@
+"""
+Indexed store of the logs that Fluent Bit writes, for the logs API's queries.
+
+The log files are ingested incrementally into SQLite: we remember how far into each
+file we have read, and before each query we read only what was appended since
+(a few `stat` calls if nothing was). Entries are indexed by timestamp, level, and service,
+and messages go into an FTS5 trigram index for substring search, so queries are
+index range scans with a limit instead of full scans of the log history.
+A catalog of the levels, services, processes, and threads that have logged (with how many
+entries each has) is kept up to date as entries are added and dropped, so listing them
+does not depend on how much has been logged.
+
+The database is only an index over the log files and can be deleted at any time:
+it is rebuilt from the files on the next query. Rows from files that are deleted
+(e.g., rotated away) or truncated are dropped along with them.
+
+Ingesting a large log history takes a while, so a query only ingests for up to
+INGEST_BUDGET_S seconds. If that was not enough, ingestion carries on in the background,
+and until it catches up, queries are answered straight from the log files (see log_files.py).
+
+Several processes (e.g., gunicorn workers) can share one database: each batch of lines is
+ingested in its own write transaction starting from the file's stored offset,
+so nothing is ingested twice and progress is kept if a process dies.
+"""
+from artie_util import artie_logging as alog
+from . import log_files
+from . import log_tail
+from typing import Dict, Iterator, List, Tuple
+import collections
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Most lines we ingest per write transaction
+INGEST_BATCH_SIZE = 5000
+
+# Longest a query spends ingesting new log data before answering from the log files instead, in seconds
+INGEST_BUDGET_S = float(os.environ.get('LOG_INGEST_BUDGET_S', '1.0'))
+
+# Rows we fetch from SQLite at a time while iterating over query results
+QUERY_FETCH_SIZE = 500
+
+# The entry fields that the catalog keeps track of
+CATALOG_COLUMNS = ('level', 'service', 'process', 'thread')
+
+# Bump this when the schema changes in a way that needs existing databases to be migrated (see `_migrate`)
+_SCHEMA_VERSION = 1
+
+# FTS5 trigram search needs at least this many characters; shorter searches scan instead
+MIN_FTS_CHARS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    fpath TEXT UNIQUE NOT NULL,
+    inode INTEGER NOT NULL,
+    offset INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    level TEXT,
+    service TEXT,
+    process TEXT,
+    thread TEXT,
+    message TEXT,
+    entry TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS logs_ts ON logs (ts);
+CREATE INDEX IF NOT EXISTS logs_level_ts ON logs (level, ts);
+CREATE INDEX IF NOT EXISTS logs_service_ts ON logs (service, ts);
+CREATE INDEX IF NOT EXISTS logs_file ON logs (file_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5 (
+    message, content='logs', content_rowid='id', tokenize='trigram case_sensitive 1'
+);
+CREATE TRIGGER IF NOT EXISTS logs_fts_insert AFTER INSERT ON logs BEGIN
+    INSERT INTO logs_fts (rowid, message) VALUES (new.id, new.message);
+END;
+CREATE TRIGGER IF NOT EXISTS logs_fts_delete AFTER DELETE ON logs BEGIN
+    INSERT INTO logs_fts (logs_fts, rowid, message) VALUES ('delete', old.id, old.message);
+END;
+CREATE TABLE IF NOT EXISTS catalog (
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    nentries INTEGER NOT NULL,
+    PRIMARY KEY (kind, value)
+) WITHOUT ROWID;
+"""
+
+class LogStore:
+    """
+    An SQLite index over every log file matching `pattern`, stored at `db_fpath`.
+    """
+    def __init__(self, db_fpath: str, pattern: str):
+        self.db_fpath = db_fpath
+        self.pattern = pattern
+        self._local = threading.local()
+        self._ingest_lock = threading.Lock()
+        self._catch_up_lock = threading.Lock()
+        self._catch_up_thread = None
+
+        # Whether the last ingest read everything there was
+        self.caught_up = False
+
+        # {fpath: (inode, size)} as of when we last caught up, so we can skip the database when nothing changed
+        self._seen: Dict[str, Tuple[int, int]]|None = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection to the database."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            if os.path.dirname(self.db_fpath):
+                os.makedirs(os.path.dirname(self.db_fpath), exist_ok=True)
+            connection = sqlite3.connect(self.db_fpath, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._migrate(connection)
+            self._local.connection = connection
+        return connection
+
+    def _migrate(self, db: sqlite3.Connection):
+        """
+        Bring a database made by an older version of this module up to date.
+        """
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            version = db.execute("PRAGMA user_version").fetchone()[0]
+            if version < 1:
+                # Databases from before the catalog: fill it in from the entries we already have
+                db.execute("DELETE FROM catalog")
+                for column in CATALOG_COLUMNS:
+                    db.execute(f"INSERT INTO catalog (kind, value, nentries) SELECT ?, {column}, COUNT(*) FROM logs WHERE {column} IS NOT NULL GROUP BY {column}", (column,))
+            if version < _SCHEMA_VERSION:
+                db.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def ingest(self, budget_s: float|None = None) -> int:
+        """
+        Read whatever was appended to the log files since the last time, and return how many entries we added.
+        If `budget_s` is given, stop after about that many seconds; `caught_up` says whether we got through everything.
+        """
+        stats = {}
+        for fpath in glob.glob(self.pattern):
+            try:
+                st = os.stat(fpath)
+                stats[fpath] = (st.st_ino, st.st_size)
+            except OSError:
+                continue
+        if stats == self._seen:
+            return 0
+
+        deadline = None if budget_s is None else time.monotonic() + budget_s
+        db = self._connection()
+        nadded = 0
+        caught_up = True
+        with self._ingest_lock:
+            for fpath, file_id in sorted(self._sync_files(db, stats).items()):
+                while caught_up:
+                    if deadline is not None and time.monotonic() > deadline:
+                        caught_up = False
+                        break
+                    n = self._ingest_batch(db, fpath, file_id)
+                    if n is None:
+                        break
+                    nadded += n
+            self.caught_up = caught_up
+            if caught_up:
+                self._seen = stats
+
+        if nadded:
+            alog.update_counter(nadded, "log-store-ingested", alog.MetricSWCodePathAPIOrder.CALLS, unit=alog.MetricUnits.CALLS, description="Number of log entries ingested into the log store.")
+        return nadded
+
+    def catch_up(self) -> bool:
+        """
+        Ingest new log data for up to INGEST_BUDGET_S seconds, and if that is not enough, carry on in the background.
+        Returns whether the index is caught up with the log files.
+        """
+        with self._catch_up_lock:
+            if self._catch_up_thread is not None and self._catch_up_thread.is_alive():
+                return False
+            self.ingest(budget_s=INGEST_BUDGET_S)
+            if not self.caught_up:
+                self._catch_up_thread = threading.Thread(target=self._ingest_in_background, name="log-store-catch-up", daemon=True)
+                self._catch_up_thread.start()
+            return self.caught_up
+
+    def _ingest_in_background(self):
+        try:
+            nadded = self.ingest()
+            alog.info(f"Log store caught up with the log files ({nadded} entries).")
+        except Exception as e:
+            alog.error(f"Error ingesting log files: {e}")
+
+    def _sync_files(self, db: sqlite3.Connection, stats: Dict[str, Tuple[int, int]]) -> Dict[str, int]:
+        """
+        Bring the files table in line with the files that are there now, forgetting the ones that were
+        deleted, rotated, or truncated. Returns {fpath: file ID}.
+        """
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            files = {fpath: (file_id, inode, offset) for file_id, fpath, inode, offset in db.execute("SELECT id, fpath, inode, offset FROM files")}
+            file_ids = {}
+            for fpath, (file_id, inode, offset) in files.items():
+                if fpath not in stats or inode != stats[fpath][0] or stats[fpath][1] < offset:
+                    self._forget_file(db, file_id)
+                else:
+                    file_ids[fpath] = file_id
+            for fpath, (inode, _) in stats.items():
+                if fpath not in file_ids:
+                    file_ids[fpath] = db.execute("INSERT INTO files (fpath, inode, offset) VALUES (?, ?, 0)", (fpath, inode)).lastrowid
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return file_ids
+
+    def _forget_file(self, db: sqlite3.Connection, file_id: int):
+        gone = collections.Counter()
+        for column in CATALOG_COLUMNS:
+            for value, n in db.execute(f"SELECT {column}, COUNT(*) FROM logs WHERE file_id = ? AND {column} IS NOT NULL GROUP BY {column}", (file_id,)):
+                gone[(column, value)] = n
+        db.executemany("UPDATE catalog SET nentries = nentries - ? WHERE kind = ? AND value = ?", [(n, kind, value) for (kind, value), n in gone.items()])
+        db.execute("DELETE FROM catalog WHERE nentries <= 0")
+        db.execute("DELETE FROM logs WHERE file_id = ?", (file_id,))
+        db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def _ingest_batch(self, db: sqlite3.Connection, fpath: str, file_id: int) -> int|None:
+        """
+        Ingest up to INGEST_BATCH_SIZE complete lines from where the file's stored offset says we got to,
+        and move the offset past them. Returns how many entries we added, or `None` if there was nothing to read.
+        """
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT inode, offset FROM files WHERE id = ?", (file_id,)).fetchone()
+            if row is None:
+                # Another process forgot about it
+                db.execute("COMMIT")
+                return None
+            inode, offset = row
+
+            rows = []
+            start = offset
+            try:
+                with open(fpath, 'rb') as f:
+                    if os.fstat(f.fileno()).st_ino == inode:
+                        f.seek(offset)
+                        for line in f:
+                            if not line.endswith(b"\n"):
+                                # Not done being written; we will get it next time
+                                break
+                            offset += len(line)
+                            entry = log_tail.parse_line(line.decode(errors='replace'))
+                            if entry is not None:
+                                rows.append(self._row(file_id, entry))
+                                if len(rows) >= INGEST_BATCH_SIZE:
+                                    break
+            except OSError as e:
+                alog.warning(f"Error reading log file {fpath}: {e}")
+
+            if offset > start:
+                self._insert(db, rows)
+                db.execute("UPDATE files SET offset = ? WHERE id = ?", (offset, file_id))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return len(rows) if offset > start else None
+
+    def _row(self, file_id: int, entry: dict) -> tuple:
+        # Entries without a usable timestamp are filed under when we saw them
+        ts = log_files.entry_timestamp(entry)
+        return (
+            file_id,
+            ts if ts is not None else time.time(),
+            log_tail.entry_field(entry, 'level'),
+            log_tail.entry_field(entry, 'service'),
+            log_tail.entry_field(entry, 'process'),
+            log_tail.entry_field(entry, 'thread'),
+            str(entry.get('message', '')),
+            json.dumps(entry, default=str),
+        )
+
+    def _insert(self, db: sqlite3.Connection, rows: List[tuple]) -> int:
+        db.executemany("INSERT INTO logs (file_id, ts, level, service, process, thread, message, entry) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+        added = collections.Counter()
+        for row in rows:
+            # Rows are (file_id, ts, level, service, process, thread, ...)
+            for column, value in zip(CATALOG_COLUMNS, row[2:6]):
+                if value is not None:
+                    added[(column, value)] += 1
+        db.executemany(
+            "INSERT INTO catalog (kind, value, nentries) VALUES (?, ?, ?) ON CONFLICT (kind, value) DO UPDATE SET nentries = nentries + excluded.nentries",
+            [(kind, value, n) for (kind, value), n in added.items()]
+        )
+        return len(rows)
+
+    def query(self, start_ts: float|None = None, end_ts: float|None = None, level: str|None = None, service: str|None = None,
+              process: str|None = None, thread: str|None = None, message_contains: str|None = None, limit: int|None = None) -> List[dict]:
+        """
+        Return up to `limit` entries (all if `None`) that match every given filter, oldest first.
+        Ingests any new log data first, and answers from the log files if the index is still catching up.
+        """
+        if not self.catch_up():
+            filters = {'level': level, 'service': service, 'process': process, 'thread': thread}
+            def matches(entry: dict) -> bool:
+                if message_contains and message_contains not in str(entry.get('message', '')):
+                    return False
+                return all(value is None or log_tail.entry_field(entry, name) == value for name, value in filters.items())
+            return log_files.scan(self.pattern, start_ts=start_ts, end_ts=end_ts, matches=matches, limit=limit)
+
+        rows = self.iter_rows(start_ts=start_ts, end_ts=end_ts, level=level, service=service, process=process, thread=thread,
+                              message_contains=message_contains, limit=limit)
+        return [json.loads(entry) for _, _, entry in rows]
+
+    def iter_rows(self, start_ts: float|None = None, end_ts: float|None = None, level: str|None = None, service: str|None = None,
+                  process: str|None = None, thread: str|None = None, message_contains: str|None = None,
+                  after: Tuple[float, int]|None = None, limit: int|None = None) -> Iterator[Tuple[float, int, str]]:
+        """
+        Yield (timestamp, row ID, entry as JSON text) for up to `limit` entries (all if `None`) in the index that
+        match every given filter, oldest first, starting after the entry whose (timestamp, row ID) is `after`.
+        Rows are fetched from SQLite a few at a time, so memory use does not grow with the number of results.
+        Unlike `query`, this does not ingest new log data first (see `catch_up`).
+        """
+        clauses, params = [], []
+        if after is not None:
+            clauses.append("(ts, id) > (?, ?)")
+            params.extend(after)
+        if start_ts is not None:
+            clauses.append("ts >= ?")
+            params.append(start_ts)
+        if end_ts is not None:
+            clauses.append("ts <= ?")
+            params.append(end_ts)
+        for column, value in (("level", level), ("service", service), ("process", process), ("thread", thread)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if message_contains:
+            if len(message_contains) >= MIN_FTS_CHARS:
+                clauses.append("id IN (SELECT rowid FROM logs_fts WHERE logs_fts MATCH ?)")
+                params.append('"' + message_contains.replace('"', '""') + '"')
+            else:
+                clauses.append("instr(message, ?) > 0")
+                params.append(message_contains)
+
+        sql = "SELECT ts, id, entry FROM logs"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY ts, id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        cursor = self._connection().execute(sql, params)
+        try:
+            while rows := cursor.fetchmany(QUERY_FETCH_SIZE):
+                yield from rows
+        finally:
+            cursor.close()
+
+    def catalog(self) -> Dict[str, List[str]]:
+        """
+        Every level, service, process, and thread that has logged entries we still have, sorted,
+        as {'level': [...], 'service': [...], 'process': [...], 'thread': [...]}.
+        Ingests any new log data first; while the index is catching up, this only covers what it has so far.
+        """
+        self.catch_up()
+        catalog = {column: [] for column in CATALOG_COLUMNS}
+        for kind, value in self._connection().execute("SELECT kind, value FROM catalog ORDER BY kind, value"):
+            catalog[kind].append(value)
+        return catalog
+
+    def distinct(self, column: str) -> List[str]:
+        """
+        Every distinct value of `column` (one of CATALOG_COLUMNS) that has logged entries we still have, sorted.
+        Ingests any new log data first; while the index is catching up, this only covers what it has so far.
+        """
+        if column not in CATALOG_COLUMNS:
+            raise ValueError(f"Cannot list distinct values of {column}")
+        self.catch_up()
+        return [value for (value,) in self._connection().execute("SELECT value FROM catalog WHERE kind = ? ORDER BY value", (column,))]
@@ -0,0 +1,159 @@
+"""
+Incremental tailing of the log files that Fluent Bit writes, for live log streaming.
+
+One background thread polls the log files for new data, remembering how far into
+each file it has read, so each poll costs time proportional to what was appended
+since the last one (not to the size of the log history). New entries are
+pushed to every subscriber whose filters they match. The thread only runs while
+someone is subscribed.
+"""
+from artie_util import artie_logging as alog
+from typing import Dict, List
+import glob
+import json
+import os
+import queue
+import threading
+import time
+
+# How often to look for new log data, in seconds
+POLL_INTERVAL_S = float(os.environ.get('LOG_TAIL_INTERVAL_S', '0.5'))
+
+# Most entries we hold for a subscriber that is not keeping up, before we start dropping them
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+def parse_line(line: str) -> dict|None:
+    """
+    Parse one line of a log file into a log entry dict, or return `None` if it is not one.
+    Accepts JSON lines as well as Fluent Bit's `out_file` format (`<tag>: [<time>, {<record>}]`).
+    """
+    line = line.strip()
+    if not line:
+        return None
+    if not line.startswith('{'):
+        _, sep, line = line.partition(': ')
+        if not sep:
+            return None
+    try:
+        entry = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+
+    if isinstance(entry, list) and len(entry) == 2 and isinstance(entry[1], dict):
+        entry = entry[1]
+    return entry if isinstance(entry, dict) else None
+
+def entry_field(entry: dict, name: str) -> str|None:
+    """
+    Get `name` (one of 'service', 'process', 'thread', 'level') from a log entry, whichever way it was spelled.
+    """
+    return entry.get(name, entry.get(f"{name}name"))
+
+class Subscription:
+    """
+    A queue of new log entries that match the given filters (`None` matches anything).
+    """
+    def __init__(self, level: str|None = None, service: str|None = None, process: str|None = None, thread: str|None = None):
+        self.filters = {'level': level, 'service': service, 'process': process, 'thread': thread}
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.ndropped = 0
+
+    def matches(self, entry: dict) -> bool:
+        return all(value is None or entry_field(entry, name) == value for name, value in self.filters.items())
+
+    def offer(self, entry: dict):
+        if not self.matches(entry):
+            return
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            self.ndropped += 1
+
+class _FileState:
+    def __init__(self, inode: int, offset: int):
+        self.inode = inode
+        self.offset = offset
+        self.partial = b""
+
+class LogTailer:
+    """
+    Tails every file matching `pattern` and hands new entries to the subscribers.
+    """
+    def __init__(self, pattern: str, poll_interval_s=POLL_INTERVAL_S):
+        self.pattern = pattern
+        self.poll_interval_s = poll_interval_s
+        self._files: Dict[str, _FileState] = {}
+        self._subscribers: List[Subscription] = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, subscription: Subscription) -> Subscription:
+        """
+        Start pushing new entries to `subscription`. Entries already in the files are not pushed.
+        """
+        with self._lock:
+            self._subscribers.append(subscription)
+            if self._thread is None:
+                # Start from the end of whatever is there now
+                self._files = {}
+                self._poll(from_start=False)
+                self._thread = threading.Thread(target=self._run, name="log-tailer", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval_s)
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+                self._poll(from_start=True)
+
+    def _poll(self, from_start: bool):
+        """
+        Read whatever was appended to the files since the last poll. Files we have not seen before
+        are read from their start if `from_start`, otherwise we only note how long they are.
+        """
+        fpaths = set(glob.glob(self.pattern))
+        for fpath in set(self._files) - fpaths:
+            del self._files[fpath]
+
+        for fpath in sorted(fpaths):
+            try:
+                st = os.stat(fpath)
+            except OSError:
+                continue
+
+            state = self._files.get(fpath, None)
+            if state is None:
+                state = self._files[fpath] = _FileState(st.st_ino, 0 if from_start else st.st_size)
+            elif state.inode != st.st_ino or st.st_size < state.offset:
+                # Rotated or truncated
+                state.inode, state.offset, state.partial = st.st_ino, 0, b""
+
+            if st.st_size == state.offset:
+                continue
+            try:
+                with open(fpath, 'rb') as f:
+                    f.seek(state.offset)
+                    data = f.read(st.st_size - state.offset)
+            except OSError as e:
+                alog.warning(f"Error reading log file {fpath}: {e}")
+                continue
+            state.offset += len(data)
+
+            # Hold on to a trailing partial line until the rest of it is written
+            lines = (state.partial + data).split(b"\n")
+            state.partial = lines.pop()
+            for line in lines:
+                entry = parse_line(line.decode(errors='replace'))
+                if entry is None:
+                    continue
+                for subscription in self._subscribers:
+                    subscription.offer(entry)
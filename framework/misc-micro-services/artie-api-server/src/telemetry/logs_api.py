@@ -1,19 +1,26 @@
 """
 Logs API for querying Artie logs from Fluent Bit
 
-# TODO: There needs to be a database (probably PostgreSQL).
-#       Fluentbit pushes logs into the database.
-#       A dedicated database server allows this file to query logs from the database.
-#       In the future, we will be using Kafka to pub/sub. The database server will subscribe and ingest sensor data
+Queries are answered from an SQLite index over Fluent Bit's log files (see log_store.py),
+or straight from the files while the index is catching up (see log_files.py),
+and live logs are streamed by tailing the files (see log_tail.py).
+
+# TODO: In the future, we will be using Kafka to pub/sub. A database server will subscribe and ingest sensor data
 #       and serve that data via a similar API to the one we use for the logs.
 """
 from artie_util import artie_logging as alog
+from . import log_files
+from . import log_store
+from . import log_tail
+import base64
+import binascii
 import flask
 import requests
 import os
 import json
-import glob
-from datetime import datetime, timedelta
+import queue
+import threading
+import time
 
 logs_api = flask.Blueprint('logs', __name__, url_prefix='/logs')
 
@@ -21,6 +28,24 @@ logs_api = flask.Blueprint('logs', __name__, url_prefix='/logs')
 LOG_COLLECTOR_HOST = os.environ.get('LOG_COLLECTOR_HOST', 'log-collector')
 LOG_COLLECTOR_PORT = int(os.environ.get('LOG_COLLECTOR_PORT', '2020'))
 LOG_FILE_PATH = os.environ.get('LOG_FILE_PATH', '/data/logs')
+LOG_DB_PATH = os.environ.get('LOG_DB_PATH', '/var/lib/artie-api-server/logs.sqlite')
+
+# Most entries /logs/query returns in one page of JSON (streamed NDJSON responses have no limit)
+QUERY_MAX_PAGE_SIZE = int(os.environ.get('LOG_QUERY_MAX_PAGE_SIZE', '1000'))
+
+# How often to send something down an idle log stream, so that we notice when the client goes away
+STREAM_KEEPALIVE_S = 15.0
+
+# Most /logs/stream clients each worker serves at once. Every open stream holds one of the worker's
+# request threads (API_SERVER_THREADS), so this has to stay well below that to leave room for other requests.
+STREAM_MAX_CLIENTS = int(os.environ.get('LOG_STREAM_MAX_CLIENTS', '4'))
+_stream_slots = threading.BoundedSemaphore(STREAM_MAX_CLIENTS)
+
+# Shared by every /logs/stream subscriber in this process
+_tailer = log_tail.LogTailer(f"{LOG_FILE_PATH}/*.log")
+
+# Index over the log files for everything else
+_store = log_store.LogStore(LOG_DB_PATH, f"{LOG_FILE_PATH}/*.log")
 
 
 @logs_api.route('/live', methods=['GET'])
@@ -36,43 +61,8 @@ def get_live_logs():
         seconds = int(flask.request.args.get('seconds', 60))
         level = flask.request.args.get('level')
         service = flask.request.args.get('service')
-        
-        # Read log files from the past N seconds
-        cutoff_time = datetime.now() - timedelta(seconds=seconds)
-        logs = []
-        
-        # Find all log files
-        log_files = sorted(glob.glob(f"{LOG_FILE_PATH}/*.log"))
-        
-        for log_file in log_files:
-            try:
-                with open(log_file, 'r') as f:
-                    for line in f:
-                        try:
-                            log_entry = json.loads(line.strip())
-                            
-                            # Parse timestamp
-                            timestamp_str = log_entry.get('timestamp', log_entry.get('date'))
-                            if timestamp_str:
-                                log_time = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                                if log_time < cutoff_time:
-                                    continue
-                            
-                            # Apply filters
-                            if level and log_entry.get('level') != level:
-                                continue
-                            if service and log_entry.get('service') != service:
-                                continue
-                            
-                            logs.append(log_entry)
-                        except json.JSONDecodeError:
-                            continue
-            except Exception as e:
-                alog.warning(f"Error reading log file {log_file}: {e}")
-                continue
-        
-        # Sort by timestamp
-        logs.sort(key=lambda x: x.get('timestamp', x.get('date', '')))
+
+        logs = _store.query(start_ts=time.time() - seconds, level=level, service=service)
         
         return flask.jsonify({
             'success': True,
@@ -88,6 +78,67 @@ def get_live_logs():
         }), 500
 
 
+@logs_api.route('/stream', methods=['GET'])
+def stream_logs():
+    """
+    Stream new log entries as Server-Sent Events, as they are written.
+    Query parameters (each optional, '*' means any):
+        - level: Only stream logs of this level
+        - service: Only stream logs from this service
+        - process: Only stream logs from this process
+        - thread: Only stream logs from this thread
+    Each entry is one `data:` event holding the entry's JSON. If the client falls behind,
+    entries are dropped and a `dropped` event says how many.
+    If this worker is already serving STREAM_MAX_CLIENTS streams, returns 503 with a Retry-After header.
+    """
+    if not _stream_slots.acquire(blocking=False):
+        return flask.jsonify({
+            'success': False,
+            'error': f"Too many open log streams (at most {STREAM_MAX_CLIENTS} per worker). Try again shortly."
+        }), 503, {'Retry-After': '5'}
+
+    filters = {name: flask.request.args.get(name) for name in ('level', 'service', 'process', 'thread')}
+    subscription = log_tail.Subscription(**{name: None if value in (None, '*') else value for name, value in filters.items()})
+    _tailer.subscribe(subscription)
+
+    def events():
+        # Lets the client know the stream is up before any logs arrive
+        yield ": connected\n\n"
+        ndropped = 0
+        while True:
+            try:
+                entry = subscription.queue.get(timeout=STREAM_KEEPALIVE_S)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+
+            if subscription.ndropped != ndropped:
+                yield f"event: dropped\ndata: {json.dumps({'count': subscription.ndropped - ndropped})}\n\n"
+                ndropped = subscription.ndropped
+            yield f"data: {json.dumps(entry, default=str)}\n\n"
+
+    def close():
+        _tailer.unsubscribe(subscription)
+        _stream_slots.release()
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    response = flask.Response(events(), mimetype='text/event-stream', headers=headers)
+    # Called when the server is done with the response, even if the client went away before the first event
+    response.call_on_close(close)
+    return response
+
+
+def _encode_cursor(ts: float, row_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([ts, row_id]).encode()).decode()
+
+def _decode_cursor(cursor: str) -> tuple:
+    """Decode a continuation token from `_encode_cursor`. Raises `ValueError` if it is not one."""
+    try:
+        ts, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(ts), int(row_id)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
 @logs_api.route('/query', methods=['POST'])
 def query_logs():
     """
@@ -98,7 +149,10 @@ def query_logs():
         - level: Log level filter (optional)
         - service: Service name filter (optional)
         - message_contains: Search string in message (optional)
-        - limit: Maximum number of results (default: 1000)
+        - limit: Maximum number of results (default: 1000; for 'json', at most QUERY_MAX_PAGE_SIZE; for 'ndjson', all if unset)
+        - cursor: The `next_cursor` from a previous response, to get the next page of results (optional)
+        - format: 'json' (default) for one page of results in a JSON document, or 'ndjson' to stream
+          every result as newline-delimited JSON (one entry per line)
     """
     try:
         data = flask.request.get_json()
@@ -108,60 +162,73 @@ def query_logs():
         level = data.get('level')
         service = data.get('service')
         message_contains = data.get('message_contains')
-        limit = int(data.get('limit', 1000))
+        response_format = data.get('format', 'json')
+        if response_format not in ('json', 'ndjson'):
+            return flask.jsonify({
+                'success': False,
+                'error': "format must be 'json' or 'ndjson'."
+            }), 400
+
+        if response_format == 'ndjson':
+            limit = int(data['limit']) if data.get('limit') is not None else None
+        else:
+            limit = min(int(data.get('limit', 1000)), QUERY_MAX_PAGE_SIZE)
+        if limit is not None and limit < 1:
+            return flask.jsonify({
+                'success': False,
+                'error': "limit must be at least 1."
+            }), 400
         
         # Parse timestamps
-        start_dt = datetime.fromisoformat(start_time.replace('Z', '+00:00')) if start_time else None
-        end_dt = datetime.fromisoformat(end_time.replace('Z', '+00:00')) if end_time else None
-        
-        logs = []
-        log_files = sorted(glob.glob(f"{LOG_FILE_PATH}/*.log"))
-        
-        for log_file in log_files:
-            if len(logs) >= limit:
-                break
-                
-            try:
-                with open(log_file, 'r') as f:
-                    for line in f:
-                        if len(logs) >= limit:
-                            break
-                            
-                        try:
-                            log_entry = json.loads(line.strip())
-                            
-                            # Apply timestamp filters
-                            timestamp_str = log_entry.get('timestamp', log_entry.get('date'))
-                            if timestamp_str:
-                                log_time = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                                if start_dt and log_time < start_dt:
-                                    continue
-                                if end_dt and log_time > end_dt:
-                                    continue
-                            
-                            # Apply other filters
-                            if level and log_entry.get('level') != level:
-                                continue
-                            if service and log_entry.get('service') != service:
-                                continue
-                            if message_contains and message_contains not in log_entry.get('message', ''):
-                                continue
-                            
-                            logs.append(log_entry)
-                        except json.JSONDecodeError:
-                            continue
-            except Exception as e:
-                alog.warning(f"Error reading log file {log_file}: {e}")
-                continue
-        
-        # Sort by timestamp
-        logs.sort(key=lambda x: x.get('timestamp', x.get('date', '')))
+        start_ts = log_files.parse_timestamp(start_time) if start_time else None
+        end_ts = log_files.parse_timestamp(end_time) if end_time else None
+        if (start_time and start_ts is None) or (end_time and end_ts is None):
+            return flask.jsonify({
+                'success': False,
+                'error': "start_time and end_time must be ISO 8601 timestamps."
+            }), 400
+
+        try:
+            after = _decode_cursor(data['cursor']) if data.get('cursor') else None
+        except ValueError as e:
+            return flask.jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
+        filters = {'start_ts': start_ts, 'end_ts': end_ts, 'level': level, 'service': service, 'message_contains': message_contains}
+        if not _store.catch_up():
+            # Only the first page can be read straight from the files
+            if after is not None or response_format == 'ndjson':
+                return flask.jsonify({
+                    'success': False,
+                    'error': "The log index is still being built. Try again shortly."
+                }), 503, {'Retry-After': '5'}
+
+            logs = _store.query(**filters, limit=limit + 1)
+            return flask.jsonify({
+                'success': True,
+                'logs': logs[:limit],
+                'count': len(logs[:limit]),
+                'truncated': len(logs) > limit,
+                'next_cursor': None
+            }), 200
+
+        if response_format == 'ndjson':
+            rows = _store.iter_rows(**filters, after=after, limit=limit)
+            return flask.Response((entry + "\n" for _, _, entry in rows), mimetype='application/x-ndjson')
+
+        # Ask for one more than the limit, to know whether there are more
+        rows = list(_store.iter_rows(**filters, after=after, limit=limit + 1))
+        truncated = len(rows) > limit
+        rows = rows[:limit]
         
         return flask.jsonify({
             'success': True,
-            'logs': logs,
-            'count': len(logs),
-            'truncated': len(logs) >= limit
+            'logs': [json.loads(entry) for _, _, entry in rows],
+            'count': len(rows),
+            'truncated': truncated,
+            'next_cursor': _encode_cursor(*rows[-1][:2]) if truncated else None
         }), 200
         
     except Exception as e:
@@ -174,27 +241,13 @@ def query_logs():
 
 @logs_api.route('/services', methods=['GET'])
 def get_services():
-    """Get list of all services that have logged data."""
+    """Get list of all services that have logged data (from the log store's catalog, so this does not read any logs)."""
     try:
-        services = set()
-        log_files = glob.glob(f"{LOG_FILE_PATH}/*.log")
-        
-        for log_file in log_files:
-            try:
-                with open(log_file, 'r') as f:
-                    for line in f:
-                        try:
-                            log_entry = json.loads(line.strip())
-                            if 'service' in log_entry:
-                                services.add(log_entry['service'])
-                        except json.JSONDecodeError:
-                            continue
-            except Exception:
-                continue
+        services = _store.distinct('service')
         
         return flask.jsonify({
             'success': True,
-            'services': sorted(list(services))
+            'services': services
         }), 200
         
     except Exception as e:
@@ -203,3 +256,25 @@ def get_services():
             'success': False,
             'error': str(e)
         }), 500
+
+
+@logs_api.route('/catalog', methods=['GET'])
+def get_catalog():
+    """Get lists of all levels, services, processes, and threads that have logged data."""
+    try:
+        catalog = _store.catalog()
+
+        return flask.jsonify({
+            'success': True,
+            'levels': catalog['level'],
+            'services': catalog['service'],
+            'processes': catalog['process'],
+            'threads': catalog['thread']
+        }), 200
+
+    except Exception as e:
+        alog.error(f"Error getting log catalog: {e}")
+        return flask.jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
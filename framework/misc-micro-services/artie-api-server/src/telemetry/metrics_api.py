@@ -13,6 +13,11 @@ METRICS_COLLECTOR_HOST = os.environ.get('METRICS_COLLECTOR_HOST', 'metrics-colle
 METRICS_COLLECTOR_PORT = int(os.environ.get('METRICS_COLLECTOR_PORT', '8090'))
 PROMETHEUS_BASE_URL = f"http://{METRICS_COLLECTOR_HOST}:{METRICS_COLLECTOR_PORT}"
 
+# One session per worker process, shared by all its request threads, so that queries reuse
+# their connections to Prometheus instead of opening a new one every time
+_session = requests.Session()
+_session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=int(os.environ.get('API_SERVER_THREADS', '8'))))
+
 
 @metrics_api.route('/query', methods=['GET'])
 def query_metrics():
@@ -36,7 +41,7 @@ def query_metrics():
         if time:
             params['time'] = time
         
-        response = requests.get(
+        response = _session.get(
             f"{PROMETHEUS_BASE_URL}/api/v1/query",
             params=params,
             timeout=10
@@ -92,7 +97,7 @@ def query_range_metrics():
             'step': step
         }
         
-        response = requests.get(
+        response = _session.get(
             f"{PROMETHEUS_BASE_URL}/api/v1/query_range",
             params=params,
             timeout=30
@@ -143,7 +148,7 @@ def get_labels():
         if end:
             params['end'] = end
         
-        response = requests.get(
+        response = _session.get(
             f"{PROMETHEUS_BASE_URL}/api/v1/labels",
             params=params,
             timeout=10
@@ -193,7 +198,7 @@ def get_label_values(label_name):
         if end:
             params['end'] = end
         
-        response = requests.get(
+        response = _session.get(
             f"{PROMETHEUS_BASE_URL}/api/v1/label/{label_name}/values",
             params=params,
             timeout=10
@@ -246,7 +251,7 @@ def get_series():
         if end:
             params['end'] = end
         
-        response = requests.get(
+        response = _session.get(
             f"{PROMETHEUS_BASE_URL}/api/v1/series",
             params=params,
             timeout=10
@@ -276,7 +281,7 @@ def get_series():
 def get_targets():
     """Get current state of target discovery."""
     try:
-        response = requests.get(
+        response = _session.get(
             f"{PROMETHEUS_BASE_URL}/api/v1/targets",
             timeout=10
         )
@@ -9,6 +9,84 @@ from artie_tooling import artie_profile
 from artie_tooling import errors
 from PyQt6 import QtWidgets, QtCore
 from model import settings
+import threading
+
+# Most lines we keep in the live log view
+LIVE_LOG_MAX_LINES = 5000
+
+
+class LogStreamThread(QtCore.QThread):
+    """Streams new log entries from the API server, emitting each one as it arrives."""
+
+    entry_signal = QtCore.pyqtSignal(object)  # logging_client.LogEntry
+    error_signal = QtCore.pyqtSignal(str)
+
+    def __init__(self, parent, api_client: logging_client.LoggingClient, level: logging_client.LogLevel|None, service: str|None):
+        super().__init__(parent)
+        self.api_client = api_client
+        self.level = level
+        self.service = service
+        self._stream = None
+        self._running = True
+
+    def stop(self):
+        """Stop streaming. Safe to call from the GUI thread."""
+        self._running = False
+        if self._stream is not None:
+            self._stream.close()
+
+    def run(self):
+        try:
+            stream_or_err = self.api_client.stream_logs(level=self.level, service=self.service)
+        except Exception as e:
+            self.error_signal.emit(str(e))
+            return
+
+        if issubclass(type(stream_or_err), errors.HTTPError):
+            self.error_signal.emit(stream_or_err.message)
+            return
+
+        self._stream = stream_or_err
+        if not self._running:
+            self._stream.close()
+            return
+
+        try:
+            for entry in self._stream:
+                self.entry_signal.emit(entry)
+        except Exception as e:
+            if self._running:
+                self.error_signal.emit(f"Log stream ended: {e}")
+
+
+class LogQueryThread(QtCore.QThread):
+    """Queries historical logs from the API server, which can take a while, and emits them all at the end."""
+
+    result_signal = QtCore.pyqtSignal(object)  # List[logging_client.LogEntry]
+    error_signal = QtCore.pyqtSignal(str)
+
+    def __init__(self, parent, api_client: logging_client.LoggingClient, **query):
+        super().__init__(parent)
+        self.api_client = api_client
+        self.query = query
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        """Stop as soon as the current request returns, without emitting anything. Safe to call from the GUI thread."""
+        self._stop_event.set()
+
+    def run(self):
+        # The server returns at most a page of logs per request, so let the client page through them
+        logs = []
+        try:
+            for log in self.api_client.iter_logs(**self.query, stop_event=self._stop_event):
+                logs.append(log)
+        except Exception as e:
+            if not self._stop_event.is_set():
+                self.error_signal.emit(e.message if isinstance(e, errors.HTTPError) else str(e))
+            return
+        if not self._stop_event.is_set():
+            self.result_signal.emit(logs)
 
 
 class LoggingTab(QtWidgets.QWidget):
@@ -25,10 +103,11 @@ class LoggingTab(QtWidgets.QWidget):
         self.parent().profile_switched_signal.connect(self.on_profile_switched)
         self.parent().settings_changed_signal.connect(self.on_settings_changed)
         
-        # Set up live log refresh timer
-        self.live_timer = QtCore.QTimer(self)
-        self.live_timer.timeout.connect(self._refresh_live_logs)
-        self.live_timer.start(5000)  # Refresh every 5 seconds
+        # Stream live logs as they are written
+        self.query_thread = None
+        self._stopping_query_threads = set()
+        self.live_stream_thread = None
+        self._start_live_stream()
 
     def on_profile_switched(self, profile: artie_profile.ArtieProfile):
         """Handle profile switch events"""
@@ -36,6 +115,7 @@ class LoggingTab(QtWidgets.QWidget):
         self.api_client = logging_client.LoggingClient(profile, nretries=self.settings.api_retries) if profile else None
         self.live_text.clear()
         self.history_text.clear()
+        self._start_live_stream()
 
     def on_settings_changed(self, current_settings: settings.WorkbenchSettings):
         """Handle settings change events"""
@@ -61,8 +141,12 @@ class LoggingTab(QtWidgets.QWidget):
         self.live_level_combo.addItems(["All Levels"] + [level.value for level in logging_client.LogLevel])
         live_controls.addWidget(QtWidgets.QLabel("Level:"))
         live_controls.addWidget(self.live_level_combo)
+
+        # Changing a filter restarts the stream with the new filters
+        self.live_service_combo.currentIndexChanged.connect(self._start_live_stream)
+        self.live_level_combo.currentIndexChanged.connect(self._start_live_stream)
         
-        self.live_refresh_button = QtWidgets.QPushButton("Refresh Now")
+        self.live_refresh_button = QtWidgets.QPushButton("Load Last Minute")
         self.live_refresh_button.clicked.connect(self._refresh_live_logs)
         live_controls.addWidget(self.live_refresh_button)
         
@@ -75,6 +159,7 @@ class LoggingTab(QtWidgets.QWidget):
         
         self.live_text = QtWidgets.QTextBrowser()
         self.live_text.setPlaceholderText("Live logs will appear here...")
+        self.live_text.document().setMaximumBlockCount(LIVE_LOG_MAX_LINES)
         live_layout.addWidget(self.live_text)
         
         layout.addWidget(live_group)
@@ -152,15 +237,43 @@ class LoggingTab(QtWidgets.QWidget):
             if index >= 0:
                 combo.setCurrentIndex(index)
     
+    def _live_filters(self) -> tuple[logging_client.LogLevel|None, str|None]:
+        """The (level, service) selected for live logs"""
+        service = self.live_service_combo.currentData()
+        level_text = self.live_level_combo.currentText()
+        level = None if level_text == "All Levels" else logging_client.LogLevel(level_text)
+        return level, service
+
+    def stop_live_stream(self):
+        """Stop streaming live logs, if we are"""
+        if self.live_stream_thread is not None:
+            self.live_stream_thread.stop()
+            self.live_stream_thread.wait()
+            self.live_stream_thread = None
+
+    def _start_live_stream(self):
+        """(Re)start streaming live logs with the current filters"""
+        # The combo boxes fire while we are still building the UI
+        if not hasattr(self, 'live_stream_thread'):
+            return
+
+        self.stop_live_stream()
+        if not self.api_client:
+            return
+
+        level, service = self._live_filters()
+        self.live_stream_thread = LogStreamThread(self, self.api_client, level, service)
+        self.live_stream_thread.entry_signal.connect(lambda log: self._append_log_entry(self.live_text, log))
+        self.live_stream_thread.error_signal.connect(lambda err: self.live_text.append(f"<span style='color: red;'>Error streaming live logs: {err}</span>"))
+        self.live_stream_thread.start()
+
     def _refresh_live_logs(self):
-        """Refresh live logs from the API"""
+        """Load the last minute of logs (new logs are streamed in as they arrive)"""
         if not self.api_client:
             return
         
         # Get selected filters
-        service = self.live_service_combo.currentData()
-        level_text = self.live_level_combo.currentText()
-        level = None if level_text == "All Levels" else logging_client.LogLevel(level_text)
+        level, service = self._live_filters()
         
         # Query last 60 seconds of logs
         response = self.api_client.get_recent_logs(seconds=60, level=level, service=service)
@@ -188,16 +301,41 @@ class LoggingTab(QtWidgets.QWidget):
         limit = self.query_limit_spin.value()
 
         # TODO: Update GUI to allow time range selection
-        response = self.api_client.query_logs(limit=limit, level=level, service=service, message_contains=message_contains)
-        if issubclass(type(response), errors.HTTPError):
-            self.history_text.append(f"<span style='color: red;'>Error querying logs: {response.message}</span>")
+        # Query off of the GUI thread (the server may make us wait while it builds its log index)
+        self._abandon_query()
+        self.query_button.setEnabled(False)
+        self.query_thread = LogQueryThread(self, self.api_client, limit=limit, level=level, service=service, message_contains=message_contains)
+        self.query_thread.result_signal.connect(self._show_query_results)
+        self.query_thread.error_signal.connect(lambda err: self.history_text.append(f"<span style='color: red;'>Error querying logs: {err}</span>"))
+        self.query_thread.finished.connect(lambda: self.query_button.setEnabled(True))
+        self.query_thread.start()
+
+    def _abandon_query(self):
+        """Stop the current query, if any, without waiting for it to finish (it emits nothing once stopped)"""
+        if self.query_thread is None:
             return
 
-        # Display results
+        thread, self.query_thread = self.query_thread, None
+        thread.result_signal.disconnect()
+        thread.error_signal.disconnect()
+        thread.finished.disconnect()
+        thread.stop()
+        self._stopping_query_threads.add(thread)
+        thread.finished.connect(lambda: self._stopping_query_threads.discard(thread))
+
+    def stop_query(self):
+        """Stop querying historical logs, if we are, and wait for it (at most one request, since stopping interrupts any wait)"""
+        self._abandon_query()
+        for thread in list(self._stopping_query_threads):
+            thread.wait()
+        self._stopping_query_threads.clear()
+
+    def _show_query_results(self, logs: list[logging_client.LogEntry]):
+        """Display the results of a historical log query"""
         self.history_text.clear()
-        self.history_text.append(f"<b>Found {len(response.logs)} log entries</b><br>")
+        self.history_text.append(f"<b>Found {len(logs)} log entries</b><br>")
         
-        for log in response.logs:
+        for log in logs:
             self._append_log_entry(self.history_text, log)
     
     def _append_log_entry(self, text_widget: QtWidgets.QTextBrowser, log: logging_client.LogEntry):
@@ -127,6 +127,10 @@ class MainWindow(QtWidgets.QMainWindow):
         progress.setMinimumDuration(0)  # Show immediately
         progress.show()
         
+        # Stop streaming and querying logs
+        self.logging_tab.stop_live_stream()
+        self.logging_tab.stop_query()
+
         # Close the status fetcher (may take time to stop threads)
         self.status_fetcher.close()
         while not self.status_fetcher_closed: